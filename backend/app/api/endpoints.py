@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from urllib.parse import urlparse, quote_plus
 from ..models.schemas import (
     ScanRequest,
@@ -45,14 +46,30 @@ from ..models.schemas import (
     AIVisibilityRequest,
     AIVisibilityResponse,
 )
-from ..services.crawler_service import scan_site, fetch_html, compute_audit_scores, DEFAULT_USER_AGENT
-from ..services.crawl4ai_service import scrape_markdown, crawl_markdown, Crawl4AINotConfigured
+from ..services.crawler_service import (
+    scan_site,
+    fetch_html,
+    extract_page_signals,
+    extract_title_text,
+)
+from ..services.schema_service import (
+    SCHEMA_AUDIT_MAX_PAGES,
+    SCHEMA_INVENTORY_MAX_PAGES,
+    SCHEMA_RULES,
+    SchemaInventory,
+    audit_pages,
+    iter_audit_pages,
+    collect_schema_types,
+    extract_jsonld,
+)
+from ..services.crawl4ai_service import scrape_markdown, crawl_pages, Crawl4AINotConfigured
 from ..services.gemini_service import (
     generate_content_chunks,
     GeminiNotConfigured,
     extract_questions,
     generate_review_reply,
     semantic_coverage_analysis,
+    SEMANTIC_COVERAGE_COMPETITOR_CHARS,
     extract_nap_json,
     fact_check_claim,
     generate_jsonld,
@@ -77,13 +94,40 @@ from ..services.generation_service import (
 )
 from ..services.monitoring_service import detect_hallucinations
 from ..services.agents_service import run_agent
+from ..services.dedup_service import dedupe_pages, SimHashIndex, duplicate_cluster_finding, simhash
+from ..services.incremental_service import IncrementalAudit, lastmod_map
+from ..services.results_service import get_results_store, normalize_domain, record_result
+from ..services.page_store_service import content_hash
+from ..services.frontier_service import (
+    FAILED,
+    SKIPPED,
+    CrawlKindMismatch,
+    CrawlNotFound,
+    get_frontier_db,
+    restore_pages,
+    start_crawl,
+)
+from ..services.topic_service import site_topic_recognition, page_keywords, TopicModelNotConfigured
+from ..services.cpu_pool_service import run_cpu
+from ..services.http_cache_service import cached_get
+from ..services.http_service import DEFAULT_USER_AGENT
+from ..services.host_scheduler_service import get_scheduler
+from ..services.origin_service import resolve_origin, discover_paths, resolve_site_pages
+from ..services.keyword_service import (
+    CONTENT_SECTIONS,
+    topic_matcher,
+    content_section_matcher,
+    nap_matcher,
+)
+from ..observability import list_profiles, load_profile, render_metrics, stage
+from ..auth import require_admin
+from ..services.robots_service import AI_CRAWLERS, ai_crawler_access, get_rules as get_robots_rules
 from datetime import datetime
+import asyncio
 import httpx
 from bs4 import BeautifulSoup
 import json
 from typing import Any
-import re
-from collections import Counter
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -93,6 +137,42 @@ async def health() -> HealthResponse:
     return HealthResponse()
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: str | None = Header(default=None)):
+    """
+    Prometheus scrape target: fetch, cache, Gemini, browser render and API latency metrics.
+    Scrapers must send `Authorization: Bearer <METRICS_TOKEN>`. Without METRICS_TOKEN the
+    endpoint is disabled: per-host series name the audited customer domains.
+    """
+    import os
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_TOKEN not set)")
+    if authorization != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/admin/profiles")
+async def admin_profiles(limit: int = 50, admin: str = Depends(require_admin)):
+    """Recent request profiles (see ProfilerMiddleware), newest first."""
+    return {"profiles": list_profiles(limit)}
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def admin_profile(profile_id: str, format: str = "json", admin: str = Depends(require_admin)):
+    """
+    One stored profile: format=json for the summary (task/thread attribution),
+    format=folded for folded stacks to feed flamegraph.pl, inferno or speedscope.
+    """
+    body = load_profile(profile_id, format)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(body)
+    return json.loads(body)
+
+
 @router.get("/debug/gemini")
 async def debug_gemini():
     """
@@ -190,17 +270,6 @@ async def comprehensive_analysis(req: dict):
             raise HTTPException(status_code=400, detail="URL required")
         
         base_url = str(url).rstrip("/")
-        parsed = urlparse(base_url)
-        hostname = parsed.netloc
-        scheme = parsed.scheme or "https"
-        
-        # Handle www variants
-        if hostname.startswith("www."):
-            hostname_alt = hostname[4:]
-        else:
-            hostname_alt = f"www.{hostname}"
-        
-        bases = [f"{scheme}://{hostname}", f"{scheme}://{hostname_alt}"]
         
         # Important pages to analyze
         page_paths = [
@@ -213,28 +282,33 @@ async def comprehensive_analysis(req: dict):
             "/ueber-uns",
         ]
         
+        # Canonical host once (www/non-www, redirects), then only the pages that exist
+        origin, live_pages = await resolve_site_pages(base_url, page_paths)
+        
         # Collect content from multiple pages
-        all_content = []
+        collected: list[tuple[str, str]] = []
         scanned_pages = []
         
-        for base in bases:
-            for path in page_paths:
-                if len(scanned_pages) >= 5:
-                    break
-                page_url = f"{base}{path}"
-                try:
-                    md, meta = await scrape_markdown(page_url)
-                    if md and len(md.strip()) > 200:
-                        all_content.append(f"\n\n=== PAGE: {page_url} ===\n\n{md}")
-                        scanned_pages.append(page_url)
-                except Exception:
-                    continue
+        for page_url in live_pages or [f"{origin}{path}" for path in page_paths]:
             if len(scanned_pages) >= 5:
                 break
+            try:
+                md, meta = await scrape_markdown(page_url)
+                if md and len(md.strip()) > 200:
+                    collected.append((page_url, md))
+                    scanned_pages.append(page_url)
+            except Exception:
+                continue
         
-        if not all_content:
+        if not collected:
             raise HTTPException(status_code=400, detail="Could not scrape any content from the URL")
         
+        # Window each page to its share of the 50000-char prompt first (5 pages x 10000),
+        # then keep repeated header/nav/footer blocks only once across those windows: a
+        # shared block survives in the first window that is actually sent
+        deduped, dedup_stats = dedupe_pages([(u, md[:10000]) for u, md in collected])
+        all_content = [f"\n\n=== PAGE: {u} ===\n\n{md}" for u, md in deduped if md]
+        
         # Combine content for LLM analysis
         combined = "\n".join(all_content)
         if len(combined) > 50000:
@@ -257,6 +331,7 @@ async def comprehensive_analysis(req: dict):
             "scannedPages": scanned_pages,
             "pagesCount": len(scanned_pages),
             "contentLength": len(combined),
+            "dedup": dedup_stats,
             "analyzedAt": datetime.now().isoformat(),
         }
         
@@ -282,68 +357,44 @@ async def initial_scan(req: ScanRequest):
         if not url_str.startswith(("http://", "https://")):
             url_str = "https://" + url_str
 
-        # Fetch and parse HTML
+        # Fetch, then parse once in the CPU pool (compact signal dict back, no parse tree)
         html = await fetch_html(url_str)
-        soup = BeautifulSoup(html, "html.parser")
+        with stage("parse"):
+            signals = await run_cpu(extract_page_signals, html, size_hint=len(html or ""))
 
         now = datetime.utcnow().isoformat() + "Z"
         parsed = urlparse(url_str)
         hostname = parsed.netloc or url_str
 
         # Content analysis
-        title = (soup.title.string or "").strip() if soup.title and soup.title.string else hostname
-        meta_desc_tag = soup.find("meta", attrs={"name": "description"})
-        description = (meta_desc_tag.get("content") or "").strip() if meta_desc_tag else ""
-        headings = {
-            "h1": [h.get_text(strip=True) for h in soup.find_all("h1")],
-            "h2": [h.get_text(strip=True) for h in soup.find_all("h2")],
-            "h3": [h.get_text(strip=True) for h in soup.find_all("h3")],
-        }
-        meta_tag_count = len(soup.find_all("meta"))
+        title = signals["title"] or hostname
+        description = signals["description"]
+        headings = signals["headings"]
+        meta_tag_count = signals["metaTagCount"]
 
         # Schema types (JSON-LD)
-        schema_types: list[str] = []
-        for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
-            try:
-                data = json.loads(script.string or "null")
-
-                def collect_types(obj) -> list[str]:
-                    types: list[str] = []
-                    if isinstance(obj, dict):
-                        t = obj.get("@type")
-                        if isinstance(t, str):
-                            types.append(t)
-                        elif isinstance(t, list):
-                            types += [x for x in t if isinstance(x, str)]
-                        for v in obj.values():
-                            types += collect_types(v)
-                    elif isinstance(obj, list):
-                        for it in obj:
-                            types += collect_types(it)
-                    return types
-
-                schema_types += collect_types(data)
-            except Exception:
-                continue
+        schema_types: list[str] = signals["schemaTypes"]
         schema_types = list(dict.fromkeys(schema_types))[:20]
         schema_found = bool(schema_types)
 
         # robots.txt check (lightweight)
+        # robots.txt: compiled rules; "AI optimized" means at least one AI crawler gets its
+        # own user-agent group, i.e. the site made an explicit decision for it
         robots_found = False
         robots_ai_optimized = False
+        ai_crawlers_detected: list[str] = []
+        ai_crawler_access_summary: dict[str, Any] = {}
+        robots_url = f"{parsed.scheme or 'https'}://{hostname}/robots.txt"
         try:
-            timeout = httpx.Timeout(5.0)
-            async with httpx.AsyncClient(
-                timeout=timeout,
-                headers={"User-Agent": DEFAULT_USER_AGENT},
-                follow_redirects=True,
-            ) as client:
-                robots_url = f"{parsed.scheme or 'https'}://{hostname}/robots.txt"
-                r = await client.get(robots_url)
-                if r.status_code == 200:
-                    robots_found = True
-                    txt = (r.text or "").lower()
-                    robots_ai_optimized = any(k in txt for k in ["gptbot", "ai", "microsoft/bi", "anthropic"])
+            r = await cached_get(robots_url, timeout=httpx.Timeout(5.0))
+            if r.status_code == 200:
+                robots_found = True
+                robots_rules = get_robots_rules(hostname, r.text or "")
+                ai_crawlers_detected = [a for a in AI_CRAWLERS if robots_rules.has_group(a)]
+                robots_ai_optimized = bool(ai_crawlers_detected)
+                ai_crawler_access_summary = {
+                    a: v["allowed"] > 0 for a, v in ai_crawler_access(robots_rules, [parsed.path or "/"]).items()
+                }
         except Exception:
             pass
 
@@ -351,36 +402,20 @@ async def initial_scan(req: ScanRequest):
         sitemap_found = False
         sitemap_urls = 0
         try:
-            links = soup.find_all("link", attrs={"rel": "sitemap"})
-            if links:
+            if signals["sitemapLink"]:
                 sitemap_found = True
             else:
-                timeout = httpx.Timeout(5.0)
-                async with httpx.AsyncClient(
-                    timeout=timeout,
-                    headers={"User-Agent": DEFAULT_USER_AGENT},
-                    follow_redirects=True,
-                ) as client:
-                    sitemap_url = f"{parsed.scheme or 'https'}://{hostname}/sitemap.xml"
-                    s = await client.get(sitemap_url)
-                    if s.status_code == 200:
-                        sitemap_found = True
-                        sitemap_urls = s.text.count("<url>") if s.text else 0
+                sitemap_url = f"{parsed.scheme or 'https'}://{hostname}/sitemap.xml"
+                s = await cached_get(sitemap_url, timeout=httpx.Timeout(5.0))
+                if s.status_code == 200:
+                    sitemap_found = True
+                    sitemap_urls = s.text.count("<url>") if s.text else 0
         except Exception:
             pass
 
         # RSS/Atom feed discovery
-        rss_found = False
+        rss_found = signals["rssFound"]
         rss_items = 0
-        try:
-            alt_links = soup.find_all("link", attrs={"rel": "alternate"})
-            for l in alt_links:
-                t = (l.get("type") or "").lower()
-                if t in ("application/rss+xml", "application/atom+xml"):
-                    rss_found = True
-                    break
-        except Exception:
-            pass
 
         # AI-access artefacts (well-known)
         llms_found = False
@@ -388,95 +423,33 @@ async def initial_scan(req: ScanRequest):
         mcp_config_found = False
         openapi_found = False
         try:
-            timeout = httpx.Timeout(5.0)
-            async with httpx.AsyncClient(
-                timeout=timeout,
-                headers={"User-Agent": DEFAULT_USER_AGENT},
-                follow_redirects=True,
-            ) as client:
-                base = f"{parsed.scheme or 'https'}://{hostname}"
-                
-                async def head_or_get(path: str) -> bool:
-                    try:
-                        r = await client.head(base + path)
-                        if r.status_code == 200:
-                            return True
-                    except Exception:
-                        pass
-                    try:
-                        r2 = await client.get(base + path)
-                        return r2.status_code == 200 and bool(r2.text)
-                    except Exception:
-                        return False
-
-                # llms.txt
-                for p in ("/.well-known/llms.txt", "/llms.txt"):
-                    if await head_or_get(p):
-                        llms_found = True
-                        break
-
-                # AI Manifest
-                for p in ("/.well-known/ai-manifest.json", "/ai-manifest.json"):
-                    if await head_or_get(p):
-                        ai_manifest_found = True
-                        break
+            # All well-known candidates probed concurrently on the canonical origin. A
+            # redirect to some other page (soft 404 to the homepage) does not count.
+            artifact_paths = {
+                "llms": ("/.well-known/llms.txt", "/llms.txt"),
+                "ai_manifest": ("/.well-known/ai-manifest.json", "/ai-manifest.json"),
+                "mcp": ("/.well-known/mcp.json", "/mcp.json"),
+                "openapi": ("/.well-known/openapi.json", "/openapi.json", "/api/openapi.json"),
+            }
+            origin = await resolve_origin(url_str)
+            live = await discover_paths(origin, [p for group in artifact_paths.values() for p in group])
+            live_paths = {urlparse(u).path for u in live}
 
-                # MCP config
-                for p in ("/.well-known/mcp.json", "/mcp.json"):
-                    if await head_or_get(p):
-                        mcp_config_found = True
-                        break
+            def artifact_found(key: str) -> bool:
+                return any(p in live_paths for p in artifact_paths[key])
 
-                # OpenAPI
-                for p in ("/.well-known/openapi.json", "/openapi.json", "/api/openapi.json"):
-                    if await head_or_get(p):
-                        openapi_found = True
-                        break
+            llms_found = artifact_found("llms")
+            ai_manifest_found = artifact_found("ai_manifest")
+            mcp_config_found = artifact_found("mcp")
+            openapi_found = artifact_found("openapi")
         except Exception:
             pass
 
         # On-page meta signals
-        canonical_url = ""
-        try:
-            link_canon = soup.find("link", attrs={"rel": "canonical"})
-            if link_canon and link_canon.get("href"):
-                canonical_url = link_canon.get("href").strip()
-        except Exception:
-            canonical_url = ""
+        canonical_url = signals["canonicalUrl"]
 
-        noindex = False
-        noarchive = False
-        try:
-            robots_meta = soup.find("meta", attrs={"name": "robots"})
-            if robots_meta:
-                rc = (robots_meta.get("content") or "").lower()
-                noindex = "noindex" in rc
-                noarchive = "noarchive" in rc
-        except Exception:
-            pass
-
-        # Detect AI crawler directives in robots.txt (basic string search of downloaded content if available above)
-        ai_crawlers_detected: list[str] = []
-        try:
-            timeout = httpx.Timeout(5.0)
-            async with httpx.AsyncClient(
-                timeout=timeout,
-                headers={"User-Agent": DEFAULT_USER_AGENT},
-                follow_redirects=True,
-            ) as client:
-                robots_url = f"{parsed.scheme or 'https'}://{hostname}/robots.txt"
-                rr = await client.get(robots_url)
-                if rr.status_code == 200 and rr.text:
-                    rlow = rr.text.lower()
-                    ai_keys = [
-                        "gptbot", "anthropic-ai", "anthropic", "perplexity", "perplexitybot", "bingbot", "msnbot",
-                        "google-extended", "ccbot", "facebookexternalhit"
-                    ]
-                    for k in ai_keys:
-                        if k in rlow:
-                            ai_crawlers_detected.append(k)
-        except Exception:
-            pass
+        noindex = signals["noindex"]
+        noarchive = signals["noarchive"]
 
         # Schema completeness (homepage only), reuse simple rules
         schema_completeness = 0
@@ -517,7 +490,7 @@ async def initial_scan(req: ScanRequest):
         agent_readiness = bool(llms_found or ai_manifest_found or mcp_config_found or openapi_found)
 
         # Heuristic score from crawler_service + AI readiness penalties
-        audit = compute_audit_scores(soup, html)
+        audit = signals["auditScores"]
         base_score = int(sum(audit.get(k, 0) for k in ["structure", "structured_data", "content"]) / 3) if audit else 60
         
         # AI Readiness Score Adjustments (stricter evaluation)
@@ -699,6 +672,7 @@ async def initial_scan(req: ScanRequest):
                 "robotsNoindex": noindex,
                 "robotsNoarchive": noarchive,
                 "aiCrawlerDirectives": ai_crawlers_detected,
+                "aiCrawlerAccess": ai_crawler_access_summary,
                 "sitemap": sitemap_found,
                 "sitemapUrls": sitemap_urls,
                 "rssFeed": rss_found,
@@ -727,6 +701,18 @@ async def initial_scan(req: ScanRequest):
             "competitorComparison": comparison_text,
             "crawledAt": now,
         }
+        scan_id = await record_result(
+            hostname, "initial_scan", score,
+            scores={**(audit or {}), "baseScore": base_score, "artifactPenalties": artifact_penalties,
+                    "schemaCompleteness": schema_completeness},
+            artifacts={
+                "schema": schema_found, "robotsTxt": robots_found, "robotsAiOptimized": robots_ai_optimized,
+                "sitemap": sitemap_found, "rssFeed": rss_found, "llmsTxt": llms_found,
+                "aiManifest": ai_manifest_found, "mcpConfig": mcp_config_found, "openApi": openapi_found,
+            },
+            payload=result)
+        if scan_id is not None:
+            result["trend"] = await asyncio.to_thread(get_results_store().trend, hostname, "initial_scan")
         return result
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Initial scan failed: {e}")
@@ -735,7 +721,7 @@ async def initial_scan(req: ScanRequest):
 @router.post("/content/chunks", response_model=ContentChunksResponse)
 async def content_chunks(req: ContentChunksRequest) -> ContentChunksResponse:
     try:
-        markdown, _ = await scrape_markdown(str(req.url))
+        markdown, _ = await scrape_markdown(str(req.url), mode=req.mode)
         chunks = generate_content_chunks(markdown, max_chunks=req.max_chunks)
         return ContentChunksResponse(url=req.url, chunks=chunks)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -757,7 +743,7 @@ async def content_questions(req: QuestionsRequest) -> QuestionsResponse:
 
         markdown_parts = []
         for u in urls:
-            md, _ = await scrape_markdown(u)
+            md, _ = await scrape_markdown(u, mode=req.mode)
             if md:
                 markdown_parts.append(md)
 
@@ -787,25 +773,19 @@ async def review_response(req: ReviewRequest) -> ReviewResponse:
 async def semantic_coverage(req: SemanticCoverageRequest) -> SemanticCoverageResponse:
     try:
         # 1) My content (single page scrape)
-        my_md, _ = await scrape_markdown(str(req.my_url))
+        my_md, _ = await scrape_markdown(str(req.my_url), mode=req.mode)
 
         # 2) Competitors (crawl top_n pages and concatenate markdown)
         comp_map = {}
         for comp_url in req.competitors:
             comp_url_str = str(comp_url)
             host = urlparse(comp_url_str).netloc or comp_url_str
-            pages, _ = await crawl_markdown(comp_url_str, limit=req.top_n)
-            if pages:
-                md_join = "\n\n---\n\n".join(
-                    [p.get("markdown") for p in pages if isinstance(p, dict) and p.get("markdown")]
-                )
-                if not md_join:
-                    # fallback to single page scrape if crawl produced no markdowns
-                    md_single, _ = await scrape_markdown(comp_url_str)
-                    md_join = md_single
-            else:
-                md_single, _ = await scrape_markdown(comp_url_str)
-                md_join = md_single
+            store, _ = await crawl_pages(comp_url_str, limit=req.top_n, mode=req.mode)
+            with store:
+                md_join = store.joined_markdown("\n\n---\n\n", SEMANTIC_COVERAGE_COMPETITOR_CHARS)
+            if not md_join:
+                # fallback to single page scrape if crawl produced no markdowns
+                md_join, _ = await scrape_markdown(comp_url_str, mode=req.mode)
             comp_map[host] = md_join or ""
 
         gaps = semantic_coverage_analysis(my_md, comp_map)
@@ -821,9 +801,13 @@ async def semantic_coverage(req: SemanticCoverageRequest) -> SemanticCoverageRes
 async def topic_recognition_backend(req: dict):
     """
     Lightweight topic recognition without LLM.
-    Input: { url?: str, content?: str, title?: str }
+    Input: { url?: str, content?: str, title?: str, mode?: "page" | "site", limit?: int, pages?: [{url, content}] }
     Produces: primaryTopic, secondaryTopics, industry, contentType, keywords, entities, sentiment, targetAudience, confidence
+    mode="site" builds a TF-IDF model over the crawled pages (or the given pages) and adds
+    siteTopics, pageTopics and keywordClusters; the model is updated incrementally on repeat calls.
     """
+    if isinstance(req, dict) and req.get("mode") == "site":
+        return await _site_topic_recognition(req)
     try:
         url = (req.get("url") if isinstance(req, dict) else None)
         content = (req.get("content") if isinstance(req, dict) else None) or ""
@@ -832,48 +816,35 @@ async def topic_recognition_backend(req: dict):
         # Fetch if no content provided
         if url and not content:
             html = await fetch_html(str(url))
-            soup = BeautifulSoup(html or "", "html.parser")
-            title = title or ((soup.title.string or "").strip() if soup.title and soup.title.string else "")
-            content = soup.get_text(" ", strip=True)[:150000]
+            with stage("parse"):
+                page_title, content = await run_cpu(extract_title_text, html, size_hint=len(html or ""))
+            title = title or page_title
 
         text = f"{title} {content}".strip()
         low = text.lower()
 
-        # Industry heuristics (de/en)
-        industry_map = {
-            "consulting": ["beratung", "unternehmensberatung", "consulting", "strategie", "digitalisierung"],
-            "marketing": ["marketing", "seo", "content", "kampagne", "social media"],
-            "healthcare": ["gesundheit", "klinik", "arzt", "patient", "medical", "pharma"],
-            "ecommerce": ["shop", "e-commerce", "checkout", "produkt", "warenkorb"],
-            "software": ["software", "saas", "plattform", "api", "entwicklung"],
-        }
-        industry = "general"
-        for ind, kws in industry_map.items():
-            if any(k in low for k in kws):
-                industry = ind
-                break
+        # Industry, audience and sentiment heuristics (de/en) in one scan of the text
+        topic_groups = topic_matcher().matched_groups(low)
+        industry = next(
+            (g.split(":", 1)[1] for g in topic_groups if g.startswith("industry:")), "general"
+        )
 
-        # Keywords (very naive frequency, filter stopwords & short tokens)
-        tokens = [t for t in re.findall(r"[A-Za-zÄÖÜäöüß\-]{3,}", text) if len(t) >= 3]
-        stop = set("""und oder der die das mit aus für von sowie the and you your are was were our bei zum zur ein eine eines einem einer ist im in zu auf den dem des als wir sie er es an am vom vom nach bis durch etc http https www com de""".split())
-        tokens_norm = [t.lower() for t in tokens if t.lower() not in stop]
-        top_kw = [w for w, _ in Counter(tokens_norm).most_common(15)]
+        # Keywords (very naive frequency, filter stopwords & short tokens) and capitalized entities
+        with stage("analyze"):
+            top_kw, entity_counts = await run_cpu(page_keywords, text, size_hint=len(text))
 
         # Primary/secondary topic heuristics
         primaryTopic = (top_kw[0] if top_kw else (title.split(" ")[0] if title else "website")).capitalize()
         secondaryTopics = [k.capitalize() for k in top_kw[1:6]]
 
-        # Entities: pick capitalized words as simple entities (very rough)
-        entities_raw = re.findall(r"\b([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]{2,})\b", text)
-        entities = [{"name": e, "type": "keyword"} for e, _ in Counter(entities_raw).most_common(8)]
+        # Entities: capitalized words as simple entities (very rough)
+        entities = [{"name": e, "type": "keyword"} for e, _ in entity_counts]
 
         # Target audience
-        targetAudience = "B2B" if any(k in low for k in ["unternehmen", "kmu", "firma", "business", "b2b"]) else "general"
+        targetAudience = "B2B" if "audience:b2b" in topic_groups else "general"
 
         # Sentiment proxy (not accurate)
-        sentiment = "neutral"
-        if any(k in low for k in ["erfolg", "vorteil", "optimierung", "gewinn", "stark"]):
-            sentiment = "positive"
+        sentiment = "positive" if "sentiment:positive" in topic_groups else "neutral"
 
         # Confidence heuristic
         confidence = 70 if primaryTopic else 50
@@ -892,6 +863,58 @@ async def topic_recognition_backend(req: dict):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Topic recognition failed: {e}")
 
+
+async def _site_topic_recognition(req: dict):
+    url = req.get("url")
+    given = req.get("pages") or []
+    if not url and not given:
+        raise HTTPException(status_code=400, detail="url or pages required for mode=site")
+    store = None
+    try:
+        if given:
+            pages = [
+                (str(p.get("url") or f"page-{i}"), f"{p.get('title') or ''} {p.get('content') or ''}")
+                for i, p in enumerate(given) if isinstance(p, dict)
+            ]
+        else:
+            limit = max(1, min(int(req.get("limit") or 50), 500))
+            # Crawled pages stay in the page store and are streamed, not held as one list
+            store, _ = await crawl_pages(str(url), limit=limit, mode="main")
+            pages = store.texts(with_title=True)
+        site = urlparse(str(url if url else pages[0][0] if pages else "")).netloc or str(url or "pages")
+        result = await site_topic_recognition(site, pages, replace=bool(req.get("replace")))
+
+        top_kw = [t["term"] for t in result["siteTopics"]]
+        matcher = topic_matcher()
+        matched: set[str] = set()
+        for _, text in pages:
+            matched.update(matcher.matched_groups(text.lower()))
+        topic_groups = [g for g in matcher.groups if g in matched]
+        industry = next(
+            (g.split(":", 1)[1] for g in topic_groups if g.startswith("industry:")), "general"
+        )
+        return {
+            "primaryTopic": (top_kw[0] if top_kw else "website").capitalize(),
+            "secondaryTopics": [k.capitalize() for k in top_kw[1:6]],
+            "industry": industry,
+            "contentType": "website",
+            "keywords": top_kw[:10],
+            "sentiment": "positive" if "sentiment:positive" in topic_groups else "neutral",
+            "targetAudience": "B2B" if "audience:b2b" in topic_groups else "general",
+            "confidence": 80 if result["pages"] >= 3 else 60,
+            "mode": "site",
+            **result,
+        }
+    except (Crawl4AINotConfigured, TopicModelNotConfigured) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Topic recognition failed: {e}")
+    finally:
+        if store is not None:
+            store.close()
+
 @router.post("/analysis/content-gap")
 async def content_gap_backend(req: dict):
     """
@@ -913,21 +936,9 @@ async def content_gap_backend(req: dict):
             content = soup.get_text(" ", strip=True)[:200000]
         low = f"{title} {content}".lower()
 
-        # Expected sections/anchors for a small business site (de/en)
-        must_haves = [
-            ("leistungen", ["leistungen", "services", "angebot", "was wir bieten", "solutions"]),
-            ("referenzen", ["referenzen", "kunden", "cases", "fallstudien", "case studies"]),
-            ("über uns", ["über uns", "unternehmen", "team", "wer wir sind", "about"]),
-            ("preise", ["preise", "pricing", "pakete", "kosten"]),
-            ("kontakt", ["kontakt", "contact", "anfrage", "termin", "beraten"]),
-            ("faq", ["faq", "häufige fragen", "fragen und antworten"]),
-            ("blog/news", ["blog", "news", "aktuell", "magazin"]),
-        ]
-
-        missingTopics: list[str] = []
-        for label, kws in must_haves:
-            if not any(k in low for k in kws):
-                missingTopics.append(label)
+        # Expected sections/anchors for a small business site (de/en), one scan for all
+        present = set(content_section_matcher().matched_groups(low))
+        missingTopics: list[str] = [label for label in CONTENT_SECTIONS if label not in present]
 
         # Missing questions heuristic
         default_questions = [
@@ -993,20 +1004,6 @@ async def nap_audit(req: NAPAuditRequest) -> NAPAuditResponse:
     
     try:
         base_url = str(req.url).rstrip("/")
-        parsed = urlparse(base_url)
-        hostname = parsed.netloc
-        scheme = parsed.scheme or "https"
-        
-        # Handle www/non-www variants
-        if hostname.startswith("www."):
-            hostname_alt = hostname[4:]
-        else:
-            hostname_alt = f"www.{hostname}"
-        
-        bases = [
-            f"{scheme}://{hostname}",
-            f"{scheme}://{hostname_alt}",
-        ]
         
         # Common NAP page paths - prioritize impressum/contact pages
         nap_paths = [
@@ -1021,24 +1018,16 @@ async def nap_audit(req: NAPAuditRequest) -> NAPAuditResponse:
             "",  # Homepage last
         ]
         
-        # Build full URL list
-        nap_pages = []
-        for base in bases:
-            for path in nap_paths:
-                nap_pages.append(f"{base}{path}")
+        # Canonical host (www/non-www resolved once), concurrent probes for the paths that exist
+        origin, nap_pages = await resolve_site_pages(base_url, nap_paths)
+        if not nap_pages:
+            nap_pages = [f"{origin}{path}" for path in nap_paths]
         
         # Collect markdown from all accessible pages
         all_nap_sections = []
         scanned_pages = []
         
-        # NAP-relevant keywords to look for
-        nap_keywords = [
-            "impressum", "kontakt", "contact", "address", "adresse",
-            "telefon", "phone", "email", "e-mail", "gmbh", "ug", "ag", "inc", "ltd",
-            "geschäftsführer", "managing director", "ceo", "inhaber",
-            "straße", "street", "plz", "postleitzahl", "berlin", "münchen", "hamburg"
-        ]
-        
+        nap_markdowns: list[tuple[str, str]] = []
         for page_url in nap_pages:
             if len(scanned_pages) >= 5:  # Limit to 5 pages
                 break
@@ -1049,43 +1038,54 @@ async def nap_audit(req: NAPAuditRequest) -> NAPAuditResponse:
                     md_lower = md.lower()
                     
                     # Check if this page has NAP-relevant content
-                    has_nap_content = any(k in md_lower for k in nap_keywords)
+                    has_nap_content = nap_matcher().contains_any(md_lower)
                     
                     if has_nap_content:
                         scanned_pages.append(page_url)
-                        
-                        # Extract the most relevant NAP section (around impressum/kontakt keywords)
-                        nap_section = ""
-                        for keyword in ["impressum", "kontakt", "contact", "imprint", "about us", "über uns"]:
-                            idx = md_lower.find(keyword)
-                            if idx >= 0:
-                                # Extract 4000 chars around the keyword
-                                start = max(0, idx - 500)
-                                end = min(len(md), idx + 3500)
-                                section = md[start:end]
-                                if len(section) > len(nap_section):
-                                    nap_section = section
-                        
-                        if not nap_section:
-                            # Take first 4000 chars if no keyword found
-                            nap_section = md[:4000]
-                        
-                        all_nap_sections.append(f"--- PAGE: {page_url} ---\n{nap_section}")
+                        nap_markdowns.append((page_url, md))
                         
             except Exception:
                 continue
         
+        nap_windows: list[tuple[str, str]] = []
+        for page_url, md in nap_markdowns:
+            md_lower = md.lower()
+            
+            # Extract the most relevant NAP section (around impressum/kontakt keywords)
+            nap_section = ""
+            for keyword in ["impressum", "kontakt", "contact", "imprint", "about us", "über uns"]:
+                idx = md_lower.find(keyword)
+                if idx >= 0:
+                    # Extract 4000 chars around the keyword
+                    start = max(0, idx - 500)
+                    end = min(len(md), idx + 3500)
+                    section = md[start:end]
+                    if len(section) > len(nap_section):
+                        nap_section = section
+            
+            if not nap_section:
+                # Take first 4000 chars if no keyword found
+                nap_section = md[:4000]
+            
+            nap_windows.append((page_url, nap_section))
+        
+        # Windows first, then dedup: a shared header/footer block (often the NAP block
+        # itself) survives once, in the highest-priority window that contains it - not on
+        # a page whose window ends before its footer.
+        deduped_windows, _ = dedupe_pages(nap_windows)
+        for page_url, nap_section in deduped_windows:
+            if nap_section:
+                all_nap_sections.append(f"--- PAGE: {page_url} ---\n{nap_section}")
+        
         if not all_nap_sections:
             # Fallback: try homepage
-            for base in bases:
-                try:
-                    md, _ = await scrape_markdown(base)
-                    if md:
-                        all_nap_sections = [md[:5000]]
-                        scanned_pages = [base]
-                        break
-                except Exception:
-                    continue
+            try:
+                md, _ = await scrape_markdown(origin)
+                if md:
+                    all_nap_sections = [md[:5000]]
+                    scanned_pages = [origin]
+            except Exception:
+                pass
         
         if not all_nap_sections:
             return NAPAuditResponse(nap=NAPData(
@@ -1138,33 +1138,11 @@ async def schema_audit_backend(req: dict):
             if not url:
                 raise HTTPException(status_code=400, detail="Provide 'url' or 'html'.")
             html = await fetch_html(str(url))
-        soup = BeautifulSoup(html or "", "html.parser")
-
-        raw_schemas = []
-        for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
-            try:
-                raw_schemas.append(json.loads(script.string or "null"))
-            except Exception:
-                continue
-
-        def collect_types(obj):
-            types: list[str] = []
-            if isinstance(obj, dict):
-                t = obj.get("@type")
-                if isinstance(t, str):
-                    types.append(t)
-                elif isinstance(t, list):
-                    types += [x for x in t if isinstance(x, str)]
-                for v in obj.values():
-                    types += collect_types(v)
-            elif isinstance(obj, list):
-                for it in obj:
-                    types += collect_types(it)
-            return types
 
+        raw_schemas = extract_jsonld(html or "")
         found_types: list[str] = []
         for rs in raw_schemas:
-            found_types += collect_types(rs)
+            found_types += collect_schema_types(rs)
         found_types = list(dict.fromkeys(found_types))
 
         # Basic required/recommended sets for common types
@@ -1239,145 +1217,86 @@ async def schema_audit_backend(req: dict):
 async def schema_audit_multi_page(req: dict):
     """
     Multi-page schema audit: scans multiple pages on a domain for JSON-LD.
-    Accepts body: { "url": str, "max_pages": int (default 10) }
+    Accepts body: { "url": str, "max_pages": int (default 10), "sitemap": str | [str] (optional),
+                    "incremental": bool (optional) }
+    With a sitemap (or a url ending in .xml) the candidates are the sitemap's pages,
+    otherwise a list of important paths. Candidates are fetched concurrently until
+    max_pages pages have been analysed.
+    Per-page results are stored; with incremental=true pages unchanged since the last
+    audit of the site reuse them and only changed pages are fetched and analysed again.
     Returns per-page schema data and aggregate recommendations.
     """
     try:
         url = (req.get("url") if isinstance(req, dict) else None)
         max_pages = (req.get("max_pages") if isinstance(req, dict) else 10) or 10
-        
-        if not url:
-            raise HTTPException(status_code=400, detail="Provide 'url'.")
-        
-        base_url = str(url).rstrip("/")
-        parsed = urlparse(base_url)
-        hostname = parsed.netloc
-        scheme = parsed.scheme or "https"
-        
-        # Handle www/non-www
-        if hostname.startswith("www."):
-            hostname_alt = hostname[4:]
-        else:
-            hostname_alt = f"www.{hostname}"
-        
-        bases = [f"{scheme}://{hostname}", f"{scheme}://{hostname_alt}"]
-        
-        # Important pages to check
-        page_paths = [
-            "",  # Homepage
-            "/impressum",
-            "/kontakt",
-            "/contact",
-            "/about",
-            "/ueber-uns",
-            "/leistungen",
-            "/services",
-            "/produkte",
-            "/products",
-            "/blog",
-            "/news",
-            "/faq",
-        ]
-        
-        # Build URL list
-        pages_to_check = []
-        for base in bases:
-            for path in page_paths:
-                pages_to_check.append(f"{base}{path}")
-        
-        # Schema rules
-        rules = {
-            "Organization": {"required": ["name"], "recommended": ["url", "logo", "sameAs", "contactPoint"]},
-            "LocalBusiness": {"required": ["name", "address"], "recommended": ["telephone", "openingHours", "geo"]},
-            "Product": {"required": ["name"], "recommended": ["description", "brand", "offers", "image"]},
-            "Service": {"required": ["name"], "recommended": ["description", "provider", "areaServed"]},
-            "FAQPage": {"required": ["mainEntity"], "recommended": []},
-            "Article": {"required": ["headline"], "recommended": ["author", "datePublished", "image"]},
-            "BlogPosting": {"required": ["headline"], "recommended": ["author", "datePublished"]},
-            "WebPage": {"required": ["name"], "recommended": ["description", "breadcrumb"]},
-            "BreadcrumbList": {"required": ["itemListElement"], "recommended": []},
-            "ContactPage": {"required": [], "recommended": ["name", "description"]},
-        }
+        sitemaps = req.get("sitemap") if isinstance(req, dict) else None
+        incremental = bool(req.get("incremental")) if isinstance(req, dict) else False
+        
+        if not url and not sitemaps:
+            raise HTTPException(status_code=400, detail="Provide 'url' or 'sitemap'.")
+        max_pages = max(1, min(int(max_pages), SCHEMA_AUDIT_MAX_PAGES))
+        
+        if isinstance(sitemaps, str):
+            sitemaps = [sitemaps]
+        sitemaps = [str(s) for s in (sitemaps or [])]
+        if url and str(url).lower().split("?", 1)[0].endswith(".xml"):
+            sitemaps.append(str(url))
+            url = None
+        base_url = str(url or sitemaps[0]).rstrip("/")
+        
+        pages_to_check: list[str] = []
+        lastmods: dict[str, str] = {}
+        for sm in sitemaps:
+            # Over-fetch: some sitemap entries redirect onto each other or are gone
+            entries = await _enumerate_sitemap_entries(sm, max_urls=max_pages * 2, sitemap_url=sm)
+            pages_to_check += [u for u, _ in entries]
+            lastmods.update(lastmod_map(entries))
+        
+        if not pages_to_check:
+            # Important pages to check
+            page_paths = [
+                "",  # Homepage
+                "/impressum",
+                "/kontakt",
+                "/contact",
+                "/about",
+                "/ueber-uns",
+                "/leistungen",
+                "/services",
+                "/produkte",
+                "/products",
+                "/blog",
+                "/news",
+                "/faq",
+            ]
+            # Canonical host once, then only candidate paths that answer 200
+            origin, pages_to_check = await resolve_site_pages(base_url, page_paths)
+            if not pages_to_check:
+                pages_to_check = [f"{origin}{path}" for path in page_paths]
+        
+        rules = SCHEMA_RULES
+        
+        audit_run = IncrementalAudit("schema", base_url, incremental=incremental, lastmods=lastmods)
+        pages = await audit_pages(pages_to_check, rules, max_pages, allowed=get_scheduler().allowed,
+                                  audit_run=audit_run)
+        incremental_summary = await audit_run.finish()
         
         per_page_results = []
         all_types_found = set()
-        all_schemas = []
-        scanned_count = 0
-        
-        for page_url in pages_to_check:
-            if scanned_count >= max_pages:
-                break
-                
-            try:
-                html = await fetch_html(page_url)
-                if not html or len(html) < 100:
-                    continue
-                    
-                scanned_count += 1
-                soup = BeautifulSoup(html, "html.parser")
-                
-                # Extract JSON-LD
-                page_schemas = []
-                page_types = []
-                
-                for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
-                    try:
-                        schema_data = json.loads(script.string or "null")
-                        if schema_data:
-                            page_schemas.append(schema_data)
-                            
-                            # Collect types
-                            def get_types(obj):
-                                types = []
-                                if isinstance(obj, dict):
-                                    t = obj.get("@type")
-                                    if isinstance(t, str):
-                                        types.append(t)
-                                    elif isinstance(t, list):
-                                        types.extend([x for x in t if isinstance(x, str)])
-                                    for v in obj.values():
-                                        types.extend(get_types(v))
-                                elif isinstance(obj, list):
-                                    for item in obj:
-                                        types.extend(get_types(item))
-                                return types
-                            
-                            page_types.extend(get_types(schema_data))
-                    except Exception:
-                        continue
-                
-                page_types = list(dict.fromkeys(page_types))
-                all_types_found.update(page_types)
-                all_schemas.extend(page_schemas)
-                
-                # Analyze completeness per type
-                type_analysis = []
-                for t in page_types:
-                    r = rules.get(t)
-                    if r:
-                        # Check properties in HTML (simple heuristic)
-                        missing_req = [k for k in r["required"] if k.lower() not in html.lower()]
-                        missing_rec = [k for k in r["recommended"] if k.lower() not in html.lower()]
-                        comp = max(0, 100 - (len(missing_req) * 40 + len(missing_rec) * 10))
-                        type_analysis.append({
-                            "type": t,
-                            "completeness": comp,
-                            "missingRequired": missing_req,
-                            "missingRecommended": missing_rec,
-                        })
-                
-                per_page_results.append({
-                    "url": page_url,
-                    "schemasFound": len(page_schemas),
-                    "types": page_types,
-                    "typeAnalysis": type_analysis,
-                    "hasLocalBusiness": "LocalBusiness" in page_types,
-                    "hasOrganization": "Organization" in page_types,
-                    "hasFAQ": "FAQPage" in page_types,
-                })
-                
-            except Exception:
-                continue
+        for page in pages:
+            page_types = page["types"]
+            all_types_found.update(page_types)
+            per_page_results.append({
+                "url": page["url"],
+                "schemasFound": len(page["schemas"]),
+                "microdataItems": len(page["microdata"]),
+                "types": page_types,
+                "typeAnalysis": page["typeAnalysis"],
+                "hasLocalBusiness": "LocalBusiness" in page_types,
+                "hasOrganization": "Organization" in page_types,
+                "hasFAQ": "FAQPage" in page_types,
+            })
+        scanned_count = len(per_page_results)
         
         # Aggregate analysis
         all_types_list = list(all_types_found)
@@ -1425,15 +1344,23 @@ async def schema_audit_multi_page(req: dict):
                 "pages": ["/faq", "/"]
             })
         
-        return {
+        response = {
             "pagesScanned": scanned_count,
             "perPageResults": per_page_results,
             "allTypesFound": all_types_list,
             "missingImportant": missing_important,
             "overallScore": overall_score,
             "recommendations": recommendations,
-            "summary": f"Scanned {scanned_count} pages. Found {len(all_types_list)} schema types. Overall completeness: {overall_score}%."
+            "summary": f"Scanned {scanned_count} pages. Found {len(all_types_list)} schema types. Overall completeness: {overall_score}%.",
+            "incremental": incremental_summary,
         }
+        await record_result(
+            base_url, "schema_audit", overall_score,
+            scores={"pagesScanned": scanned_count, "typesFound": len(all_types_list),
+                    "missingImportant": len(missing_important)},
+            artifacts={t: t in all_types_found for t in important_types},
+            payload=response)
+        return response
         
     except HTTPException:
         raise
@@ -1441,6 +1368,76 @@ async def schema_audit_multi_page(req: dict):
         raise HTTPException(status_code=502, detail=f"Multi-page schema audit failed: {e}")
 
 
+@router.post("/analysis/schema-inventory")
+async def schema_inventory(req: dict):
+    """
+    Sitewide schema inventory, streamed as NDJSON (one JSON object per line).
+    Accepts body: { "url": str, "sitemap"?: str | [str], "max_pages"?: int (default 1000),
+                    "concurrency"?: int, "include_pages"?: bool (default true), "progress_every"?: int (default 50) }
+    Pages come from the sitemap(s) and are fetched concurrently. Lines:
+      {"event": "start", "root", "candidates"}
+      {"event": "page", "url", "template", "types", "completeness"}   (include_pages)
+      {"event": "progress", ...aggregate}                            (every progress_every pages)
+      {"event": "done", ...aggregate}  or  {"event": "error", "detail"}
+    The aggregate holds type coverage, the type x page-template coverage matrix and
+    per-type completeness distributions.
+    """
+    url = (req.get("url") if isinstance(req, dict) else None)
+    sitemaps = req.get("sitemap") if isinstance(req, dict) else None
+    if not url and not sitemaps:
+        raise HTTPException(status_code=400, detail="Provide 'url' or 'sitemap'.")
+    try:
+        max_pages = max(1, min(int(req.get("max_pages") or 1000), SCHEMA_INVENTORY_MAX_PAGES))
+        concurrency = int(req.get("concurrency") or 0) or None
+        progress_every = max(1, int(req.get("progress_every") or 50))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'max_pages', 'concurrency' and 'progress_every' must be integers.")
+    include_pages = bool(req.get("include_pages", True))
+
+    url_str = str(url or "").strip()
+    if url_str and not url_str.startswith(("http://", "https://")):
+        url_str = "https://" + url_str
+    if isinstance(sitemaps, str):
+        sitemaps = [sitemaps]
+    sitemaps = [str(sm) for sm in (sitemaps or [])]
+    if url_str.lower().split("?", 1)[0].endswith(".xml"):
+        sitemaps.append(url_str)
+    root = url_str or sitemaps[0]
+
+    def line(obj: dict) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async def stream():
+        try:
+            candidates: list[str] = []
+            for sm in sitemaps or [None]:
+                candidates += await _enumerate_sitemap_urls(root, max_urls=max_pages, sitemap_url=sm)
+            candidates = list(dict.fromkeys(candidates))[:max_pages]
+            if not candidates:
+                origin = await resolve_origin(root)
+                candidates = [origin + "/"]
+            yield line({"event": "start", "root": root, "candidates": len(candidates)})
+
+            inventory = SchemaInventory()
+            pages = iter_audit_pages(candidates, SCHEMA_RULES, max_pages,
+                                     allowed=get_scheduler().allowed, concurrency=concurrency,
+                                     transform=SchemaInventory.summarize)
+            async for _, _, page in pages:
+                if page is None:
+                    inventory.fail()
+                    continue
+                summary = inventory.add(page)
+                if include_pages:
+                    yield line({"event": "page", **summary})
+                if inventory.pages % progress_every == 0:
+                    yield line({"event": "progress", **inventory.snapshot()})
+            yield line({"event": "done", "root": root, **inventory.snapshot()})
+        except Exception as e:
+            yield line({"event": "error", "detail": f"Schema inventory failed: {e}"})
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/analysis/fact-check", response_model=FactCheckResponse)
 async def fact_check(req: FactCheckRequest) -> FactCheckResponse:
     try:
@@ -1508,7 +1505,7 @@ async def generation_jsonld(req: JSONLDGenerateRequest) -> JSONLDGenerateRespons
 @router.post("/generation/openapi", response_model=OpenAPIGenerateResponse)
 async def generation_openapi(req: OpenAPIGenerateRequest) -> OpenAPIGenerateResponse:
     try:
-        md, _ = await scrape_markdown(str(req.url))
+        md, _ = await scrape_markdown(str(req.url), mode="main")
         spec = generate_openapi_from_markdown(md)
         return OpenAPIGenerateResponse(openapi=spec)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -1522,7 +1519,7 @@ async def generation_openapi(req: OpenAPIGenerateRequest) -> OpenAPIGenerateResp
 @router.post("/generation/rss", response_model=RSSGenerateResponse)
 async def generation_rss(req: RSSGenerateRequest) -> RSSGenerateResponse:
     try:
-        md, _ = await scrape_markdown(str(req.url))
+        md, _ = await scrape_markdown(str(req.url), mode="main")
         rss = generate_rss_from_markdown(md)
         return RSSGenerateResponse(rss=rss)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -1564,7 +1561,7 @@ async def generation_sitemap(req: SitemapGenerateRequest) -> SitemapGenerateResp
 @router.post("/generation/mcp-config", response_model=MCPConfigGenerateResponse)
 async def generation_mcp_config(req: MCPConfigGenerateRequest) -> MCPConfigGenerateResponse:
     try:
-        md, _ = await scrape_markdown(str(req.url))
+        md, _ = await scrape_markdown(str(req.url), mode="main")
         cfg = generate_mcp_config_from_markdown(md)
         return MCPConfigGenerateResponse(config=cfg)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -1578,7 +1575,7 @@ async def generation_mcp_config(req: MCPConfigGenerateRequest) -> MCPConfigGener
 @router.post("/generation/ai-manifest", response_model=AIManifestGenerateResponse)
 async def generation_ai_manifest(req: AIManifestGenerateRequest) -> AIManifestGenerateResponse:
     try:
-        md, _ = await scrape_markdown(str(req.url))
+        md, _ = await scrape_markdown(str(req.url), mode="main")
         manifest = generate_ai_manifest_from_markdown(md)
         return AIManifestGenerateResponse(manifest=manifest)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -1596,7 +1593,7 @@ async def generation_llms_txt(req: LlmsTxtGenerateRequest) -> LlmsTxtGenerateRes
     llms.txt describes how LLMs should interact with the site content.
     """
     try:
-        md, _ = await scrape_markdown(str(req.url))
+        md, _ = await scrape_markdown(str(req.url), mode="main")
         llms_txt = generate_llms_txt_from_markdown(md)
         return LlmsTxtGenerateResponse(llms_txt=llms_txt)
     except (Crawl4AINotConfigured, GeminiNotConfigured) as e:
@@ -1608,9 +1605,9 @@ async def generation_llms_txt(req: LlmsTxtGenerateRequest) -> LlmsTxtGenerateRes
     
     
 # --- URL enumeration (sitemap + crawl fallback) ---
-async def _fetch_text(client: httpx.AsyncClient, url: str) -> str:
+async def _fetch_text(url: str) -> str:
     try:
-        r = await client.get(url)
+        r = await cached_get(url, timeout=httpx.Timeout(10.0))
         if r.status_code == 200:
             return r.text or ""
     except Exception:
@@ -1618,57 +1615,60 @@ async def _fetch_text(client: httpx.AsyncClient, url: str) -> str:
     return ""
     
     
-async def _enumerate_sitemap_urls(root_url: str, max_urls: int = 1000) -> list[str]:
+async def _enumerate_sitemap_urls(root_url: str, max_urls: int = 1000, sitemap_url: str | None = None) -> list[str]:
+    return [u for u, _ in await _enumerate_sitemap_entries(root_url, max_urls, sitemap_url)]
+
+
+async def _enumerate_sitemap_entries(
+    root_url: str, max_urls: int = 1000, sitemap_url: str | None = None
+) -> list[tuple[str, str | None]]:
+    """(url, lastmod) pairs of the site's sitemap(s); lastmod is None when not given."""
     parsed = urlparse(root_url)
     scheme = parsed.scheme or "https"
     host = parsed.netloc or parsed.path
-    base_sitemap = f"{scheme}://{host}/sitemap.xml"
+    base_sitemap = sitemap_url or f"{scheme}://{host}/sitemap.xml"
     
-    urls: list[str] = []
+    urls: list[tuple[str, str | None]] = []
     seen: set[str] = set()
     to_visit: list[str] = [base_sitemap]
     visited: set[str] = set()
     
-    timeout = httpx.Timeout(10.0)
-    async with httpx.AsyncClient(
-        timeout=timeout,
-        headers={"User-Agent": DEFAULT_USER_AGENT},
-        follow_redirects=True,
-    ) as client:
-        while to_visit and len(urls) < max_urls:
-            sm_url = to_visit.pop(0)
-            if sm_url in visited:
-                continue
-            visited.add(sm_url)
-            xml = await _fetch_text(client, sm_url)
-            if not xml:
-                continue
-            soup = BeautifulSoup(xml, "xml")
-            
-            # sitemap index
-            if soup.find("sitemapindex"):
-                for sm in soup.find_all("sitemap"):
-                    loc = sm.find("loc")
-                    if loc and loc.text:
-                        loc_text = loc.text.strip()
-                        if loc_text not in visited:
-                            to_visit.append(loc_text)
-                continue
-            
-            # urlset
-            if soup.find("urlset"):
-                for u in soup.find_all("url"):
-                    loc = u.find("loc")
-                    if not loc or not loc.text:
-                        continue
+    while to_visit and len(urls) < max_urls:
+        sm_url = to_visit.pop(0)
+        if sm_url in visited:
+            continue
+        visited.add(sm_url)
+        xml = await _fetch_text(sm_url)
+        if not xml:
+            continue
+        soup = BeautifulSoup(xml, "xml")
+        
+        # sitemap index
+        if soup.find("sitemapindex"):
+            for sm in soup.find_all("sitemap"):
+                loc = sm.find("loc")
+                if loc and loc.text:
                     loc_text = loc.text.strip()
-                    loc_parsed = urlparse(loc_text)
-                    if (loc_parsed.netloc or loc_parsed.path).endswith(host):
-                        if loc_text not in seen:
-                            seen.add(loc_text)
-                            urls.append(loc_text)
-                            if len(urls) >= max_urls:
-                                break
+                    if loc_text not in visited:
+                        to_visit.append(loc_text)
+            continue
+        
+        # urlset
+        if soup.find("urlset"):
+            for u in soup.find_all("url"):
+                loc = u.find("loc")
+                if not loc or not loc.text:
+                    continue
+                loc_text = loc.text.strip()
+                loc_parsed = urlparse(loc_text)
+                if (loc_parsed.netloc or loc_parsed.path).endswith(host):
+                    if loc_text not in seen:
+                        seen.add(loc_text)
+                        lastmod = u.find("lastmod")
+                        lastmod_text = lastmod.text.strip() if lastmod and lastmod.text else ""
+                        urls.append((loc_text, lastmod_text or None))
+                        if len(urls) >= max_urls:
+                            break
     return urls[:max_urls]
     
     
@@ -1726,32 +1726,30 @@ async def list_site_urls(req: URLListRequest) -> URLListResponse:
         
         # 2) Crawl fallback
         try:
-            pages, raw = await crawl_markdown(url_str, limit=min(req.max_urls, 500))
+            # Only URLs are needed: page markdown stays compressed in the store and is dropped
+            store, raw = await crawl_pages(url_str, limit=min(req.max_urls, 500), skip_duplicates=False)
+            with store:
+                crawled_urls = store.urls()
             extracted = _extract_urls_from_crawl4ai_raw(raw if isinstance(raw, dict) else {}, root_host, req.max_urls)
             
-            # Fallback: collect URLs directly from normalized pages list if present
-            if not extracted and isinstance(pages, list):
-                try:
-                    page_urls: list[str] = []
-                    seen: set[str] = set()
-                    for p in pages:
-                        if isinstance(p, dict):
-                            u = p.get("url")
-                            if isinstance(u, str) and u.startswith("http"):
-                                vp = urlparse(u)
-                                if (vp.netloc or vp.path).endswith(root_host) and u not in seen:
-                                    seen.add(u)
-                                    page_urls.append(u)
-                                    if len(page_urls) >= req.max_urls:
-                                        break
-                    extracted = page_urls
-                except Exception:
-                    pass
+            # Fallback: collect URLs directly from the crawled pages
+            if not extracted:
+                page_urls: list[str] = []
+                seen: set[str] = set()
+                for u in crawled_urls:
+                    if u.startswith("http"):
+                        vp = urlparse(u)
+                        if (vp.netloc or vp.path).endswith(root_host) and u not in seen:
+                            seen.add(u)
+                            page_urls.append(u)
+                            if len(page_urls) >= req.max_urls:
+                                break
+                extracted = page_urls
             
             if extracted:
                 return URLListResponse(root=url_str, count=len(extracted), urls=extracted, source="crawl")
             # If we can't extract URLs, at least return a count based on page docs
-            return URLListResponse(root=url_str, count=len(pages), urls=[], source="crawl")
+            return URLListResponse(root=url_str, count=len(crawled_urls), urls=[], source="crawl")
         except Crawl4AINotConfigured as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -1760,64 +1758,328 @@ async def list_site_urls(req: URLListRequest) -> URLListResponse:
         raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"URL listing failed: {e}")
+
+
+@router.post("/analysis/robots-access")
+async def robots_access(req: dict):
+    """
+    Evaluate robots.txt for AI crawlers (or given agents) against site paths.
+    Body: { "url": str, "agents"?: list[str], "paths"?: list[str], "use_sitemap"?: bool (default true), "max_paths"?: int }
+    Paths default to the sitemap URLs (up to max_paths, default 500), else the homepage.
+    Returns per-agent allowed/blocked counts and the path x agent matrix.
+    """
+    try:
+        url_str = str(req.get("url") or "").strip()
+        if not url_str:
+            raise HTTPException(status_code=400, detail="Provide 'url'.")
+        if not url_str.startswith(("http://", "https://")):
+            url_str = "https://" + url_str
+        parsed = urlparse(url_str)
+        host = parsed.netloc or parsed.path
+        agents = [a for a in (req.get("agents") or AI_CRAWLERS) if isinstance(a, str) and a.strip()]
+        max_paths = max(1, min(int(req.get("max_paths") or 500), 5000))
+
+        paths: list[str] = [p for p in (req.get("paths") or []) if isinstance(p, str)][:max_paths]
+        source = "request"
+        if not paths and req.get("use_sitemap", True):
+            try:
+                paths = await _enumerate_sitemap_urls(url_str, max_urls=max_paths)
+                source = "sitemap"
+            except Exception:
+                paths = []
+        if not paths:
+            paths = [parsed.path or "/"]
+            source = "homepage"
+
+        robots_url = f"{parsed.scheme or 'https'}://{host}/robots.txt"
+        rules = None
+        try:
+            r = await cached_get(robots_url, timeout=httpx.Timeout(5.0))
+            if r.status_code == 200:
+                rules = get_robots_rules(host, r.text or "")
+        except Exception:
+            rules = None
+
+        matrix = rules.access_matrix(agents, paths) if rules else {p: {a: True for a in agents} for p in paths}
+        return {
+            "root": url_str,
+            "robotsFound": rules is not None,
+            "explicitAgents": rules.explicit_agents if rules else [],
+            "sitemaps": rules.sitemaps if rules else [],
+            "pathSource": source,
+            "pathsEvaluated": len(paths),
+            "agents": ai_crawler_access(rules, paths, agents),
+            "matrix": [{"path": p, "access": access} for p, access in matrix.items()],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"robots.txt evaluation failed: {e}")
+
     
+def _scan_result(result: dict | None) -> dict | None:
+    """A stored scan result that ran the LLM stages (duplicates only store a fingerprint)."""
+    return result if result is not None and "chunks_ok" in result else None
+
+
 @router.post("/scan/batch")
 async def scan_batch(req: dict):
     """
     Batch page-level processing for depth selector.
-    Body: { "url": str, "max_pages": int }
+    Body: { "url": str, "max_pages": int, "crawl_id": str (optional), "incremental": bool (optional) }
     Returns summary counts and small sample.
+    Progress is kept in the crawl frontier: re-sending the crawl_id of an interrupted or
+    paused scan continues it where it stopped (also from another worker).
+    Every scan stores per-page results; with incremental=true pages whose sitemap
+    lastmod, HTTP validators or main-content hash are unchanged since the previous scan
+    of the site reuse their stored result instead of running the LLM stages again.
     """
     try:
         url_str = str(req.get("url"))
         if not url_str.startswith(("http://", "https://")):
             url_str = "https://" + url_str
         max_pages = int(req.get("max_pages") or 40)
-
-        try:
-            urls = await _enumerate_sitemap_urls(url_str, max_urls=max_pages if max_pages > 0 else 500)
-            if not urls:
-                urls = [url_str]
-            else:
-                urls = urls[:max_pages]
-        except Exception:
-            urls = [url_str]
-
-        processed = 0
-        chunks_ok = 0
-        nap_ok = 0
-        errors: list[str] = []
-        samples: list[dict] = []
-        for u in urls:
+        crawl_id = req.get("crawl_id") or None
+        incremental = bool(req.get("incremental"))
+
+        frontier, resumed = await asyncio.to_thread(
+            start_crawl, "scan", url_str, {"max_pages": max_pages, "incremental": incremental}, crawl_id)
+        # Pagination, print views, archives and locale copies would each cost two LLM calls
+        near_dupes = SimHashIndex()
+        if resumed:
+            await asyncio.to_thread(restore_pages, frontier, None, near_dupes)
+        else:
             try:
-                md, _ = await scrape_markdown(u)
-                chunks = generate_content_chunks(md, max_chunks=6)
-                if chunks:
-                    chunks_ok += 1
-                nap = extract_nap_json(md)
-                if isinstance(nap, dict):
-                    nap_ok += 1
-                processed += 1
-                if len(samples) < 3:
-                    samples.append({"url": u, "chunks_preview": chunks[:2], "nap": nap})
-            except Exception as e:
-                errors.append(f"{u}: {e}")
-
-        return {
+                entries = await _enumerate_sitemap_entries(url_str, max_urls=max_pages if max_pages > 0 else 500)
+            except Exception:
+                entries = []
+            entries = entries[:max_pages] or [(url_str, None)]
+            urls = [u for u, _ in entries]
+            # Sitemap lastmods travel with the queued URLs for the incremental checks
+            await asyncio.to_thread(frontier.push, urls, 0, None, lastmod_map(entries))
+            await asyncio.to_thread(frontier.update_stats, total_discovered=len(urls))
+
+        scheduler = get_scheduler()
+        info = await asyncio.to_thread(frontier.info)
+        samples_left = 3 - len(info["stats"].get("sample", []))
+        incremental = bool(info["params"].get("incremental"))
+        audit = IncrementalAudit("scan", info["seed"], incremental=incremental, started=info["createdAt"])
+        try:
+            while await asyncio.to_thread(frontier.state) == "running":
+                claimed = await asyncio.to_thread(frontier.claim, 1)
+                if not claimed:
+                    break
+                entry = claimed[0]
+                u = entry.url
+                try:
+                    if not await scheduler.allowed(u):
+                        await asyncio.to_thread(frontier.skip, entry.seq, "robots")
+                        continue
+                    check = await audit.check(u, entry.lastmod)
+                    # Only results of pages that went through the LLM stages can be reused
+                    stored = _scan_result(check.reusable())
+                    digest = None
+                    if stored is not None:
+                        fingerprint = stored["fingerprint"]
+                    else:
+                        # Chunking only needs page content; NAP extraction needs the footer too.
+                        # Both variants come from one cached scrape.
+                        md, _ = await scrape_markdown(u, mode="full")
+                        main_md, _ = await scrape_markdown(u, mode="main")
+                        fingerprint = simhash(main_md)
+                        digest = content_hash(main_md)
+                        stored = _scan_result(check.reusable(digest))
+                    if near_dupes.add_fingerprint(u, fingerprint) is not None:
+                        await asyncio.to_thread(frontier.complete, entry.seq, fingerprint=fingerprint, note="duplicate")
+                        if stored is not None:
+                            await audit.keep(check)
+                        else:
+                            await audit.record(check, digest, {"fingerprint": fingerprint})
+                        continue
+                    if stored is not None:
+                        result = stored
+                        await audit.keep(check)
+                    else:
+                        chunks = generate_content_chunks(main_md, max_chunks=6)
+                        nap = extract_nap_json(md)
+                        result = {
+                            "fingerprint": fingerprint,
+                            "chunks_ok": bool(chunks),
+                            "nap_ok": isinstance(nap, dict),
+                            "sample": {"url": u, "chunks_preview": chunks[:2], "nap": nap},
+                        }
+                        await audit.record(check, digest, result)
+                    sample = [result["sample"]] if samples_left > 0 else []
+                    samples_left -= len(sample)
+                    await asyncio.to_thread(
+                        frontier.update_stats, processed=1, chunks_ok=int(result["chunks_ok"]),
+                        nap_ok=int(result["nap_ok"]), unchanged=int(stored is not None), sample=sample)
+                    await asyncio.to_thread(frontier.complete, entry.seq, fingerprint=fingerprint)
+                except Exception as e:
+                    await asyncio.to_thread(frontier.fail, entry.seq, f"{u}: {e}")
+        except BaseException:
+            frontier.release()
+            raise
+
+        state = await asyncio.to_thread(frontier.finish)
+        info = await asyncio.to_thread(frontier.info)
+        robots_blocked = [u for u, _ in await asyncio.to_thread(frontier.notes, SKIPPED)]
+        errors = [note for _, note in await asyncio.to_thread(frontier.notes, FAILED)]
+        if crawl_id is None and state == "done":
+            await asyncio.to_thread(frontier.discard)
+        stats = info["stats"]
+        # A finished scan covers the site: forget pages that are no longer part of it
+        removed = (await audit.finish())["removed"] if state == "done" else 0
+
+        clusters = near_dupes.clusters()
+        dup_finding = duplicate_cluster_finding(clusters)
+
+        response = {
             "root": url_str,
-            "total_discovered": len(urls),
-            "processed": processed,
-            "chunks_ok": chunks_ok,
-            "nap_ok": nap_ok,
+            "crawl_id": frontier.id,
+            "state": state,
+            "total_discovered": stats.get("total_discovered", 0),
+            "processed": stats.get("processed", 0),
+            "chunks_ok": stats.get("chunks_ok", 0),
+            "nap_ok": stats.get("nap_ok", 0),
+            "duplicates_skipped": near_dupes.duplicate_count,
+            "duplicate_clusters": clusters,
+            "robots_blocked": robots_blocked,
+            "findings": [dup_finding] if dup_finding else [],
             "errors_count": len(errors),
             "errors": errors[:10],
-            "sample": samples,
+            "sample": stats.get("sample", [])[:3],
+            "incremental": {
+                "enabled": incremental,
+                "unchanged": stats.get("unchanged", 0),
+                "reprocessed": stats.get("processed", 0) - stats.get("unchanged", 0),
+                "removed": removed,
+            },
         }
+        if state == "done":
+            await record_result(
+                url_str, "batch_scan",
+                scores={k: response[k] for k in ("total_discovered", "processed", "chunks_ok", "nap_ok",
+                                                 "duplicates_skipped", "errors_count")},
+                payload=response)
+        return response
     except HTTPException:
         raise
+    except CrawlKindMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Batch scan failed: {e}")
     
+@router.get("/crawls")
+async def list_crawls(limit: int = 50, admin: str = Depends(require_admin)):
+    """Crawls and batch scans in the persistent frontier, most recently active first."""
+    return {"crawls": await asyncio.to_thread(get_frontier_db().list, limit)}
+
+
+async def _crawl_info(crawl_id: str) -> dict:
+    try:
+        return await asyncio.to_thread(get_frontier_db().info, crawl_id)
+    except CrawlNotFound:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+
+
+@router.get("/crawls/{crawl_id}")
+async def get_crawl(crawl_id: str, admin: str = Depends(require_admin)):
+    """State, parameters, stats and frontier counts (queued/inFlight/done/...) of one crawl."""
+    return await _crawl_info(crawl_id)
+
+
+@router.post("/crawls/{crawl_id}/pause")
+async def pause_crawl(crawl_id: str, admin: str = Depends(require_admin)):
+    """Pause a crawl; its workers stop after the page in flight and hand back their claims."""
+    await _crawl_info(crawl_id)
+    await asyncio.to_thread(get_frontier_db().set_state, crawl_id, "paused")
+    return await _crawl_info(crawl_id)
+
+
+@router.post("/crawls/{crawl_id}/resume")
+async def resume_crawl(crawl_id: str, admin: str = Depends(require_admin)):
+    """
+    Continue a paused or interrupted crawl on this worker with its original parameters.
+    Batch scans return the /scan/batch result, site crawls the crawl meta.
+    """
+    info = await _crawl_info(crawl_id)
+    params = info["params"]
+    if info["kind"] == "scan":
+        return await scan_batch({"url": info["seed"], "max_pages": params.get("max_pages"), "crawl_id": crawl_id})
+    try:
+        store, meta = await crawl_pages(
+            info["seed"], limit=int(params.get("limit") or 10), mode=params.get("mode") or "full",
+            skip_duplicates=bool(params.get("skipDuplicates", True)), crawl_id=crawl_id)
+    except Crawl4AINotConfigured as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CrawlKindMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Crawl failed: {e}")
+    store.close()
+    return meta
+
+
+@router.delete("/crawls/{crawl_id}")
+async def delete_crawl(crawl_id: str, admin: str = Depends(require_admin)):
+    """Drop a crawl and its stored frontier, visited set and pages."""
+    await _crawl_info(crawl_id)
+    await asyncio.to_thread(get_frontier_db().delete, crawl_id)
+    return {"crawlId": crawl_id, "deleted": True}
+
+
+@router.get("/results/domains")
+async def results_domains(kind: str | None = None, limit: int = 500, admin: str = Depends(require_admin)):
+    """Latest recorded run per domain (optionally of one kind), for dashboard overviews."""
+    return {"domains": await asyncio.to_thread(get_results_store().domains, kind, min(limit, 5000))}
+
+
+@router.get("/results/trends")
+async def results_trends(domains: str = "", kind: str = "scan", days: float = 90, bucket: str | None = None,
+                         admin: str = Depends(require_admin)):
+    """
+    Score series per domain. domains: comma-separated (default: every domain with a run
+    of this kind), kind: scan | initial_scan | schema_audit | ai_visibility,
+    bucket: hour | day | week to average runs per bucket.
+    """
+    store = get_results_store()
+    names = [d.strip() for d in domains.split(",") if d.strip()]
+    if not names:
+        names = [row["domain"] for row in await asyncio.to_thread(store.domains, kind, 5000)]
+    since = datetime.utcnow().timestamp() - days * 86400 if days > 0 else 0.0
+    try:
+        series = await asyncio.to_thread(store.trends, names, kind, since, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"kind": kind, "bucket": bucket, "since": since, "trends": series}
+
+
+@router.get("/results/{domain}/history")
+async def results_history(domain: str, kind: str | None = None, limit: int = 50, before: float | None = None,
+                          admin: str = Depends(require_admin)):
+    """Recorded runs of a domain, newest first: score, breakdown and artifact status."""
+    runs = await asyncio.to_thread(get_results_store().history, domain, kind, min(limit, 1000), before)
+    return {"domain": normalize_domain(domain), "runs": runs}
+
+
+@router.get("/results/runs/{scan_id}")
+async def results_run(scan_id: int, admin: str = Depends(require_admin)):
+    """One recorded run with its raw payload (null once compacted)."""
+    run = await asyncio.to_thread(get_results_store().get, scan_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.post("/admin/results/compact")
+async def admin_results_compact(admin: str = Depends(require_admin)):
+    """Run results compaction now (old payloads dropped, old history thinned to daily)."""
+    store = get_results_store()
+    summary = await asyncio.to_thread(store.compact)
+    return {**summary, "store": await asyncio.to_thread(store.stats)}
+
+
 @router.post("/analysis/competitor-search", response_model=CompetitorSearchResponse)
 async def competitor_search(req: CompetitorSearchRequest) -> CompetitorSearchResponse:
     """
@@ -2036,37 +2298,29 @@ async def ai_visibility_full_analysis(req: dict):
         
         # First, run comprehensive analysis to get company profile
         base_url = str(url).rstrip("/")
-        parsed = urlparse(base_url)
-        hostname = parsed.netloc
-        scheme = parsed.scheme or "https"
-        
-        # Handle www variants
-        if hostname.startswith("www."):
-            hostname_alt = hostname[4:]
-        else:
-            hostname_alt = f"www.{hostname}"
-        
-        bases = [f"{scheme}://{hostname}", f"{scheme}://{hostname_alt}"]
-        
-        # Collect content
-        all_content = []
-        for base in bases:
-            for path in ["", "/impressum", "/kontakt", "/about"]:
-                if len(all_content) >= 4:
-                    break
-                page_url = f"{base}{path}"
-                try:
-                    md, _ = await scrape_markdown(page_url)
-                    if md and len(md.strip()) > 200:
-                        all_content.append(md[:10000])
-                except Exception:
-                    continue
-            if len(all_content) >= 4:
+        hostname = urlparse(base_url).netloc
+        
+        # Collect content from the live pages of the canonical host
+        page_paths = ["", "/impressum", "/kontakt", "/about"]
+        origin, live_pages = await resolve_site_pages(base_url, page_paths)
+        collected: list[tuple[str, str]] = []
+        for page_url in live_pages or [f"{origin}{path}" for path in page_paths]:
+            if len(collected) >= 4:
                 break
+            try:
+                md, _ = await scrape_markdown(page_url)
+                if md and len(md.strip()) > 200:
+                    collected.append((page_url, md))
+            except Exception:
+                continue
         
-        if not all_content:
+        if not collected:
             raise HTTPException(status_code=400, detail="Could not scrape content")
         
+        # Per-page cap first, then dedupe shared chrome across the capped pages, so a
+        # repeated block is kept where it is actually sent
+        deduped, _ = dedupe_pages([(u, md[:10000]) for u, md in collected])
+        all_content = [md for _, md in deduped if md]
         combined = "\n\n".join(all_content)[:40000]
         
         # Get comprehensive profile
@@ -2098,7 +2352,7 @@ async def ai_visibility_full_analysis(req: dict):
         # Calculate final score
         visibility_score = calculate_ai_visibility_score(ungrounded_result, grounded_result)
         
-        return {
+        response = {
             "company_name": company_name,
             "industry": industry,
             "location": location,
@@ -2111,6 +2365,11 @@ async def ai_visibility_full_analysis(req: dict):
                 "content": company_profile.get("content", {}),
             }
         }
+        await record_result(
+            hostname or base_url, "ai_visibility", visibility_score.get("total_score"),
+            scores={k: visibility_score.get(k) for k in ("ungrounded_score", "grounded_score", "grade")},
+            payload=response)
+        return response
         
     except HTTPException:
         raise
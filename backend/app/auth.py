@@ -96,6 +96,20 @@ def require_auth(authorization: Optional[str] = Header(default=None)) -> str:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def admin_emails() -> set[str]:
+    """Users allowed to use admin tools (ADMIN_EMAILS, comma-separated); empty means none."""
+    return {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+
+def require_admin(email: str = Depends(require_auth)) -> str:
+    """
+    FastAPI dependency: an authenticated user listed in ADMIN_EMAILS.
+    """
+    if email not in admin_emails():
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return email
+
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
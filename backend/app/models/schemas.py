@@ -2,6 +2,11 @@ from typing import Dict, List, Literal, Optional, Any
 from pydantic import BaseModel, HttpUrl, Field
 
 
+# "main" strips navigation, cookie banners, headers and footers before LLM prompts;
+# "full" keeps the whole page (needed wherever NAP/footer data matters).
+ScrapeMode = Literal["main", "full"]
+
+
 class ScanRequest(BaseModel):
     url: str = Field(..., description="The URL to scan (scheme will be added if missing)")
 
@@ -102,6 +107,7 @@ class ContentChunk(BaseModel):
 class ContentChunksRequest(BaseModel):
     url: HttpUrl = Field(..., description="The full URL to process as Markdown")
     max_chunks: int = 20
+    mode: ScrapeMode = "main"
 
 
 class ContentChunksResponse(BaseModel):
@@ -118,6 +124,7 @@ class QuestionsRequest(BaseModel):
     urls: Optional[List[HttpUrl]] = None
     url: Optional[HttpUrl] = None
     max_items: int = 50
+    mode: ScrapeMode = "main"
 
 
 class QuestionsResponse(BaseModel):
@@ -149,6 +156,7 @@ class SemanticCoverageRequest(BaseModel):
     my_url: HttpUrl
     competitors: List[HttpUrl]
     top_n: int = 10
+    mode: ScrapeMode = "main"
 
 
 class SemanticCoverageResponse(BaseModel):
@@ -0,0 +1,40 @@
+# Request-level observability: stage timings, Server-Timing header, timing logs, metrics, traces,
+# event-loop lag and on-demand request profiles
+from .gemini import instrument_gemini_client
+from .loop_monitor import start_loop_monitor, stop_loop_monitor
+from .metrics import observe_fetch, render_metrics, track_render
+from .middleware import TimingMiddleware
+from .profiler import ProfilerMiddleware, list_profiles, load_profile
+from .timing import (
+    RequestTimings,
+    current_timings,
+    http_trace,
+    record,
+    stage,
+    timed,
+)
+from .tracing import current_span, flush_traces, span, trace_exporter_stats, traced
+
+__all__ = [
+    "ProfilerMiddleware",
+    "RequestTimings",
+    "TimingMiddleware",
+    "current_span",
+    "current_timings",
+    "flush_traces",
+    "http_trace",
+    "instrument_gemini_client",
+    "list_profiles",
+    "load_profile",
+    "observe_fetch",
+    "record",
+    "render_metrics",
+    "span",
+    "stage",
+    "start_loop_monitor",
+    "stop_loop_monitor",
+    "timed",
+    "trace_exporter_stats",
+    "traced",
+    "track_render",
+]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Optional, Tuple
+
+from .metrics import observe_gemini
+from .timing import stage
+from .tracing import current_span
+
+
+def _usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+class _InstrumentedModels:
+    """
+    client.models proxy: generate_content calls are timed as the request's "gemini"
+    stage (a span with model, caller and token attributes when tracing is on) and
+    counted per model and calling function (latency, tokens, errors).
+    """
+
+    def __init__(self, models: Any) -> None:
+        self._models = models
+
+    def generate_content(self, *args: Any, **kwargs: Any) -> Any:
+        model = str(kwargs.get("model") or (args[0] if args else "unknown"))
+        function = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        response = None
+        try:
+            with stage("gemini"):
+                span = current_span()
+                span.set_attribute("gen_ai.request.model", model)
+                span.set_attribute("code.function", function)
+                response = self._models.generate_content(*args, **kwargs)
+                input_tokens, output_tokens = _usage(response)
+                span.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+                span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+            return response
+        finally:
+            input_tokens, output_tokens = _usage(response)
+            observe_gemini(model, function, time.perf_counter() - started, response is not None,
+                           input_tokens, output_tokens)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+class _InstrumentedClient:
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self.models = _InstrumentedModels(client.models)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def instrument_gemini_client(client: Any) -> Any:
+    """Wrap a google-genai Client so model calls show up in request timings."""
+    return _InstrumentedClient(client)
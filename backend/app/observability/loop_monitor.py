@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY
+from .middleware import endpoint_routes, ensure_log_handler
+
+# Event-loop health. A ticker task sleeps LOOP_LAG_INTERVAL and measures how late it
+# wakes up: that delay is time the loop spent running something else without yielding.
+# Lag goes to the metrics registry. With LOOP_BLOCK_DEBUG on, a watchdog thread also
+# watches the ticker's heartbeat; once the loop has been stuck for LOOP_BLOCK_THRESHOLD_MS
+# it captures the loop thread's stack and logs the endpoint and app function that is
+# blocking it (a synchronous Gemini call, BeautifulSoup on a large page, ...).
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR", "1").lower() not in ("0", "false", "no")
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+LOOP_BLOCK_DEBUG = os.getenv("LOOP_BLOCK_DEBUG", "0").lower() in ("1", "true", "yes")
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")) / 1000.0
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_STACK_FRAMES = 30
+
+LOOP_LAG = REGISTRY.histogram(
+    "neuro_web_event_loop_lag_seconds", "Event loop scheduling delay per monitor tick.", (), LAG_BUCKETS)
+LOOP_LAG_LAST = REGISTRY.gauge(
+    "neuro_web_event_loop_lag_last_seconds", "Most recent event loop scheduling delay.")
+LOOP_BLOCKS = REGISTRY.counter(
+    "neuro_web_event_loop_blocked_total",
+    "Loop stalls over LOOP_BLOCK_THRESHOLD_MS by blocking app function ('unknown' without LOOP_BLOCK_DEBUG).",
+    ("function",))
+
+logger = logging.getLogger("neuro_web.loop")
+
+_APP_DIR = str(Path(__file__).resolve().parents[1]) + os.sep
+_API_DIR = _APP_DIR + "api" + os.sep
+_OBSERVABILITY_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def _app_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    rel = code.co_filename[len(_APP_DIR):] if code.co_filename.startswith(_APP_DIR) else code.co_filename
+    return f"{rel}:{code.co_name}:{frame.f_lineno}"
+
+
+class LoopMonitor:
+    """Lag ticker (runs on the loop) plus the optional blocking watchdog (a daemon thread)."""
+
+    def __init__(self) -> None:
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self._beat = time.perf_counter()
+        # What the watchdog saw during the current stall, consumed by the next tick
+        self._stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick(), name="loop-lag-monitor")
+        if LOOP_BLOCK_DEBUG:
+            ensure_log_handler(logger)
+            self._watchdog = threading.Thread(target=self._watch, name="loop-block-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            now = time.perf_counter()
+            self._beat = now
+            lag = max(0.0, now - expected)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= LOOP_BLOCK_THRESHOLD:
+                with self._lock:
+                    stall, self._stall = self._stall, None
+                LOOP_BLOCKS.inc(stall["function"] if stall else "unknown")
+                if stall is not None:
+                    logger.warning(json.dumps({"event": "loop_blocked", "blockedMs": round(lag * 1000, 1), **stall}))
+
+    # --- Watchdog (debug only) ------------------------------------------------------------
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(LOOP_BLOCK_THRESHOLD / 4):
+            beat = self._beat
+            stuck = time.perf_counter() - beat - LOOP_LAG_INTERVAL
+            if stuck < LOOP_BLOCK_THRESHOLD or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread) if self._loop_thread else None
+            if frame is None:
+                continue
+            reported_beat = beat
+            endpoint, function, stack = self._describe(frame)
+            with self._lock:
+                self._stall = {"endpoint": endpoint, "function": function, "stack": stack}
+
+    def _describe(self, frame: FrameType) -> Tuple[Optional[str], str, List[str]]:
+        """(endpoint, innermost app function, formatted stack) for the loop thread."""
+        endpoint = None
+        function = None
+        f: Optional[FrameType] = frame
+        while f is not None:
+            filename = f.f_code.co_filename
+            if function is None and filename.startswith(_APP_DIR) and not filename.startswith(_OBSERVABILITY_DIR):
+                function = _app_frame(f)
+            # Route of an endpoint that has served a request before, else the handler function
+            route = endpoint_routes.get(f.f_code)
+            if route is not None or filename.startswith(_API_DIR):
+                endpoint = route or _app_frame(f)
+                break
+            f = f.f_back
+        stack = traceback.format_stack(frame, limit=MAX_STACK_FRAMES)
+        return endpoint, function or "unknown", [line.rstrip() for line in stack]
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+async def start_loop_monitor() -> Optional[LoopMonitor]:
+    """Start the monitor on the running loop (app startup). Returns None when disabled."""
+    global _monitor
+    if not LOOP_MONITOR_ENABLED:
+        return None
+    if _monitor is None:
+        _monitor = LoopMonitor()
+    _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .timing import stage
+
+T = TypeVar("T")
+
+# In-process Prometheus-style metrics. Series are plain lists keyed by label-value
+# tuples behind one lock per metric, so an observation is a dict lookup, a bisect and
+# two additions. /api/metrics renders the text exposition format on demand (only when
+# METRICS_TOKEN is set; scrapers authenticate with it).
+# New label combinations beyond METRICS_MAX_SERIES per metric are folded into a single
+# "_other" series so per-host labels cannot grow without bound on large crawls.
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "2000"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._other: LabelValues = tuple("_other" for _ in self.labelnames)
+
+    def _key(self, series: Dict[LabelValues, object], labels: Sequence[object]) -> LabelValues:
+        key = tuple(str(v) for v in labels)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        if key not in series and len(series) >= METRICS_MAX_SERIES:
+            return self._other
+        return key
+
+    def _labels(self, key: LabelValues, extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: object, amount: float = 1.0) -> None:
+        with self._lock:
+            key = self._key(self._values, labels)
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: object) -> float:
+        return self._values.get(tuple(str(v) for v in labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{self._labels(key)} {_format_value(v)}" for key, v in items]
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: object) -> None:
+        with self._lock:
+            self._values[self._key(self._values, labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per series: [count per bucket ..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: object) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(self._series, labels)
+            row = self._series.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = row
+            row[index] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, *labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: object) -> int:
+        row = self._series.get(tuple(str(v) for v in labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._series.items()]
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_STARTED = time.time()
+
+# --- Subsystem metrics ---------------------------------------------------------------------
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "neuro_web_http_requests_total", "API requests by route and status.", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "neuro_web_http_request_duration_seconds", "API request latency by route.", ("method", "route"))
+
+FETCHES = REGISTRY.counter(
+    "neuro_web_fetch_total", "Outbound page fetches by host and HTTP status ('error' for transport failures).",
+    ("host", "status"))
+FETCH_SECONDS = REGISTRY.histogram(
+    "neuro_web_fetch_duration_seconds", "Outbound fetch latency by host.", ("host",))
+HTTP_CACHE_RESULTS = REGISTRY.counter(
+    "neuro_web_http_cache_total", "HTTP cache lookups by result (HIT, REVALIDATED, MISS, STALE, BYPASS).",
+    ("result",))
+
+GEMINI_CALLS = REGISTRY.counter(
+    "neuro_web_gemini_calls_total", "Gemini generate_content calls by model, calling function and outcome.",
+    ("model", "function", "outcome"))
+GEMINI_SECONDS = REGISTRY.histogram(
+    "neuro_web_gemini_duration_seconds", "Gemini call latency by model and calling function.",
+    ("model", "function"))
+GEMINI_TOKENS = REGISTRY.counter(
+    "neuro_web_gemini_tokens_total", "Gemini tokens by model, calling function and direction (input/output).",
+    ("model", "function", "direction"))
+GEMINI_CALL_TOKENS = REGISTRY.histogram(
+    "neuro_web_gemini_call_tokens", "Tokens per Gemini call (input + output).", ("model",), TOKEN_BUCKETS)
+
+BROWSER_RENDERS = REGISTRY.counter(
+    "neuro_web_browser_renders_total", "Headless browser page renders by outcome.", ("outcome",))
+BROWSER_RENDER_SECONDS = REGISTRY.histogram(
+    "neuro_web_browser_render_duration_seconds", "Headless browser render latency.")
+
+PROCESS_START = REGISTRY.gauge(
+    "neuro_web_process_start_time_seconds", "Start time of the process since the Unix epoch.")
+PROCESS_START.set(_STARTED)
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    return REGISTRY.render()
+
+
+def observe_fetch(host: str, status: object, seconds: float) -> None:
+    FETCHES.inc(host, status)
+    FETCH_SECONDS.observe(seconds, host)
+
+
+def observe_render(seconds: float, ok: bool) -> None:
+    BROWSER_RENDERS.inc("ok" if ok else "error")
+    BROWSER_RENDER_SECONDS.observe(seconds)
+
+
+async def track_render(render: Awaitable[T]) -> T:
+    """Await a browser render (crawler.arun(...)) as the "render" stage and count it."""
+    started = time.perf_counter()
+    ok = False
+    try:
+        with stage("render"):
+            result = await render
+        ok = bool(getattr(result, "success", True))
+        return result
+    finally:
+        observe_render(time.perf_counter() - started, ok)
+
+
+def observe_gemini(model: str, function: str, seconds: float, ok: bool,
+                   input_tokens: Optional[int] = None, output_tokens: Optional[int] = None) -> None:
+    GEMINI_CALLS.inc(model, function, "ok" if ok else "error")
+    GEMINI_SECONDS.observe(seconds, model, function)
+    if input_tokens:
+        GEMINI_TOKENS.inc(model, function, "input", amount=input_tokens)
+    if output_tokens:
+        GEMINI_TOKENS.inc(model, function, "output", amount=output_tokens)
+    if input_tokens or output_tokens:
+        GEMINI_CALL_TOKENS.observe((input_tokens or 0) + (output_tokens or 0), model)
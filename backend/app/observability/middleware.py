@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from types import CodeType
+from typing import Any, Dict, List, Tuple
+
+from .metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from .timing import RequestTimings, _current
+from .tracing import KIND_SERVER, span
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+TIMING_LOG_ENABLED = os.getenv("TIMING_LOG", "1").lower() not in ("0", "false", "no")
+
+logger = logging.getLogger("neuro_web.timing")
+
+# Endpoint function code -> "METHOD /route", learned from served requests; lets the loop
+# monitor name the endpoint a blocking stack belongs to
+endpoint_routes: Dict[CodeType, str] = {}
+
+
+def ensure_log_handler(log: logging.Logger) -> None:
+    # The app has no logging setup of its own; give observability loggers a plain stderr handler
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: one RequestTimings per HTTP request, a Server-Timing header with
+    the stages completed before the response starts, and a JSON log line with the full
+    breakdown once the response (including streamed bodies) is finished. Request
+    counts and latencies per route template also go to the metrics registry, and the
+    request is the root span of its trace (continuing an incoming traceparent).
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        if TIMING_LOG_ENABLED:
+            ensure_log_handler(logger)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status: List[int] = [0]
+        method = scope.get("method") or ""
+        traceparent = next((v.decode("latin-1") for k, v in scope.get("headers") or [] if k == b"traceparent"), None)
+        root = span(f"{method} {scope.get('path')}", KIND_SERVER, traceparent=traceparent,
+                    **{"http.request.method": method, "url.path": scope.get("path")})
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message.get("type") == "http.response.start":
+                status[0] = int(message.get("status") or 0)
+                if SERVER_TIMING_ENABLED:
+                    headers: List[Tuple[bytes, bytes]] = list(message.get("headers") or [])
+                    headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            with root:
+                try:
+                    await self.app(scope, receive, send_with_timing)
+                except Exception:
+                    status[0] = status[0] or 500
+                    raise
+                finally:
+                    # Route template (set on the scope by the router) keeps label cardinality bounded
+                    route = getattr(scope.get("route"), "path", None) or "unmatched"
+                    if route != "unmatched":
+                        root.update_name(f"{method} {route}")
+                    root.set_attribute("http.route", route)
+                    code = getattr(scope.get("endpoint"), "__code__", None)
+                    if code is not None and code not in endpoint_routes:
+                        endpoint_routes[code] = f"{method} {route}"
+                    root.set_attribute("http.response.status_code", status[0])
+                    if status[0] >= 500:
+                        root.set_error(f"HTTP {status[0]}")
+        finally:
+            _current.reset(token)
+            HTTP_REQUESTS.inc(method, route, status[0])
+            HTTP_REQUEST_SECONDS.observe(timings.elapsed(), method, route)
+            if TIMING_LOG_ENABLED and logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({
+                    "event": "request_timing",
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status[0],
+                    "traceId": root.trace_id or None,
+                    "totalMs": round(timings.elapsed() * 1000, 2),
+                    "stages": timings.breakdown(),
+                }))
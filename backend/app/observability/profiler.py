@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Set
+
+from ..storage import data_path
+
+# On-demand sampling profiler for single API requests. An admin (require_auth + listed in
+# ADMIN_EMAILS) sends `X-Profile: 1` or `?_profile=1`; the request then runs while a
+# sampler thread records the event-loop thread's stack every PROFILE_INTERVAL_MS, tagged
+# with the asyncio task that was running (the request's own task, tasks it spawned, other
+# requests' tasks, or an idle loop), plus busy default-executor threads (to_thread work).
+# The result is stored as folded stacks (flamegraph.pl / speedscope / inferno input)
+# under <data dir>/profiles/ and its id is returned in the X-Profile-Id header.
+# With no ADMIN_EMAILS the middleware is a plain pass-through; otherwise unprofiled
+# requests cost one scan of the request headers.
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+# Stored profiles kept on disk; older ones are deleted after each save (0 keeps everything)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_MAX_DEPTH = 128
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = re.compile(rb"(^|&)_profile=(1|true)(&|$)")
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_session_var: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+def _frame_label(code: CodeType, cache: Dict[CodeType, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        cache[code] = label
+    return label
+
+
+def _fold(frame: Optional[FrameType], cache: Dict[CodeType, str]) -> List[str]:
+    labels: List[str] = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(_frame_label(frame.f_code, cache))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _idle_thread(frame: FrameType) -> bool:
+    # Executor workers waiting for work sit in queue/threading waits
+    return os.path.basename(frame.f_code.co_filename) in ("threading.py", "queue.py", "thread.py") \
+        and frame.f_code.co_name in ("wait", "get", "_worker")
+
+
+class ProfileSession:
+    """Samples the loop thread (with task attribution) and executor threads for one request."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, root_task: Optional[asyncio.Task]) -> None:
+        self.id = uuid.uuid4().hex
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.root_task = root_task
+        self.tasks: Set[asyncio.Task] = set()
+        self.stacks: Counter = Counter()
+        self.attribution: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._labels: Dict[CodeType, str] = {}
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id[:8]}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _task_label(self, task: Optional[asyncio.Task]) -> str:
+        if task is None:
+            return "(loop idle)"
+        if task is self.root_task:
+            return "request"
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or task.get_name()
+        if task in self.tasks:
+            return f"task:{name}"
+        return "(other tasks)"
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        task = asyncio.current_task(self.loop)
+        label = self._task_label(task)
+        self.attribution[label] += 1
+        if label == "request" or label.startswith("task:"):
+            stack = _fold(frames.get(self.loop_thread), self._labels)
+            self.stacks[";".join([label] + stack)] += 1
+        else:
+            # Time the loop spent idle or on other requests, without their stacks
+            self.stacks[label] += 1
+        for thread in threading.enumerate():
+            if not thread.name.startswith("asyncio_") or thread.ident is None:
+                continue
+            frame = frames.get(thread.ident)
+            if frame is None or _idle_thread(frame):
+                continue
+            self.attribution[f"thread:{thread.name}"] += 1
+            stack = _fold(frame, self._labels)
+            self.stacks[";".join([f"thread:{thread.name}"] + stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        deadline = time.perf_counter() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(PROFILE_INTERVAL):
+            if time.perf_counter() > deadline:
+                break
+            try:
+                self._sample()
+            except Exception:
+                # A task finishing mid-sample; skip it
+                continue
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "durationMs": round(self.elapsed * 1000, 1),
+            "intervalMs": PROFILE_INTERVAL * 1000,
+            "samples": self.samples,
+            "attribution": dict(self.attribution.most_common()),
+            **extra,
+        }
+
+    def save(self, **extra: Any) -> Dict[str, Any]:
+        summary = self.summary(**extra)
+        data_path("profiles", f"{self.id}.folded").write_text(self.folded(), encoding="utf-8")
+        data_path("profiles", f"{self.id}.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        _prune_profiles()
+        return summary
+
+
+def _prune_profiles(keep: int = PROFILE_KEEP) -> None:
+    """Delete all but the `keep` newest profiles (both files of each)."""
+    if keep <= 0:
+        return
+    directory = data_path("profiles", "x").parent
+    newest: Dict[str, float] = {}
+    for f in directory.iterdir():
+        if f.suffix in (".json", ".folded") and _ID_RE.match(f.stem):
+            try:
+                mtime = f.stat().st_mtime
+            except OSError:
+                continue
+            newest[f.stem] = max(mtime, newest.get(f.stem, 0.0))
+    if len(newest) <= keep:
+        return
+    for profile_id in sorted(newest, key=newest.__getitem__, reverse=True)[keep:]:
+        for ext in (".json", ".folded"):
+            directory.joinpath(profile_id + ext).unlink(missing_ok=True)
+
+
+# --- Task attribution -----------------------------------------------------------------------
+# While any session runs, a task factory tags tasks created from a profiled request's
+# context (they inherit the context variable) as belonging to that request.
+
+_active = 0
+_previous_factory: Any = None
+_factory_lock = threading.Lock()
+
+
+def _task_factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+    if _previous_factory is not None:
+        task = _previous_factory(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    session = _session_var.get()
+    if session is not None:
+        session.tasks.add(task)
+    return task
+
+
+def _attach(loop: asyncio.AbstractEventLoop) -> None:
+    global _active, _previous_factory
+    with _factory_lock:
+        if _active == 0:
+            _previous_factory = loop.get_task_factory()
+            loop.set_task_factory(_task_factory)
+        _active += 1
+
+
+def _detach(loop: asyncio.AbstractEventLoop) -> None:
+    global _active, _previous_factory
+    with _factory_lock:
+        _active -= 1
+        if _active == 0:
+            loop.set_task_factory(_previous_factory)
+            _previous_factory = None
+
+
+# --- Middleware -----------------------------------------------------------------------------
+
+def _wants_profile(scope: Dict[str, Any]) -> bool:
+    for key, value in scope.get("headers") or ():
+        if key == PROFILE_HEADER:
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    query = scope.get("query_string") or b""
+    return b"_profile=" in query and PROFILE_QUERY.search(query) is not None
+
+
+def _authorize(scope: Dict[str, Any]) -> Optional[int]:
+    """None when the caller is an admin, else the HTTP status to reject with."""
+    from fastapi import HTTPException
+
+    from ..auth import admin_emails, require_auth
+
+    authorization = next((v.decode("latin-1") for k, v in scope.get("headers") or () if k == b"authorization"), None)
+    try:
+        email = require_auth(authorization)
+    except HTTPException as e:
+        return e.status_code
+    return None if email in admin_emails() else 403
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware running admin-requested requests under a ProfileSession. Adds
+    X-Profile-Id to the response; the profile is served by /api/admin/profiles/{id}.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") != "http" or not os.getenv("ADMIN_EMAILS") or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        rejected = _authorize(scope)
+        if rejected is not None:
+            from starlette.responses import JSONResponse
+
+            response = JSONResponse({"detail": "Profiling requires an admin token"}, status_code=rejected)
+            await response(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        session = ProfileSession(loop, asyncio.current_task())
+        token = _session_var.set(session)
+        _attach(loop)
+        status: List[int] = [0]
+
+        async def send_with_profile_id(message: Dict[str, Any]) -> None:
+            if message.get("type") == "http.response.start":
+                status[0] = int(message.get("status") or 0)
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-profile-id", session.id.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        session.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            session.stop()
+            _detach(loop)
+            _session_var.reset(token)
+            await asyncio.to_thread(session.save, method=scope.get("method"), path=scope.get("path"),
+                                    query=(scope.get("query_string") or b"").decode("latin-1"),
+                                    status=status[0] or 500)
+
+
+def load_profile(profile_id: str, fmt: str = "json") -> Optional[str]:
+    """Stored profile as folded stacks ("folded") or its JSON summary ("json"); None if unknown."""
+    if not _ID_RE.match(profile_id) or fmt not in ("json", "folded"):
+        return None
+    path = data_path("profiles", f"{profile_id}.{fmt}")
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Summaries of the most recent stored profiles."""
+    directory = data_path("profiles", "x").parent
+    files = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)[:limit]
+    out: List[Dict[str, Any]] = []
+    for f in files:
+        try:
+            out.append(json.loads(f.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return out
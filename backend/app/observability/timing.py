@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .tracing import TRACING_ENABLED, child_span, record_span
+
+# Per-request stage timings. A request gets a RequestTimings object in a context
+# variable; stage("parse") blocks anywhere below the handler (tasks and to_thread
+# calls inherit the context) add their wall time to it. Outside a request, stage()
+# returns a shared no-op, so instrumented library code costs one ContextVar lookup.
+# With tracing on, every stage is also a span under the current span (tracing.py).
+# The middleware that opens and reports a request's timings lives in middleware.py.
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RequestTimings:
+    """Accumulated seconds and counts per stage name for one request."""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {"ms": total, "count": n}}. Concurrent stages overlap, so totals can exceed wall time."""
+        return {
+            name: {"ms": round(total * 1000, 2), "count": int(count)}
+            for name, (total, count) in self.stages.items()
+        }
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        parts = [f"{name};dur={total_s * 1000:.1f}" for name, (total_s, _) in self.stages.items()]
+        parts.append(f"total;dur={(self.elapsed() if total is None else total) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "started", "span")
+
+    def __init__(self, timings: RequestTimings, name: str) -> None:
+        self.timings = timings
+        self.name = name
+        self.span = child_span(name) if TRACING_ENABLED else None
+
+    def __enter__(self) -> "_Stage":
+        if self.span is not None:
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.timings.add(self.name, time.perf_counter() - self.started)
+        if self.span is not None:
+            self.span.__exit__(*exc)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoStage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str) -> Any:
+    """Context manager timing a block as `name` within the current request (no-op outside one)."""
+    timings = _current.get()
+    if timings is None:
+        return child_span(name) if TRACING_ENABLED else _NO_STAGE
+    return _Stage(timings, name)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an externally measured duration to the current request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of stage() for sync and async functions."""
+    def decorate(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+# httpx request tracing: splits a fetch into connect (TCP + TLS), wait (request sent
+# until response headers, i.e. server think time) and download (body).
+_TRACE_STAGES: Dict[str, str] = {
+    "connect_tcp": "connect",
+    "start_tls": "connect",
+    "receive_response_headers": "wait",
+    "receive_response_body": "download",
+}
+
+
+def http_trace() -> Optional[Callable[[str, Dict[str, Any]], Any]]:
+    """An httpx 'trace' extension callback recording into the current request, or None."""
+    timings = _current.get()
+    if timings is None:
+        return None
+    started: Dict[str, int] = {}
+
+    async def trace(event: str, info: Dict[str, Any]) -> None:
+        # Event names look like "connection.connect_tcp.started" / "http11.receive_response_body.complete"
+        _, _, rest = event.partition(".")
+        step, _, phase = rest.rpartition(".")
+        name = _TRACE_STAGES.get(step)
+        if name is None:
+            return
+        if phase == "started":
+            started[step] = time.time_ns()
+        elif phase in ("complete", "failed") and step in started:
+            start_ns, end_ns = started.pop(step), time.time_ns()
+            timings.add(name, (end_ns - start_ns) / 1e9)
+            if TRACING_ENABLED:
+                record_span(name, start_ns, end_ns)
+
+    return trace
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import atexit
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# OpenTelemetry-compatible request tracing without the OTel SDK. Spans carry W3C trace
+# and span ids, nest through a context variable (tasks and to_thread calls inherit it)
+# and are exported in batches as OTLP/JSON: appended as one ExportTraceServiceRequest
+# per line to TRACE_FILE (the format of the collector's file exporter, readable by its
+# otlpjsonfile receiver) and/or POSTed to an OTLP/HTTP collector at
+# OTEL_EXPORTER_OTLP_ENDPOINT (/v1/traces). With neither set, span() is a shared no-op.
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").rstrip("/")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "neuro-web-backend")
+# Fraction of new traces recorded; an incoming sampled traceparent is always honoured
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "8192"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2.0"))
+
+TRACING_ENABLED = bool(TRACE_FILE or OTLP_ENDPOINT)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# OTLP SpanKind values
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """One timed operation. Use span() / traced() rather than creating these directly."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "error", "sampled", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str, kind: int, sampled: bool) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self._token: Any = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"[:500]
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if self.sampled:
+            _exporter.submit(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _attribute_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class _NoSpan:
+    __slots__ = ()
+    traceparent = ""
+    trace_id = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def set_error(self, message: str) -> None:
+        return None
+
+    def update_name(self, name: str) -> None:
+        return None
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def span(name: str, kind: int = KIND_INTERNAL, traceparent: Optional[str] = None, **attributes: Any) -> Any:
+    """
+    Context manager for a span named `name`, child of the current span. Without a current
+    span it starts a trace (continuing `traceparent` when given). No-op when tracing is off.
+    """
+    if not TRACING_ENABLED:
+        return _NO_SPAN
+    parent = _current_span.get()
+    if parent is not None:
+        s = Span(name, parent.trace_id, parent.span_id, kind, parent.sampled)
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            s = Span(name, remote[0], remote[1], kind, remote[2])
+        else:
+            s = Span(name, "%032x" % random.getrandbits(128), "", kind, random.random() < TRACE_SAMPLE_RATE)
+    for key, value in attributes.items():
+        s.set_attribute(key, value)
+    return s
+
+
+def child_span(name: str, **attributes: Any) -> Any:
+    """A span only when there is a current one to attach to (stages never start traces)."""
+    if not TRACING_ENABLED or _current_span.get() is None:
+        return _NO_SPAN
+    return span(name, **attributes)
+
+
+def current_span() -> Any:
+    """The active span (a no-op span outside one); handy for adding attributes."""
+    return _current_span.get() or _NO_SPAN
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """Export an already finished child span of the current span (e.g. from httpx trace events)."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return
+    s = Span(name, parent.trace_id, parent.span_id, KIND_INTERNAL, True)
+    s.start_ns, s.end_ns = start_ns, end_ns
+    for key, value in attributes.items():
+        s.set_attribute(key, value)
+    _exporter.submit(s)
+
+
+def traced(name: Optional[str] = None, kind: int = KIND_INTERNAL,
+           record_args: Sequence[str] = ()) -> Callable[[F], F]:
+    """
+    Decorator wrapping every call of a sync or async function in a span (default name:
+    its qualname). Arguments named in record_args become span attributes.
+    """
+    def decorate(func: F) -> F:
+        span_name = name or func.__qualname__
+        signature = inspect.signature(func) if record_args else None
+
+        def open_span(args: Any, kwargs: Any) -> Any:
+            s = span(span_name, kind)
+            if signature is not None and s is not _NO_SPAN:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                for arg in record_args:
+                    value = bound.get(arg)
+                    s.set_attribute(arg, value if isinstance(value, (bool, int, float)) or value is None else str(value)[:500])
+            return s
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with open_span(args, kwargs):
+                    return await func(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with open_span(args, kwargs):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+class _BatchExporter:
+    """
+    Bounded in-memory queue flushed by a daemon thread every TRACE_FLUSH_SECONDS or once
+    TRACE_BATCH_SIZE spans are waiting. Spans beyond TRACE_QUEUE_SIZE are dropped and
+    counted, so a slow collector never holds up requests.
+    """
+
+    def __init__(self) -> None:
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+        self.exported = 0
+        self.failures = 0
+
+    def submit(self, s: Span) -> None:
+        with self._lock:
+            if len(self._spans) >= TRACE_QUEUE_SIZE:
+                self.dropped += 1
+                return
+            self._spans.append(s)
+            full = len(self._spans) >= TRACE_BATCH_SIZE
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(TRACE_FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._spans = self._spans, []
+        while batch:
+            chunk, batch = batch[:TRACE_BATCH_SIZE], batch[TRACE_BATCH_SIZE:]
+            try:
+                self._export(chunk)
+                self.exported += len(chunk)
+            except Exception:
+                self.failures += 1
+
+    @staticmethod
+    def _payload(spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "neuro_web"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]}
+
+    def _export(self, spans: List[Span]) -> None:
+        body = json.dumps(self._payload(spans), separators=(",", ":"))
+        if TRACE_FILE:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(body + "\n")
+        if OTLP_ENDPOINT:
+            import httpx
+
+            resp = httpx.post(f"{OTLP_ENDPOINT}/v1/traces", content=body,
+                              headers={"Content-Type": "application/json"}, timeout=10.0)
+            resp.raise_for_status()
+
+
+_exporter = _BatchExporter()
+
+
+def flush_traces() -> None:
+    """Export all queued spans now (called at interpreter exit)."""
+    _exporter.flush()
+
+
+def trace_exporter_stats() -> Dict[str, Any]:
+    return {
+        "enabled": TRACING_ENABLED,
+        "exported": _exporter.exported,
+        "dropped": _exporter.dropped,
+        "failures": _exporter.failures,
+    }
+
+
+if TRACING_ENABLED:
+    atexit.register(flush_traces)
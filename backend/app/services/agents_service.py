@@ -53,7 +53,7 @@ async def run_agent(goal: str, urls: Optional[List[str]] = None, constraints: Op
         if not allowed(u):
             continue
         try:
-            md, _ = await scrape_markdown(u)
+            md, _ = await scrape_markdown(u, mode="main")
             summary = md[:400].replace("\n", " ").strip() if md else "(no markdown extracted)"
             steps.append(
                 {
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Worker processes for CPU-bound parse/extract work (HTML parsing, markdown conversion,
+# tokenization). Defaults to one per core; CPU_POOL_WORKERS=0 runs the work on the
+# default thread pool instead (useful for debugging and single-core machines).
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Below this input size the pickling round-trip costs more than the parse itself.
+CPU_POOL_MIN_BYTES = int(os.getenv("CPU_POOL_MIN_BYTES", "20000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if CPU_POOL_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn: forking a process that already runs an event loop and client threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=CPU_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, size_hint: Optional[int] = None) -> T:
+    """
+    Run a picklable top-level function in the process pool and await its result.
+    Small inputs (size_hint < CPU_POOL_MIN_BYTES) run inline; if the pool breaks (worker
+    killed), it is recreated and the call falls back to a thread.
+    """
+    global _pool
+    if size_hint is not None and size_hint < CPU_POOL_MIN_BYTES:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    if pool is None:
+        return await loop.run_in_executor(None, partial(func, *args))
+    try:
+        return await loop.run_in_executor(pool, partial(func, *args))
+    except BrokenProcessPool:
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(None, partial(func, *args))
+
+
+def shutdown_pool() -> None:
+    """Stop worker processes (app shutdown)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional, Tuple, Set
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urljoin
-import httpx
-from bs4 import BeautifulSoup
-import html2text
+
+from .cpu_pool_service import run_cpu
+from .dedup_service import SimHashIndex, simhash
+from .frontier_service import SKIPPED, crawl_store, restore_pages, start_crawl
+from .host_scheduler_service import get_scheduler
+from .http_cache_service import cached_get
+from .markdown_service import html_to_markdown_with_main
+from .page_store_service import PageStore
+from ..observability import stage, traced, track_render
 
 # Try to import crawl4ai, but don't fail if browser is not available
 try:
@@ -19,87 +28,163 @@ class Crawl4AINotConfigured(RuntimeError):
     pass
 
 
-async def _http_scrape(url: str) -> Tuple[str, Dict[str, Any]]:
+# Scrape cache: full and main-content markdown are stored together per URL, so callers
+# asking for a different mode within the TTL do not trigger another fetch.
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "600"))
+SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "256"))
+_scrape_cache: "OrderedDict[str, Tuple[float, str, str, Dict[str, Any]]]" = OrderedDict()
+
+SCRAPE_MODES = ("full", "main")
+
+
+def _cache_get(url: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    entry = _scrape_cache.get(url)
+    if not entry:
+        return None
+    stored_at, full, main, meta = entry
+    if time.monotonic() - stored_at > SCRAPE_CACHE_TTL:
+        _scrape_cache.pop(url, None)
+        return None
+    _scrape_cache.move_to_end(url)
+    return full, main, meta
+
+
+def _cache_put(url: str, full: str, main: str, meta: Dict[str, Any]) -> None:
+    if SCRAPE_CACHE_SIZE <= 0:
+        return
+    _scrape_cache[url] = (time.monotonic(), full, main, meta)
+    _scrape_cache.move_to_end(url)
+    while len(_scrape_cache) > SCRAPE_CACHE_SIZE:
+        _scrape_cache.popitem(last=False)
+
+
+def _select_mode(url: str, full: str, main: str, meta: Dict[str, Any], mode: str) -> Tuple[str, Dict[str, Any]]:
+    md = main if mode == "main" else full
+    out = dict(meta)
+    out.update({
+        "url": url,
+        "mode": mode,
+        "length": len(md),
+        "full_length": len(full),
+        "main_length": len(main),
+    })
+    return md, out
+
+
+async def _http_scrape(url: str) -> Tuple[str, str, Dict[str, Any]]:
     """
     Simple HTTP-based scraping fallback that doesn't require a browser.
+    Returns (full_markdown, main_markdown, meta).
     """
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0, headers=headers) as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                return "", {"url": url, "ok": False, "error": f"HTTP {r.status_code}"}
-            
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "header", "footer"]):
-                script.decompose()
-            
-            # Get title and description
-            title = soup.title.string.strip() if soup.title and soup.title.string else ""
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            description = meta_desc.get("content", "").strip() if meta_desc else ""
-            
-            # Convert to markdown-like text
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            h.ignore_images = True
-            h.body_width = 0
-            md = h.handle(r.text)
-            
-            # Fallback to plain text if html2text fails
-            if not md or len(md.strip()) < 50:
-                md = soup.get_text(" ", strip=True)
-            
-            return md, {
-                "url": url,
-                "ok": True,
-                "via": "httpx",
-                "length": len(md),
-                "title": title,
-                "description": description,
-            }
+        r = await cached_get(url, headers=headers, timeout=30.0)
+        if r.status_code != 200:
+            return "", "", {"url": url, "ok": False, "error": f"HTTP {r.status_code}"}
+
+        # Single tokenizer pass: both markdown variants, title and description come from the same
+        # parse, run in the CPU pool so large pages do not stall the event loop
+        html = r.text
+        with stage("parse"):
+            md, main_md, info = await run_cpu(html_to_markdown_with_main, html, size_hint=len(html))
+        title = info.get("title") or ""
+        description = info.get("description") or ""
+
+        return md, main_md, {
+            "url": url,
+            "ok": True,
+            "via": "httpx",
+            "length": len(md),
+            "title": title,
+            "description": description,
+        }
     except Exception as e:
-        return "", {"url": url, "ok": False, "error": str(e)}
+        return "", "", {"url": url, "ok": False, "error": str(e)}
 
 
-async def scrape_markdown(url: str) -> Tuple[str, Dict[str, Any]]:
+@traced("scrape_markdown", record_args=("url", "mode"))
+async def scrape_markdown(url: str, mode: str = "full") -> Tuple[str, Dict[str, Any]]:
     """
     Scrape a single URL and return markdown + metadata.
     Uses HTTP fallback if crawl4ai browser is not available.
+
+    mode="full" returns the whole page (header/footer/NAP data included);
+    mode="main" returns only the primary content region, for LLM prompts that do not
+    need site chrome.
     """
+    if mode not in SCRAPE_MODES:
+        raise ValueError(f"Unknown scrape mode '{mode}', expected one of {SCRAPE_MODES}")
+
+    cached = _cache_get(url)
+    if cached:
+        return _select_mode(url, *cached, mode=mode)
+
     # Always try HTTP method first as it's more reliable
-    md, meta = await _http_scrape(url)
+    md, main_md, meta = await _http_scrape(url)
     if md and len(md.strip()) > 100:
-        return md, meta
+        _cache_put(url, md, main_md, meta)
+        return _select_mode(url, md, main_md, meta, mode)
     
     # Try crawl4ai as fallback for JavaScript-heavy sites
     if CRAWL4AI_AVAILABLE and AsyncWebCrawler:
         try:
             async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(url=url)
+                await get_scheduler().acquire(url)
+                result = await track_render(crawler.arun(url=url))
                 
                 if result.success and result.markdown:
-                    return result.markdown, {
+                    full = str(result.markdown)
+                    rendered = getattr(result, "html", "") or ""
+                    main = full
+                    if rendered:
+                        with stage("parse"):
+                            main = (await run_cpu(html_to_markdown_with_main, rendered, size_hint=len(rendered)))[1]
+                    c_meta = {
                         "url": url,
                         "ok": True,
                         "via": "crawl4ai",
-                        "length": len(result.markdown),
                         "title": result.metadata.get("title") if result.metadata else None,
                         "description": result.metadata.get("description") if result.metadata else None,
                     }
+                    _cache_put(url, full, main or full, c_meta)
+                    return _select_mode(url, full, main or full, c_meta, mode)
         except Exception:
             pass  # Fall through to return HTTP result
     
-    return md, meta
+    return _select_mode(url, md, main_md, meta, mode)
+
+
+async def crawl_markdown(
+    url: str, limit: int = 10, mode: str = "full", skip_duplicates: bool = True, crawl_id: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Crawl a site (same domain) up to 'limit' pages and return markdown for each as a list
+    of {'markdown', 'url', 'title'} dicts. Holds every page in memory; large crawls should
+    use crawl_pages() and iterate the PageStore instead.
+    """
+    store, meta = await crawl_pages(url, limit=limit, mode=mode, skip_duplicates=skip_duplicates, crawl_id=crawl_id)
+    with store:
+        return list(store.iter_dicts()), meta
 
 
-async def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+@traced("crawl_markdown", record_args=("url", "limit", "crawl_id"))
+async def crawl_pages(
+    url: str, limit: int = 10, mode: str = "full", skip_duplicates: bool = True, crawl_id: Optional[str] = None
+) -> Tuple[PageStore, Dict[str, Any]]:
     """
-    Crawl a site (same domain) up to 'limit' pages and return markdown for each.
+    Crawl a site (same domain) up to 'limit' pages into a PageStore (markdown read back
+    from the crawl frontier, which keeps it compressed on disk); the caller closes the store.
+    mode="main" reduces each page to its primary content region (see scrape_markdown).
+    Near-duplicate pages (SimHash) are left out of the result when skip_duplicates is set
+    (their links are still followed) and reported as clusters in meta['duplicates'].
+    URLs disallowed by robots.txt are skipped (meta['robotsBlocked']); fetches are paced
+    by the per-host scheduler.
+    Queue, visited set and finished pages are kept in the persistent crawl frontier:
+    passing the crawl_id of an interrupted or paused crawl resumes it on any worker, and
+    pausing it stops the crawl after the current page (meta['state']). Crawls without a
+    crawl_id are removed from the frontier when done.
     """
     start_url = url
     if not start_url.startswith(("http://", "https://")):
@@ -108,9 +193,15 @@ async def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]
     parsed = urlparse(start_url)
     root_domain = parsed.netloc or parsed.path
 
-    pages: List[Dict[str, Any]] = []
-    visited: Set[str] = set()
-    queue: List[str] = [start_url]
+    frontier, resumed = await asyncio.to_thread(
+        start_crawl, "site", start_url, {"limit": limit, "mode": mode, "skipDuplicates": skip_duplicates}, crawl_id)
+    pages = crawl_store(frontier)
+    near_dupes = SimHashIndex()
+    scheduler = get_scheduler()
+    if resumed:
+        await asyncio.to_thread(restore_pages, frontier, pages, near_dupes)
+    else:
+        await asyncio.to_thread(frontier.push, [start_url])
     
     # We will use a single crawler instance for the session if possible, 
     # but for simplicity/robustness in this initial implementation, let's just 
@@ -120,23 +211,37 @@ async def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]
     # (it has advanced strategies, but let's stick to a manual BFS control for now to match 
     # previous behavior and ensure we stay within limits).
 
-    async with AsyncWebCrawler() as crawler:
-        while queue and len(pages) < limit:
-            current_url = queue.pop(0)
-            if current_url in visited:
-                continue
-            visited.add(current_url)
+    try:
+        async with AsyncWebCrawler() as crawler:
+            while len(pages) < limit and await asyncio.to_thread(frontier.state) == "running":
+                claimed = await asyncio.to_thread(frontier.claim, 1)
+                if not claimed:
+                    break
+                entry = claimed[0]
+                current_url = entry.url
 
-            try:
-                result = await crawler.arun(url=current_url)
-                
-                if result.success:
-                    md = result.markdown or ""
-                    pages.append({
-                        "markdown": md,
-                        "url": current_url,
-                        "title": result.metadata.get("title"),
-                    })
+                try:
+                    if not await scheduler.allowed(current_url):
+                        await asyncio.to_thread(frontier.skip, entry.seq, "robots")
+                        continue
+                    await scheduler.acquire(current_url)
+                    result = await track_render(crawler.arun(url=current_url))
+                    
+                    if not result.success:
+                        await asyncio.to_thread(frontier.fail, entry.seq, "render failed")
+                        continue
+                    md = str(result.markdown or "")
+                    rendered = getattr(result, "html", "") or ""
+                    if mode == "main" and rendered:
+                        with stage("parse"):
+                            converted = await run_cpu(html_to_markdown_with_main, rendered, size_hint=len(rendered))
+                        md = converted[1] or md
+                    title = result.metadata.get("title")
+                    fingerprint = simhash(md)
+                    duplicate_of = near_dupes.add_fingerprint(current_url, fingerprint)
+                    kept = None
+                    if duplicate_of is None or not skip_duplicates:
+                        kept = md
 
                     # extract links
                     # result.links is a dict or list of internal/external links?
@@ -158,6 +263,7 @@ async def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]
                                 if root_domain in href:
                                     internal_links.append(href)
 
+                    links: List[str] = []
                     for link in internal_links:
                         # Normalize logic
                         # link might be relative or absolute
@@ -171,20 +277,37 @@ async def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]
                              
                         full_link = urljoin(current_url, link_href)
                         
-                        # Verify domain scope
+                        # Verify domain scope (the frontier drops URLs already seen)
                         p = urlparse(full_link)
                         if (p.netloc or p.path).endswith(root_domain):
-                            if full_link not in visited and full_link not in queue:
-                                queue.append(full_link)
+                            links.append(full_link)
+                    await asyncio.to_thread(frontier.record_page, entry, kept, fingerprint, links, title=title)
+                    if kept is not None:
+                        # The frontier now holds the markdown; the store keeps the record
+                        pages.add(current_url, kept, title=title, simhash=fingerprint, key=entry.seq)
+
+                except Exception as e:
+                    await asyncio.to_thread(frontier.fail, entry.seq, str(e) or type(e).__name__)
+    except BaseException:
+        # Hand unfinished claims back right away instead of waiting for the lease to expire
+        frontier.release()
+        pages.close()
+        raise
 
-            except Exception as e:
-                # Log error or skip
-                pass
+    state = await asyncio.to_thread(frontier.finish, len(pages) >= limit)
+    robots_blocked = [u for u, _ in await asyncio.to_thread(frontier.notes, SKIPPED)]
+    if crawl_id is None and state == "done":
+        # The store reads its pages from the frontier: drop the crawl when it is closed
+        pages.on_close(frontier.discard)
                 
     meta = {
         "seed": start_url,
         "count": len(pages),
         "ok": True,
-        "via": "crawl4ai"
+        "via": "crawl4ai",
+        "duplicates": near_dupes.clusters(),
+        "robotsBlocked": robots_blocked,
+        "crawlId": frontier.id,
+        "state": state,
     }
     return pages, meta
@@ -1,32 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from urllib.parse import urlparse
 
 import httpx
 from bs4 import BeautifulSoup
 
-
-DEFAULT_USER_AGENT = (
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) "
-    "Chrome/120.0.0.0 Safari/537.36"
-)
+from ..observability import stage, traced
+from .http_cache_service import cached_get
+from .results_service import get_results_store, record_result
+from .schema_service import collect_schema_types, extract_jsonld
 
 
+@traced("fetch_html", record_args=("url",))
 async def fetch_html(url: str) -> str:
-    """Fetch HTML content for a given URL with sensible defaults."""
+    """Fetch HTML content for a given URL with sensible defaults (pooled client, on-disk cache)."""
     timeout = httpx.Timeout(15.0, connect=5.0)
-    async with httpx.AsyncClient(
-        headers={"User-Agent": DEFAULT_USER_AGENT},
-        follow_redirects=True,
-        timeout=timeout,
-    ) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return resp.text
+    resp = await cached_get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.text
 
 
 def extract_domain(url: str) -> str:
@@ -90,6 +85,64 @@ def compute_audit_scores(soup: BeautifulSoup, full_html: str) -> Dict[str, float
     }
 
 
+# --- Process-pool entry points ------------------------------------------------------------
+# Top-level, picklable functions that take raw HTML and return compact plain-data results,
+# so they can run in cpu_pool_service workers without shipping parse trees back.
+
+
+def extract_page_signals(html: str) -> Dict[str, Any]:
+    """One parse of a page for the initial scan: content, meta and link signals plus audit scores."""
+    soup = BeautifulSoup(html or "", "html.parser")
+
+    title = (soup.title.string or "").strip() if soup.title and soup.title.string else ""
+    meta_desc_tag = soup.find("meta", attrs={"name": "description"})
+    description = (meta_desc_tag.get("content") or "").strip() if meta_desc_tag else ""
+
+    schema_types: List[str] = []
+    for doc in extract_jsonld(html or ""):
+        schema_types += collect_schema_types(doc)
+
+    rss_found = any(
+        (l.get("type") or "").lower() in ("application/rss+xml", "application/atom+xml")
+        for l in soup.find_all("link", attrs={"rel": "alternate"})
+    )
+
+    canonical_url = ""
+    link_canon = soup.find("link", attrs={"rel": "canonical"})
+    if link_canon and link_canon.get("href"):
+        canonical_url = link_canon.get("href").strip()
+
+    robots_content = ""
+    robots_meta = soup.find("meta", attrs={"name": "robots"})
+    if robots_meta:
+        robots_content = (robots_meta.get("content") or "").lower()
+
+    return {
+        "title": title,
+        "description": description,
+        "headings": {
+            "h1": [h.get_text(strip=True) for h in soup.find_all("h1")],
+            "h2": [h.get_text(strip=True) for h in soup.find_all("h2")],
+            "h3": [h.get_text(strip=True) for h in soup.find_all("h3")],
+        },
+        "metaTagCount": len(soup.find_all("meta")),
+        "schemaTypes": schema_types,
+        "sitemapLink": bool(soup.find_all("link", attrs={"rel": "sitemap"})),
+        "rssFound": rss_found,
+        "canonicalUrl": canonical_url,
+        "noindex": "noindex" in robots_content,
+        "noarchive": "noarchive" in robots_content,
+        "auditScores": compute_audit_scores(soup, html or ""),
+    }
+
+
+def extract_title_text(html: str, max_chars: int = 150000) -> Tuple[str, str]:
+    """(title, visible text) of a page."""
+    soup = BeautifulSoup(html or "", "html.parser")
+    title = (soup.title.string or "").strip() if soup.title and soup.title.string else ""
+    return title, soup.get_text(" ", strip=True)[:max_chars]
+
+
 def derive_overall_status(score: float) -> str:
     if score >= 80:
         return "healthy"
@@ -98,18 +151,19 @@ def derive_overall_status(score: float) -> str:
     return "critical"
 
 
+@traced("scan_site", record_args=("url",))
 async def scan_site(url: str) -> Dict[str, Any]:
     """
     Fetch and parse a single URL, returning a payload aligned to frontend's ClientProject shape.
     """
     html = await fetch_html(url)
-    soup = BeautifulSoup(html, "html.parser")
+    with stage("parse"):
+        soup = BeautifulSoup(html, "html.parser")
+        audit_scores = compute_audit_scores(soup, html)
 
     domain = extract_domain(url)
     title = (soup.title.string or "").strip() if soup.title and soup.title.string else domain
 
-    audit_scores = compute_audit_scores(soup, html)
-
     # Overall score: average of key dimensions (structure, structured_data, content)
     key_dims = ["structure", "structured_data", "content"]
     score = int(sum(audit_scores[d] for d in key_dims) / len(key_dims))
@@ -133,9 +187,14 @@ async def scan_site(url: str) -> Dict[str, Any]:
         "clusters": 1,
         "issues": issues,
         "status": derive_overall_status(score),
-        "trend": [max(0, min(100, score - 10)), max(0, min(100, score - 5)), score],
+        "trend": [score],
         "auditScores": audit_scores,
         # Return a trimmed snippet to keep payload reasonable
         "htmlSnippet": html[:50000],
     }
+    # Trend: this scan plus the domain's previous scans from the results store
+    stored = {k: v for k, v in project.items() if k != "htmlSnippet"}
+    if await record_result(domain, "scan", score, scores=audit_scores, payload=stored) is not None:
+        history = await asyncio.to_thread(get_results_store().trend, domain, "scan")
+        project["trend"] = [int(round(s)) for s in history] or [score]
     return project
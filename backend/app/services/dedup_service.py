@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+# Blank lines separate markdown blocks (paragraphs, headings, list groups)
+_BLOCK_SPLIT = re.compile(r"\n\s*\n")
+# Link targets differ between pages (active-state query strings, relative paths) while
+# the visible block is identical, so they are not part of the fingerprint.
+_LINK_TARGET = re.compile(r"\]\([^)]*\)")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _block_words(block: str) -> List[str]:
+    return _WORD.findall(_LINK_TARGET.sub("]", block).lower())
+
+
+def _shingles(words: Sequence[str], size: int) -> Set[int]:
+    if len(words) <= size:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def dedupe_pages(
+    pages: Sequence[Tuple[str, str]],
+    shingle_size: int = 4,
+    threshold: float = 0.8,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """
+    Cross-page boilerplate removal for multi-page prompts.
+
+    pages: [(url, markdown), ...] in priority order. Every block is fingerprinted as a
+    set of hashed word shingles; a block whose shingles were already seen (>= threshold)
+    in an earlier block, on any page, is dropped. The first occurrence of a repeated
+    header/navigation/footer block is therefore kept exactly once.
+
+    Returns (pages, stats) with the same page order; pages left empty are kept with "".
+    """
+    seen: Set[int] = set()
+    out: List[Tuple[str, str]] = []
+    blocks_total = 0
+    blocks_removed = 0
+    chars_before = 0
+    chars_after = 0
+
+    for url, markdown in pages:
+        markdown = markdown or ""
+        chars_before += len(markdown)
+        kept: List[str] = []
+        for block in _BLOCK_SPLIT.split(markdown):
+            block = block.strip()
+            if not block:
+                continue
+            blocks_total += 1
+            words = _block_words(block)
+            if not words:
+                kept.append(block)
+                continue
+            sh = _shingles(words, shingle_size)
+            overlap = sum(1 for h in sh if h in seen)
+            if overlap >= threshold * len(sh):
+                blocks_removed += 1
+                continue
+            seen.update(sh)
+            kept.append(block)
+        text = "\n\n".join(kept)
+        chars_after += len(text)
+        out.append((url, text))
+
+    return out, {
+        "blocksTotal": blocks_total,
+        "blocksRemoved": blocks_removed,
+        "charsBefore": chars_before,
+        "charsAfter": chars_after,
+    }
+
+
+# --- Page-level near-duplicate detection (SimHash) -----------------------------------------
+
+SIMHASH_BITS = 64
+# Per-bit counters live in 20-bit lanes of one big int, so a page's feature vector is
+# summed with plain integer additions instead of a 64-step loop per feature.
+_LANE = 20
+_MAX_FEATURES = (1 << _LANE) - 1
+_SPREAD = [
+    [sum(1 << ((k * 8 + j) * _LANE) for j in range(8) if byte >> j & 1) for byte in range(256)]
+    for k in range(8)
+]
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles of a page. Pages whose fingerprints differ in only
+    a few bits are near-duplicates (pagination, print views, tag archives, locale copies).
+    Deterministic across processes (blake2b feature hashes).
+    """
+    words = _block_words(text or "")
+    if len(words) < shingle_size:
+        features = {" ".join(words)} if words else set()
+    else:
+        features = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    if not features:
+        return 0
+
+    t0, t1, t2, t3, t4, t5, t6, t7 = _SPREAD
+    total = 0
+    count = 0
+    for feature in features:
+        h = _feature_hash(feature)
+        total += (
+            t0[h & 255] + t1[h >> 8 & 255] + t2[h >> 16 & 255] + t3[h >> 24 & 255]
+            + t4[h >> 32 & 255] + t5[h >> 40 & 255] + t6[h >> 48 & 255] + t7[h >> 56 & 255]
+        )
+        count += 1
+        if count >= _MAX_FEATURES:
+            break
+
+    mask = (1 << _LANE) - 1
+    half = count / 2
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if (total >> (bit * _LANE)) & mask > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """
+    Locality-sensitive index over page fingerprints. With max_distance=k the 64 bits
+    are split into k+1 bands; any two fingerprints within k bits share at least one
+    identical band (pigeonhole), so lookups only compare against band-mates.
+    """
+
+    def __init__(self, max_distance: int = 3) -> None:
+        self.max_distance = max_distance
+        self._bands = max_distance + 1
+        self._band_bits = SIMHASH_BITS // self._bands
+        self._tables: List[Dict[int, List[str]]] = [{} for _ in range(self._bands)]
+        self._fingerprints: Dict[str, int] = {}
+        self._clusters: Dict[str, List[str]] = {}
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self._band_bits) - 1
+        return [(fingerprint >> (i * self._band_bits)) & mask for i in range(self._bands)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """Return the key of a stored near-duplicate, if any."""
+        for table, band in zip(self._tables, self._band_keys(fingerprint)):
+            for key in table.get(band, ()):
+                if hamming_distance(fingerprint, self._fingerprints[key]) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key: str, text: str) -> Optional[str]:
+        """
+        Fingerprint `text` under `key`. Returns the canonical key when the page is a
+        near-duplicate of an earlier one (the page is then grouped, not indexed),
+        otherwise None.
+        """
+        return self.add_fingerprint(key, simhash(text))
+
+    def add_fingerprint(self, key: str, fingerprint: int) -> Optional[str]:
+        """add() for a fingerprint the caller already computed with simhash()."""
+        if not fingerprint:
+            return None
+        canonical = self.find(fingerprint)
+        if canonical is not None:
+            self._clusters.setdefault(canonical, []).append(key)
+            return canonical
+        self._fingerprints[key] = fingerprint
+        for table, band in zip(self._tables, self._band_keys(fingerprint)):
+            table.setdefault(band, []).append(key)
+        return None
+
+    def clusters(self) -> List[Dict[str, Any]]:
+        """Duplicate clusters: [{'canonical': url, 'duplicates': [url, ...]}, ...]"""
+        return [{"canonical": k, "duplicates": list(v)} for k, v in self._clusters.items()]
+
+    @property
+    def duplicate_count(self) -> int:
+        return sum(len(v) for v in self._clusters.values())
+
+
+def duplicate_cluster_finding(clusters: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Audit finding (initial-scan finding shape) describing near-duplicate page clusters."""
+    if not clusters:
+        return None
+    dupes = sum(len(c.get("duplicates") or []) for c in clusters)
+    examples = "; ".join(
+        f"{c['canonical']} ~ {', '.join(c['duplicates'][:3])}" for c in clusters[:3]
+    )
+    return {
+        "id": "content_near_duplicates",
+        "category": "SEO",
+        "title": "Near-duplicate pages detected",
+        "severity": "warning" if dupes >= 3 else "suggestion",
+        "description": (
+            f"{dupes} page(s) in {len(clusters)} cluster(s) are near-identical to another page "
+            f"(pagination, print views, archives or locale copies). Consolidate them or set "
+            f"canonical URLs. Examples: {examples}"
+        ),
+    }
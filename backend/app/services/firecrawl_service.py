@@ -1,19 +1,22 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Set, Callable, Coroutine
-from urllib.parse import urlparse, urljoin
 import asyncio
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple, Coroutine
+from urllib.parse import urlparse, urljoin
 
 import httpx
-from bs4 import BeautifulSoup
 
-# Optional Crawl4AI integration
-try:
-    from crawl4ai import AsyncWebCrawler  # type: ignore
-    HAS_CRAWL4AI = True
-except Exception:
-    AsyncWebCrawler = None  # type: ignore
-    HAS_CRAWL4AI = False
+from .cpu_pool_service import run_cpu
+from .dedup_service import SimHashIndex, simhash
+from .frontier_service import SKIPPED, crawl_store, restore_pages, start_crawl
+from .host_scheduler_service import get_scheduler
+from .http_cache_service import cached_get
+from .http_service import HAS_CRAWL4AI, browser_page, close_http, get_browser
+from .markdown_service import html_to_markdown
+from .page_store_service import PageStore
+from ..observability import stage, traced, track_render
 
 
 # Keep the same exception name for compatibility with existing endpoints
@@ -21,104 +24,63 @@ class FirecrawlNotConfigured(RuntimeError):
     pass
 
 
-# Reuse UA policy
-try:
-    from .crawler_service import DEFAULT_USER_AGENT  # type: ignore
-except Exception:
-    DEFAULT_USER_AGENT = (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    )
+# Pages fetched/rendered at the same time during a crawl
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+
 
+async def _fetch_html(url: str, timeout_s: float = 15.0) -> str:
+    resp = await cached_get(url, timeout=httpx.Timeout(timeout_s, connect=5.0))
+    resp.raise_for_status()
+    return resp.text
 
-def _run_in_new_loop(coro_factory: Callable[[], Coroutine[Any, Any, Any]]) -> Any:
+
+def _html_to_markdown(html: str) -> Tuple[str, List[str]]:
     """
-    Run the given coroutine factory in a fresh event loop to avoid 'already running loop' errors
-    when called from FastAPI async endpoints.
+    Single-pass conversion; returns (markdown, hrefs) so crawls can discover links
+    without a second parse of the same page.
     """
-    loop = asyncio.new_event_loop()
-    try:
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(coro_factory())
-    finally:
-        try:
-            loop.run_until_complete(asyncio.sleep(0))
-        except Exception:
-            pass
-        loop.close()
-
-
-def _fetch_html_sync(url: str, timeout_s: float = 15.0) -> str:
-    timeout = httpx.Timeout(timeout_s, connect=5.0)
-    headers = {"User-Agent": DEFAULT_USER_AGENT}
-    with httpx.Client(headers=headers, follow_redirects=True, timeout=timeout) as client:
-        resp = client.get(url)
-        resp.raise_for_status()
-        return resp.text
-
-
-def _text_content(node: BeautifulSoup) -> str:
-    txt = node.get_text(" ", strip=True)
-    return " ".join(txt.split())
-
-
-def _html_to_markdown(soup: BeautifulSoup) -> str:
-    parts: List[str] = []
-    if soup.title and soup.title.string:
-        parts.append(f"# {soup.title.string.strip()}")
-    for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "p", "li"]):
-        name = tag.name or ""
-        txt = _text_content(tag)
-        if not txt:
-            continue
-        if name == "h1":
-            parts.append(f"# {txt}")
-        elif name == "h2":
-            parts.append(f"## {txt}")
-        elif name == "h3":
-            parts.append(f"### {txt}")
-        elif name == "h4":
-            parts.append(f"#### {txt}")
-        elif name == "h5":
-            parts.append(f"##### {txt}")
-        elif name == "h6":
-            parts.append(f"###### {txt}")
-        else:
-            parts.append(txt)
-    return "\n\n".join(parts).strip()
+    md, info = html_to_markdown(html)
+    title = info.get("title") or ""
+    if title:
+        md = f"# {title}\n\n{md}".strip()
+    return md, info.get("links") or []
+
+
+async def _convert(html: str) -> Tuple[str, List[str]]:
+    with stage("parse"):
+        return await run_cpu(_html_to_markdown, html, size_hint=len(html))
 
 
 async def _crawl4ai_fetch_markdown(url: str) -> str:
     """
-    Use Crawl4AI to fetch a single page and return clean markdown.
+    Render a single page on the shared, warm Crawl4AI browser and return clean markdown.
     """
-    assert AsyncWebCrawler is not None
-    async with AsyncWebCrawler() as crawler:
-        result = await crawler.arun(url=url)
-        md = getattr(result, "markdown", "") or getattr(result, "content_markdown", "") or ""
-        return md.strip()
-
-
-def scrape_markdown(url: str) -> Tuple[str, Dict[str, Any]]:
+    crawler = await get_browser()
+    if crawler is None:
+        return ""
+    async with browser_page():
+        await get_scheduler().acquire(url)
+        result = await track_render(crawler.arun(url=url))
+    md = getattr(result, "markdown", "") or getattr(result, "content_markdown", "") or ""
+    return str(md).strip()
+
+
+@traced("scrape_markdown", record_args=("url",))
+async def scrape_markdown(url: str) -> Tuple[str, Dict[str, Any]]:
     """
     Single page scrape -> returns (markdown, raw_info).
-    Prefers Crawl4AI if available; falls back to httpx+BeautifulSoup.
+    Prefers Crawl4AI if available; falls back to httpx + single-pass markdown conversion.
     """
     try:
         if HAS_CRAWL4AI:
-            md: str = _run_in_new_loop(lambda: _crawl4ai_fetch_markdown(url))
+            md = await _crawl4ai_fetch_markdown(url)
             if not md:
                 # Fallback to raw HTML extraction
-                html = _fetch_html_sync(url)
-                soup = BeautifulSoup(html, "html.parser")
-                md = _html_to_markdown(soup)
+                md, _ = await _convert(await _fetch_html(url))
             return md, {"url": url, "ok": True, "via": "crawl4ai", "length": len(md)}
         # Fallback path
-        html = _fetch_html_sync(url)
-        soup = BeautifulSoup(html, "html.parser")
-        md = _html_to_markdown(soup)
-        return md, {"url": url, "ok": True, "via": "httpx+bs4", "length": len(md)}
+        md, _ = await _convert(await _fetch_html(url))
+        return md, {"url": url, "ok": True, "via": "httpx", "length": len(md)}
     except Exception as e:
         # Surface errors to callers
         return "", {"url": url, "ok": False, "error": str(e)}
@@ -145,75 +107,174 @@ def _normalize_url(base: str, link: str) -> Optional[str]:
         return None
 
 
-def crawl_markdown(url: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+async def _crawl_page(url: str) -> Optional[Tuple[str, List[str]]]:
+    """(markdown, hrefs) for one crawl page, or None when it cannot be fetched."""
+    try:
+        # HTTP pass for link discovery (and markdown when no browser is available)
+        resp = await cached_get(url, timeout=httpx.Timeout(12.0, connect=5.0))
+        if resp.status_code >= 400 or not resp.text:
+            return None
+        html_md, hrefs = await _convert(resp.text)
+    except Exception:
+        return None
+
+    md = html_md
+    if HAS_CRAWL4AI:
+        try:
+            md = await _crawl4ai_fetch_markdown(url) or html_md
+        except Exception:
+            md = html_md
+    return md, hrefs
+
+
+async def crawl_markdown(
+    url: str, limit: int = 10, skip_duplicates: bool = True, concurrency: Optional[int] = None,
+    crawl_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Site crawl (same-host BFS). Returns (pages, meta).
     For each page: {'markdown': str, 'url': str}
-    Prefers Crawl4AI page fetch; falls back to httpx+BeautifulSoup.
+    Materializes crawl_pages(); prefer that for large crawls.
+    """
+    store, meta = await crawl_pages(url, limit=limit, skip_duplicates=skip_duplicates, concurrency=concurrency,
+                                    crawl_id=crawl_id)
+    with store:
+        return list(store.iter_dicts()), meta
+
+
+@traced("crawl_markdown", record_args=("url", "limit", "crawl_id"))
+async def crawl_pages(
+    url: str, limit: int = 10, skip_duplicates: bool = True, concurrency: Optional[int] = None,
+    crawl_id: Optional[str] = None,
+) -> Tuple[PageStore, Dict[str, Any]]:
+    """
+    Site crawl (same-host BFS) into a PageStore, which the caller closes. Returns (store, meta).
+    Near-duplicate pages are grouped in meta['duplicates'] and, with skip_duplicates,
+    left out of pages.
+    Prefers Crawl4AI page rendering on the shared browser; falls back to httpx +
+    single-pass markdown conversion. Up to `concurrency` pages are in flight at once,
+    taken from the front of the queue so results keep BFS order; the host scheduler
+    paces them and robots.txt-disallowed URLs are skipped (meta['robotsBlocked']).
+    The queue and finished pages live in the persistent crawl frontier: passing the
+    crawl_id of an earlier, interrupted or paused crawl resumes it (from any worker),
+    and a crawl paused meanwhile stops after the pages in flight (meta['state']).
+    Crawls started without a crawl_id are deleted from the frontier once done.
     """
     start = url
     if not start.startswith(("http://", "https://")):
         start = "https://" + start
     parsed = urlparse(start)
     root_host = parsed.netloc or parsed.path
+    width = max(1, concurrency or CRAWL_CONCURRENCY)
+
+    frontier, resumed = await asyncio.to_thread(
+        start_crawl, "site", start, {"limit": limit, "skipDuplicates": skip_duplicates}, crawl_id)
+    pages = crawl_store(frontier)
+    near_dupes = SimHashIndex()
+    scheduler = get_scheduler()
+    if resumed:
+        await asyncio.to_thread(restore_pages, frontier, pages, near_dupes)
+    else:
+        await asyncio.to_thread(frontier.push, [start])
+    # keep queue from exploding
+    max_queued = max(limit * 3, limit + 5)
 
-    visited: Set[str] = set()
-    queue: List[str] = [start]
-    pages: List[Dict[str, Any]] = []
-
-    headers = {"User-Agent": DEFAULT_USER_AGENT}
-    timeout = httpx.Timeout(12.0, connect=5.0)
-
-    with httpx.Client(headers=headers, follow_redirects=True, timeout=timeout) as client:
-        while queue and len(pages) < limit:
-            current = queue.pop(0)
-            if current in visited:
-                continue
-            visited.add(current)
-
-            try:
-                # First use HTTP to discover links quickly
-                resp = client.get(current)
-                if resp.status_code >= 400 or not resp.text:
+    try:
+        while len(pages) < limit and await asyncio.to_thread(frontier.state) == "running":
+            batch = await asyncio.to_thread(frontier.claim, min(width, limit - len(pages)))
+            if not batch:
+                break
+
+            verdicts = await asyncio.gather(*(scheduler.allowed(e.url) for e in batch))
+            for entry, ok in zip(batch, verdicts):
+                if not ok:
+                    await asyncio.to_thread(frontier.skip, entry.seq, "robots")
+            batch = [e for e, ok in zip(batch, verdicts) if ok]
+
+            results = await asyncio.gather(*(_crawl_page(e.url) for e in batch))
+            for entry, result in zip(batch, results):
+                if result is None:
+                    await asyncio.to_thread(frontier.fail, entry.seq, "unreachable")
                     continue
-                html = resp.text
-                soup = BeautifulSoup(html, "html.parser")
-
-                # Get markdown via Crawl4AI if available; otherwise from soup
-                if HAS_CRAWL4AI:
-                    try:
-                        md: str = _run_in_new_loop(lambda: _crawl4ai_fetch_markdown(current))
-                    except Exception:
-                        md = _html_to_markdown(soup)
-                else:
-                    md = _html_to_markdown(soup)
-
-                if md:
-                    pages.append({"markdown": md, "url": current})
+                md, hrefs = result
+                kept = None
+                fingerprint = None
+                if len(pages) < limit and md:
+                    fingerprint = simhash(md)
+                    if near_dupes.add_fingerprint(entry.url, fingerprint) is None or not skip_duplicates:
+                        kept = md
 
                 # Discover same-host URLs
-                for a in soup.find_all("a", href=True):
-                    nxt = _normalize_url(current, a.get("href") or "")
-                    if not nxt:
-                        continue
-                    if not _same_host(nxt, root_host):
-                        continue
-                    if nxt in visited or nxt in queue:
-                        continue
-                    if len(queue) + len(pages) >= max(limit * 3, limit + 5):
-                        # keep queue from exploding
-                        continue
-                    queue.append(nxt)
-
-            except Exception:
-                # Skip problematic pages
-                continue
+                links: List[str] = []
+                for href in hrefs:
+                    nxt = _normalize_url(entry.url, href)
+                    if nxt and _same_host(nxt, root_host):
+                        links.append(nxt)
+                await asyncio.to_thread(frontier.record_page, entry, kept, fingerprint, links,
+                                        max_queued - len(pages))
+                if kept is not None:
+                    # The frontier now holds the markdown; the store keeps the record
+                    pages.add(entry.url, kept, simhash=fingerprint, key=entry.seq)
+    except BaseException:
+        # Hand unfinished claims back right away instead of waiting for the lease to expire
+        frontier.release()
+        pages.close()
+        raise
+
+    state = await asyncio.to_thread(frontier.finish, len(pages) >= limit)
+    robots_blocked = [u for u, _ in await asyncio.to_thread(frontier.notes, SKIPPED)]
+    if crawl_id is None and state == "done":
+        # The store reads its pages from the frontier: drop the crawl when it is closed
+        pages.on_close(frontier.discard)
 
     meta: Dict[str, Any] = {
         "seed": start,
-        "pages": [p.get("url") for p in pages if isinstance(p, dict)],
+        "pages": pages.urls(),
         "count": len(pages),
         "ok": True,
-        "via": "crawl4ai" if HAS_CRAWL4AI else "httpx+bs4",
+        "via": "crawl4ai" if HAS_CRAWL4AI else "httpx",
+        "duplicates": near_dupes.clusters(),
+        "robotsBlocked": robots_blocked,
+        "crawlId": frontier.id,
+        "state": state,
     }
     return pages, meta
+
+
+# --- Sync wrappers (CLI only) ---------------------------------------------------------------
+# Never call these from the app: they run their own event loop and close the shared
+# client/browser when done.
+
+
+def _run_cli(coro: Coroutine[Any, Any, Any]) -> Any:
+    async def runner() -> Any:
+        try:
+            return await coro
+        finally:
+            await close_http()
+
+    return asyncio.run(runner())
+
+
+def scrape_markdown_sync(url: str) -> Tuple[str, Dict[str, Any]]:
+    return _run_cli(scrape_markdown(url))
+
+
+def crawl_markdown_sync(url: str, limit: int = 10, skip_duplicates: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    return _run_cli(crawl_markdown(url, limit=limit, skip_duplicates=skip_duplicates))
+
+
+if __name__ == "__main__":
+    # python -m backend.app.services.firecrawl_service <url> [crawl_limit]
+    if len(sys.argv) < 2:
+        print("usage: python -m backend.app.services.firecrawl_service <url> [crawl_limit]")
+        sys.exit(2)
+    if len(sys.argv) > 2:
+        crawled, crawl_meta = crawl_markdown_sync(sys.argv[1], limit=int(sys.argv[2]))
+        for page in crawled:
+            print(f"{page['url']}\t{len(page['markdown'])}")
+        print(crawl_meta)
+    else:
+        markdown, info = scrape_markdown_sync(sys.argv[1])
+        print(markdown)
+        print(info)
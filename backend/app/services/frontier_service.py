@@ -0,0 +1,501 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..storage import connect_sqlite
+from .page_store_service import PageStore
+
+# Persistent crawl frontier. Every crawl (site crawl or batch scan) has a crawl id; its
+# queue, visited set, per-page outcome and running stats live in one SQLite file that
+# all worker processes share. A restarted or second worker picks the crawl up where it
+# stopped: queued URLs are claimed in BFS order under a lease, and claims of a worker
+# that died expire after FRONTIER_LEASE_SECONDS.
+#
+# Storage is compact for six-figure URL counts: URLs on the crawl's origin are stored as
+# host-relative paths, and the visited set is a WITHOUT ROWID table of 64-bit URL hashes.
+FRONTIER_DB = "crawl_frontier.sqlite3"
+FRONTIER_LEASE_SECONDS = float(os.getenv("FRONTIER_LEASE_SECONDS", "300"))
+# Finished, paused or abandoned crawls are dropped after this many days
+FRONTIER_RETENTION_DAYS = float(os.getenv("FRONTIER_RETENTION_DAYS", "7"))
+
+QUEUED, CLAIMED, DONE, SKIPPED, FAILED = 0, 1, 2, 3, 4
+CRAWL_STATES = ("running", "paused", "done")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    crawl_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    state INTEGER NOT NULL,
+    claimed_by TEXT,
+    claimed_until REAL,
+    fingerprint INTEGER,
+    title TEXT,
+    note TEXT,
+    lastmod TEXT,
+    body BLOB,
+    PRIMARY KEY (crawl_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frontier_state ON frontier(crawl_id, state, seq);
+CREATE TABLE IF NOT EXISTS visited (
+    crawl_id TEXT NOT NULL,
+    h INTEGER NOT NULL,
+    PRIMARY KEY (crawl_id, h)
+) WITHOUT ROWID;
+"""
+
+
+class CrawlNotFound(KeyError):
+    pass
+
+
+class CrawlKindMismatch(ValueError):
+    """A crawl_id that belongs to a crawl of another kind (e.g. a batch scan id given to a site crawl)."""
+
+
+def url_hash(url: str) -> int:
+    """Signed 64-bit hash of a URL (SQLite INTEGER) for the visited set."""
+    digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _signed64(value: Optional[int]) -> Optional[int]:
+    # SimHash fingerprints are unsigned 64-bit; SQLite integers are signed
+    return value - (1 << 64) if value is not None and value >= 1 << 63 else value
+
+
+def _unsigned64(value: Optional[int]) -> Optional[int]:
+    return value + (1 << 64) if value is not None and value < 0 else value
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class FrontierEntry:
+    __slots__ = ("seq", "url", "depth", "lastmod")
+
+    def __init__(self, seq: int, url: str, depth: int, lastmod: Optional[str] = None) -> None:
+        self.seq = seq
+        self.url = url
+        self.depth = depth
+        # Sitemap lastmod given to push(), for incremental checks
+        self.lastmod = lastmod
+
+
+class CrawlFrontier:
+    """
+    One crawl's frontier. Methods are synchronous and serialised by a per-process lock;
+    async crawl loops call them through asyncio.to_thread like the HTTP cache.
+    """
+
+    def __init__(self, db: "FrontierDB", crawl_id: str, origin: str) -> None:
+        self.db = db
+        self.id = crawl_id
+        self.origin = origin
+        self.worker = db.worker
+
+    # --- URL encoding -----------------------------------------------------------------------
+
+    def _compact(self, url: str) -> str:
+        if url.startswith(self.origin) and url[len(self.origin):len(self.origin) + 1] in ("/", "?", ""):
+            return url[len(self.origin):] or "/"
+        return url
+
+    def _expand(self, path: str) -> str:
+        return self.origin + path if path.startswith(("/", "?")) else path
+
+    # --- Queue ------------------------------------------------------------------------------
+
+    def push(self, urls: Iterable[str], depth: int = 0, max_new: Optional[int] = None,
+             lastmods: Optional[Dict[str, str]] = None) -> int:
+        """
+        Queue URLs not seen before in this crawl (at most max_new); returns how many were
+        new. lastmods (url -> sitemap lastmod) are carried by the claimed entries.
+        """
+        added = 0
+        with self.db.transaction() as conn:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM frontier WHERE crawl_id = ?", (self.id,)
+            ).fetchone()[0]
+            for url in urls:
+                if max_new is not None and added >= max_new:
+                    break
+                cur = conn.execute("INSERT OR IGNORE INTO visited VALUES (?, ?)", (self.id, url_hash(url)))
+                if not cur.rowcount:
+                    continue
+                conn.execute(
+                    "INSERT INTO frontier (crawl_id, seq, path, depth, state, lastmod) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.id, seq, self._compact(url), depth, QUEUED, lastmods.get(url) if lastmods else None),
+                )
+                seq += 1
+                added += 1
+        return added
+
+    def seen(self, url: str) -> bool:
+        row = self.db.query_one("SELECT 1 FROM visited WHERE crawl_id = ? AND h = ?", (self.id, url_hash(url)))
+        return row is not None
+
+    def claim(self, n: int = 1, lease: float = FRONTIER_LEASE_SECONDS) -> List[FrontierEntry]:
+        """Lease the next n queued URLs (or expired claims) in BFS order to this worker."""
+        now = time.time()
+        with self.db.transaction() as conn:
+            rows = conn.execute(
+                "SELECT seq, path, depth, lastmod FROM frontier WHERE crawl_id = ? "
+                "AND (state = ? OR (state = ? AND claimed_until < ?)) ORDER BY seq LIMIT ?",
+                (self.id, QUEUED, CLAIMED, now, n),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE frontier SET state = ?, claimed_by = ?, claimed_until = ? WHERE crawl_id = ? AND seq = ?",
+                [(CLAIMED, self.worker, now + lease, self.id, row[0]) for row in rows],
+            )
+        return [FrontierEntry(seq, self._expand(path), depth, lastmod) for seq, path, depth, lastmod in rows]
+
+    def release(self) -> None:
+        """Put this worker's unfinished claims back in the queue (pause, shutdown)."""
+        self.db.execute(
+            "UPDATE frontier SET state = ?, claimed_by = NULL, claimed_until = NULL "
+            "WHERE crawl_id = ? AND state = ? AND claimed_by = ?",
+            (QUEUED, self.id, CLAIMED, self.worker),
+        )
+
+    def complete(self, seq: int, markdown: Optional[str] = None, title: Optional[str] = None,
+                 fingerprint: Optional[int] = None, note: Optional[str] = None) -> None:
+        """
+        Mark a claimed URL done. markdown (compressed) is kept when the crawl returns pages;
+        it is the page's only copy - the crawl's PageStore reads it back through body().
+        """
+        body = zlib.compress(markdown.encode("utf-8", "surrogatepass"), 6) if markdown is not None else None
+        self.db.execute(
+            "UPDATE frontier SET state = ?, claimed_by = NULL, claimed_until = NULL, fingerprint = ?, "
+            "title = ?, note = ?, body = ? WHERE crawl_id = ? AND seq = ?",
+            (DONE, _signed64(fingerprint), title, note, body, self.id, seq),
+        )
+
+    def record_page(self, entry: FrontierEntry, markdown: Optional[str], fingerprint: Optional[int],
+                    links: Iterable[str], max_queued: Optional[int] = None, title: Optional[str] = None) -> None:
+        """
+        Finish a crawled page: queue its links (while fewer than max_queued URLs wait) and
+        complete it. Markdown None with a fingerprint marks a skipped near-duplicate.
+        """
+        # Links first: a worker dying in between re-crawls the page instead of losing its links
+        room = None if max_queued is None else max(0, max_queued - self.queued())
+        self.push(links, entry.depth + 1, max_new=room)
+        note = "duplicate" if markdown is None and fingerprint is not None else None
+        self.complete(entry.seq, markdown, title=title, fingerprint=fingerprint, note=note)
+
+    def skip(self, seq: int, note: str) -> None:
+        self._finish(seq, SKIPPED, note)
+
+    def fail(self, seq: int, error: str) -> None:
+        self._finish(seq, FAILED, error[:500])
+
+    def _finish(self, seq: int, state: int, note: str) -> None:
+        self.db.execute(
+            "UPDATE frontier SET state = ?, claimed_by = NULL, claimed_until = NULL, note = ? "
+            "WHERE crawl_id = ? AND seq = ?",
+            (state, note, self.id, seq),
+        )
+
+    # --- Progress ---------------------------------------------------------------------------
+
+    def queued(self) -> int:
+        row = self.db.query_one("SELECT COUNT(*) FROM frontier WHERE crawl_id = ? AND state = ?", (self.id, QUEUED))
+        return row[0] if row else 0
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.db.query("SELECT state, COUNT(*) FROM frontier WHERE crawl_id = ? GROUP BY state", (self.id,))
+        by_state = dict(rows)
+        return {
+            "queued": by_state.get(QUEUED, 0),
+            "inFlight": by_state.get(CLAIMED, 0),
+            "done": by_state.get(DONE, 0),
+            "skipped": by_state.get(SKIPPED, 0),
+            "failed": by_state.get(FAILED, 0),
+        }
+
+    def body(self, seq: int) -> Optional[bytes]:
+        """Compressed markdown of a completed URL (None for duplicates and unknown seqs)."""
+        row = self.db.query_one("SELECT body FROM frontier WHERE crawl_id = ? AND seq = ?", (self.id, seq))
+        return row[0] if row else None
+
+    def done_pages(self) -> Iterator[Tuple[int, str, Optional[str], Optional[str], Optional[int], Optional[str]]]:
+        """(seq, url, markdown, title, fingerprint, note) of completed URLs in crawl order."""
+        last = -1
+        while True:
+            rows = self.db.query(
+                "SELECT seq, path, body, title, fingerprint, note FROM frontier "
+                "WHERE crawl_id = ? AND state = ? AND seq > ? ORDER BY seq LIMIT 200",
+                (self.id, DONE, last),
+            )
+            if not rows:
+                return
+            for seq, path, body, title, fingerprint, note in rows:
+                last = seq
+                markdown = zlib.decompress(body).decode("utf-8", "surrogatepass") if body is not None else None
+                yield seq, self._expand(path), markdown, title, _unsigned64(fingerprint), note
+
+    def notes(self, state: int, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """(url, note) of skipped or failed URLs in crawl order."""
+        sql = "SELECT path, note FROM frontier WHERE crawl_id = ? AND state = ? ORDER BY seq"
+        params: Tuple[Any, ...] = (self.id, state)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [(self._expand(path), note or "") for path, note in self.db.query(sql, params)]
+
+    def info(self) -> Dict[str, Any]:
+        return self.db.info(self.id)
+
+    def finish(self, limit_reached: bool = False) -> str:
+        """
+        Release this worker's claims and mark the crawl done once its queue is drained (or
+        the caller reached its page limit). Returns the crawl's state: "paused" when it was
+        paused meanwhile, "running" while other workers still hold claims.
+        """
+        self.release()
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT state FROM crawls WHERE id = ?", (self.id,)).fetchone()
+            state = row[0] if row else "done"
+            if state != "running":
+                return state
+            pending = conn.execute(
+                "SELECT 1 FROM frontier WHERE crawl_id = ? AND state IN (?, ?) LIMIT 1", (self.id, QUEUED, CLAIMED)
+            ).fetchone()
+            if limit_reached or pending is None:
+                conn.execute("UPDATE crawls SET state = 'done', updated_at = ? WHERE id = ?", (time.time(), self.id))
+                return "done"
+        return state
+
+    def discard(self) -> None:
+        """Delete the crawl and everything stored for it."""
+        self.db.delete(self.id)
+
+    def state(self) -> str:
+        row = self.db.query_one("SELECT state FROM crawls WHERE id = ?", (self.id,))
+        return row[0] if row else "done"
+
+    def set_state(self, state: str) -> None:
+        self.db.set_state(self.id, state)
+
+    def update_stats(self, **values: Any) -> Dict[str, Any]:
+        """Merge values into the crawl's stats (numbers are added, lists extended, rest replaced)."""
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT stats FROM crawls WHERE id = ?", (self.id,)).fetchone()
+            stats = json.loads(row[0]) if row else {}
+            for key, value in values.items():
+                old = stats.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(old, (int, float)):
+                    stats[key] = old + value
+                elif isinstance(value, list) and isinstance(old, list):
+                    stats[key] = old + value
+                else:
+                    stats[key] = value
+            conn.execute("UPDATE crawls SET stats = ?, updated_at = ? WHERE id = ?",
+                         (json.dumps(stats), time.time(), self.id))
+        return stats
+
+
+class FrontierDB:
+    """The shared frontier database (one connection per process, WAL, busy timeout)."""
+
+    def __init__(self, filename: str = FRONTIER_DB) -> None:
+        self._lock = threading.RLock()
+        self._conn = connect_sqlite(filename)
+        self._conn.execute("PRAGMA busy_timeout = 10000")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if "lastmod" not in columns:
+            # Frontier files from before lastmods had their own column
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN lastmod TEXT")
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._pruned = 0.0
+
+    # --- Low level --------------------------------------------------------------------------
+
+    def transaction(self) -> "_Transaction":
+        return _Transaction(self)
+
+    def execute(self, sql: str, params: Tuple[Any, ...] = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def query(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Tuple[Any, ...] = ()) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    # --- Crawls -----------------------------------------------------------------------------
+
+    def create(self, kind: str, seed: str, params: Optional[Dict[str, Any]] = None,
+               crawl_id: Optional[str] = None) -> CrawlFrontier:
+        self.prune()
+        crawl_id = crawl_id or uuid.uuid4().hex
+        origin = _origin(seed)
+        now = time.time()
+        self.execute(
+            "INSERT INTO crawls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (crawl_id, kind, origin, seed, json.dumps(params or {}), "running", "{}", now, now),
+        )
+        return CrawlFrontier(self, crawl_id, origin)
+
+    def open(self, crawl_id: str, kind: Optional[str] = None) -> CrawlFrontier:
+        """An existing crawl, set running again. Raises CrawlNotFound or CrawlKindMismatch."""
+        row = self.query_one("SELECT kind, origin FROM crawls WHERE id = ?", (crawl_id,))
+        if row is None:
+            raise CrawlNotFound(crawl_id)
+        if kind is not None and row[0] != kind:
+            raise CrawlKindMismatch(f"Crawl '{crawl_id}' is a '{row[0]}' crawl, not '{kind}'")
+        self.set_state(crawl_id, "running")
+        return CrawlFrontier(self, crawl_id, row[1])
+
+    def set_state(self, crawl_id: str, state: str) -> None:
+        if state not in CRAWL_STATES:
+            raise ValueError(f"Unknown crawl state '{state}', expected one of {CRAWL_STATES}")
+        self.execute("UPDATE crawls SET state = ?, updated_at = ? WHERE id = ?", (state, time.time(), crawl_id))
+
+    def info(self, crawl_id: str) -> Dict[str, Any]:
+        row = self.query_one(
+            "SELECT id, kind, seed, params, state, stats, created_at, updated_at FROM crawls WHERE id = ?",
+            (crawl_id,),
+        )
+        if row is None:
+            raise CrawlNotFound(crawl_id)
+        return self._info(row, CrawlFrontier(self, crawl_id, _origin(row[2])).counts())
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self.query(
+            "SELECT id, kind, seed, params, state, stats, created_at, updated_at FROM crawls "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [self._info(row) for row in rows]
+
+    @staticmethod
+    def _info(row: Tuple[Any, ...], counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        crawl_id, kind, seed, params, state, stats, created_at, updated_at = row
+        out = {
+            "crawlId": crawl_id,
+            "kind": kind,
+            "seed": seed,
+            "params": json.loads(params),
+            "state": state,
+            "stats": json.loads(stats),
+            "createdAt": created_at,
+            "updatedAt": updated_at,
+        }
+        if counts is not None:
+            out["frontier"] = counts
+        return out
+
+    def delete(self, crawl_id: str) -> None:
+        with self.transaction() as conn:
+            for table, column in (("frontier", "crawl_id"), ("visited", "crawl_id"), ("crawls", "id")):
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (crawl_id,))
+
+    def prune(self, max_age_days: float = FRONTIER_RETENTION_DAYS) -> int:
+        """Drop crawls not touched for max_age_days (at most once an hour per process)."""
+        now = time.time()
+        if now - self._pruned < 3600:
+            return 0
+        self._pruned = now
+        stale = [r[0] for r in self.query("SELECT id FROM crawls WHERE updated_at < ?", (now - max_age_days * 86400,))]
+        for crawl_id in stale:
+            self.delete(crawl_id)
+        return len(stale)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so claims from several processes
+    # never hand out the same URL
+    def __init__(self, db: FrontierDB) -> None:
+        self.db = db
+
+    def __enter__(self) -> Any:
+        self.db._lock.acquire()
+        self.db._conn.execute("BEGIN IMMEDIATE")
+        return self.db._conn
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        try:
+            self.db._conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.db._lock.release()
+
+
+_db: Optional[FrontierDB] = None
+_db_lock = threading.Lock()
+
+
+def get_frontier_db() -> FrontierDB:
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = FrontierDB()
+        return _db
+
+
+def start_crawl(kind: str, seed: str, params: Optional[Dict[str, Any]] = None,
+                crawl_id: Optional[str] = None) -> Tuple[CrawlFrontier, bool]:
+    """
+    (frontier, resumed): reopens crawl_id when it exists (same kind), otherwise starts a
+    new crawl under that id (or a fresh one). Raises CrawlKindMismatch when crawl_id
+    belongs to a crawl of another kind.
+    """
+    db = get_frontier_db()
+    if crawl_id:
+        try:
+            return db.open(crawl_id, kind), True
+        except CrawlNotFound:
+            pass
+    return db.create(kind, seed, params, crawl_id), False
+
+
+def restore_pages(frontier: CrawlFrontier, pages: Any, near_dupes: Any) -> int:
+    """
+    Reload a resumed crawl's finished pages into its PageStore (None: fingerprints only;
+    the store reads markdown back from the frontier, see crawl_store()) and SimHashIndex
+    in crawl order; duplicates only contribute their fingerprint.
+    Returns the pages restored.
+    """
+    restored = 0
+    for seq, url, markdown, title, fingerprint, _ in frontier.done_pages():
+        if fingerprint is not None:
+            near_dupes.add_fingerprint(url, fingerprint)
+        if markdown is not None and pages is not None:
+            pages.add(url, markdown, title=title, simhash=fingerprint or 0, key=seq)
+            restored += 1
+    return restored
+
+
+def crawl_store(frontier: CrawlFrontier) -> PageStore:
+    """
+    PageStore for a crawl's pages that reads their markdown from the frontier instead of
+    holding a second copy; add() pages with their frontier seq as key once recorded.
+    """
+    return PageStore(source=frontier.body)
@@ -4,6 +4,8 @@ import json
 import os
 from typing import Any, Dict, List
 
+from ..observability import instrument_gemini_client
+
 try:
     # New Google GenAI SDK
     from google import genai  # type: ignore
@@ -18,6 +20,7 @@ class GeminiNotConfigured(RuntimeError):
 def _get_client() -> "genai.Client":
     """
     Create a Gemini client using GEMINI_API_KEY from environment.
+    GEMINI_BASE_URL points the client at another endpoint (e.g. the benchmark stand-in).
     """
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -26,7 +29,10 @@ def _get_client() -> "genai.Client":
         raise GeminiNotConfigured(
             "google-genai is not installed. Ensure 'google-genai' exists in backend/requirements.txt and install."
         )
-    return genai.Client(api_key=api_key)
+    base_url = os.getenv("GEMINI_BASE_URL")
+    if base_url:
+        return instrument_gemini_client(genai.Client(api_key=api_key, http_options={"base_url": base_url}))
+    return instrument_gemini_client(genai.Client(api_key=api_key))
 
 
 def generate_content_chunks(markdown: str, max_chunks: int = 20) -> List[Dict[str, str]]:
@@ -164,6 +170,10 @@ def generate_review_reply(review_text: str) -> str:
     return (response.text or "").strip()
 
 
+# Competitor markdown per site sent to the gap analysis (crawls are read lazily up to this)
+SEMANTIC_COVERAGE_COMPETITOR_CHARS = int(os.getenv("SEMANTIC_COVERAGE_COMPETITOR_CHARS", "200000"))
+
+
 def semantic_coverage_analysis(my_markdown: str, competitor_markdown_map: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     Perform a semantic coverage / gap analysis between 'my_markdown' and competitors.
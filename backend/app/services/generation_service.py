@@ -3,6 +3,8 @@ from __future__ import annotations
 import os
 from typing import Any
 
+from ..observability import instrument_gemini_client
+
 try:
     # Google GenAI SDK
     from google import genai  # type: ignore
@@ -22,7 +24,10 @@ def _get_client() -> "genai.Client":
         raise GeminiNotConfigured(
             "google-genai is not installed. Ensure 'google-genai' exists in backend/requirements.txt and install."
         )
-    return genai.Client(api_key=api_key)
+    base_url = os.getenv("GEMINI_BASE_URL")
+    if base_url:
+        return instrument_gemini_client(genai.Client(api_key=api_key, http_options={"base_url": base_url}))
+    return instrument_gemini_client(genai.Client(api_key=api_key))
 
 
 def _gen_plain(model: str, system_instruction: str, contents: str) -> str:
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import os
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from ..observability import stage
+from .robots_service import RobotsRules, get_rules
+
+# Per-origin politeness for every outbound page fetch: token bucket, robots.txt
+# Crawl-delay / Request-rate, and adaptive slowdown when a host answers 429/503.
+HOST_RATE = float(os.getenv("HOST_RATE", "2"))  # requests per second per origin
+HOST_BURST = float(os.getenv("HOST_BURST", "4"))
+HOST_MAX_PENALTY = 32.0
+# Longest a fetch waits for its turn (Crawl-delay, Retry-After, queue); one that would
+# have to wait longer fails with HostBusy instead of going out early
+HOST_MAX_DELAY = float(os.getenv("HOST_MAX_DELAY", "30"))
+# Per-origin state unused for this long is dropped (robots.txt is fetched again on reuse)
+HOST_IDLE_TTL = float(os.getenv("HOST_IDLE_TTL", "900"))
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", "3600"))
+# Product token our crawls are evaluated as in robots.txt groups (falls back to '*')
+ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "neuro-web")
+
+
+def origin_of(url: str) -> str:
+    p = urlparse(url)
+    return f"{p.scheme or 'https'}://{p.netloc or p.path.split('/', 1)[0]}".lower()
+
+
+class HostBusy(RuntimeError):
+    """The origin's Crawl-delay / Retry-After would hold a fetch longer than HOST_MAX_DELAY."""
+
+
+class _HostState:
+    __slots__ = ("rate", "burst", "tokens", "updated", "penalty", "backoff_until",
+                 "robots", "robots_fetched", "robots_lock", "crawl_delay", "last_used")
+
+    def __init__(self) -> None:
+        self.rate = HOST_RATE
+        self.burst = HOST_BURST
+        self.tokens = HOST_BURST
+        self.updated = time.monotonic()
+        self.penalty = 1.0
+        self.backoff_until = 0.0
+        self.robots: Optional[RobotsRules] = None
+        self.robots_fetched = 0.0
+        self.robots_lock = asyncio.Lock()
+        self.crawl_delay: Optional[float] = None
+        self.last_used = self.updated
+
+    def idle(self, now: float) -> bool:
+        return (now - self.last_used > HOST_IDLE_TTL and now >= self.backoff_until
+                and not self.robots_lock.locked())
+
+    def effective_rate(self) -> float:
+        rate = self.rate
+        if self.crawl_delay:
+            rate = min(rate, 1.0 / self.crawl_delay)
+        return rate / self.penalty
+
+
+class HostScheduler:
+    """
+    Shared scheduler keyed by origin (scheme://host[:port]).
+
+    acquire(url) waits for the origin's next token; report(url, status, headers) feeds
+    429/503 responses back (multiplicative slowdown plus Retry-After) and lets the rate
+    recover gradually on success. allowed(url) evaluates robots.txt for our crawler
+    token; it is enforced on crawl paths, not on single pages a user asked for.
+    Origins idle for HOST_IDLE_TTL are forgotten, so the table tracks active hosts only.
+    """
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, _HostState] = {}
+        self._swept = time.monotonic()
+
+    def _state(self, url: str) -> _HostState:
+        key = origin_of(url)
+        now = time.monotonic()
+        if now - self._swept > min(60.0, HOST_IDLE_TTL):
+            self._evict_idle(now)
+        state = self._hosts.get(key)
+        if state is None:
+            state = _HostState()
+            self._hosts[key] = state
+        state.last_used = now
+        return state
+
+    def _evict_idle(self, now: float) -> None:
+        self._swept = now
+        for key in [k for k, s in self._hosts.items() if s.idle(now)]:
+            del self._hosts[key]
+
+    async def acquire(self, url: str) -> None:
+        state = self._state(url)
+        await self._robots(url)  # Crawl-delay is known before the first token is handed out
+        now = time.monotonic()
+        rate = state.effective_rate()
+        burst = 1.0 if (state.crawl_delay or state.penalty > 1.0) else state.burst
+        state.tokens = min(burst, state.tokens + (now - state.updated) * rate)
+        state.updated = now
+        # Reserve a token; a negative balance is the queue of waiters ahead of us
+        state.tokens -= 1.0
+        wait = -state.tokens / rate if state.tokens < 0 else 0.0
+        wait = max(wait, state.backoff_until - now)
+        if wait > HOST_MAX_DELAY:
+            state.tokens += 1.0  # give the slot back to callers that can wait
+            raise HostBusy(f"{origin_of(url)} needs {wait:.0f}s before the next request (limit {HOST_MAX_DELAY:.0f}s)")
+        if wait > 0:
+            with stage("politeness"):
+                await asyncio.sleep(wait)
+                # A 429/503 answered meanwhile pushes the backoff out: honour it in full
+                while True:
+                    remaining = state.backoff_until - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if remaining > HOST_MAX_DELAY:
+                        raise HostBusy(f"{origin_of(url)} is backing off for {remaining:.0f}s")
+                    await asyncio.sleep(remaining)
+
+    def report(self, url: str, status_code: int, headers: Optional[Any] = None) -> None:
+        state = self._state(url)
+        if status_code in (429, 503):
+            state.penalty = min(HOST_MAX_PENALTY, state.penalty * 2.0)
+            delay = _retry_after(headers)
+            if delay is None:
+                delay = 1.0 / state.effective_rate()
+            state.backoff_until = max(state.backoff_until, time.monotonic() + delay)
+            state.tokens = min(state.tokens, 0.0)
+        elif status_code < 400 and state.penalty > 1.0:
+            state.penalty = max(1.0, state.penalty * 0.9)
+
+    async def _robots(self, url: str) -> Optional[RobotsRules]:
+        state = self._state(url)
+        if state.robots_fetched and time.monotonic() - state.robots_fetched < ROBOTS_TTL:
+            return state.robots
+        async with state.robots_lock:
+            if state.robots_fetched and time.monotonic() - state.robots_fetched < ROBOTS_TTL:
+                return state.robots
+            from .http_cache_service import cached_get
+
+            rules: Optional[RobotsRules] = None
+            origin = origin_of(url)
+            try:
+                resp = await cached_get(origin + "/robots.txt", timeout=10.0, polite=False)
+                if resp.status_code == 200:
+                    rules = get_rules(origin, resp.text or "")
+            except Exception:
+                # Unreachable robots.txt: treat as no rules (lenient for audits)
+                rules = None
+            state.robots = rules
+            state.robots_fetched = time.monotonic()
+            delay = rules.crawl_delay(ROBOTS_USER_AGENT) if rules else None
+            interval = rules.request_interval(ROBOTS_USER_AGENT) if rules else None
+            # Request-rate is a minimum spacing like Crawl-delay; the stricter one applies
+            state.crawl_delay = max(float(delay or 0.0), interval or 0.0) or None
+            return rules
+
+    async def allowed(self, url: str) -> bool:
+        """robots.txt verdict for our crawler token (no robots.txt / 4xx means allowed)."""
+        rules = await self._robots(url)
+        if rules is None:
+            return True
+        return rules.is_allowed(ROBOTS_USER_AGENT, url)
+
+    async def rules(self, url: str) -> Optional[RobotsRules]:
+        """Compiled robots.txt of the url's origin (None when there is none)."""
+        return await self._robots(url)
+
+    async def crawl_delay(self, url: str) -> Optional[float]:
+        await self._robots(url)
+        return self._state(url).crawl_delay
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            origin: {
+                "rate": round(s.effective_rate(), 3),
+                "penalty": s.penalty,
+                "crawlDelay": s.crawl_delay,
+            }
+            for origin, s in self._hosts.items()
+        }
+
+
+def _retry_after(headers: Optional[Any]) -> Optional[float]:
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+_scheduler: Optional[HostScheduler] = None
+
+
+def get_scheduler() -> HostScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HostScheduler()
+    return _scheduler
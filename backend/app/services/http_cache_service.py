@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..observability import http_trace, observe_fetch, stage
+from ..observability.metrics import HTTP_CACHE_RESULTS
+from ..storage import connect_sqlite
+from .host_scheduler_service import get_scheduler
+from .http_service import get_http_client
+
+# On-disk HTTP cache for page/robots/sitemap fetches.
+# Fresh entries are served locally; stale ones are revalidated with If-None-Match /
+# If-Modified-Since so unchanged pages cost a 304 instead of a full download.
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE", "1").lower() not in ("0", "false", "no")
+# Freshness when the response carries no max-age/Expires
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "600"))
+# Upper bound on stored (compressed) bytes; least recently used entries are evicted
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Bodies larger than this are not stored
+HTTP_CACHE_MAX_ENTRY_BYTES = int(os.getenv("HTTP_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+CACHE_HEADER = "x-neuro-cache"  # HIT | REVALIDATED | MISS | STALE | BYPASS
+
+_MAX_AGE = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)", re.I)
+
+# Request headers that select a different representation of the same URL; they are part of
+# the cache key, so e.g. a German and an English fetch of one page are stored separately.
+# Responses that Vary on anything else (or on "*") are not stored.
+_KEY_HEADERS = ("accept", "accept-language", "user-agent")
+_VARY_OK = frozenset(_KEY_HEADERS) | {"accept-encoding"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    content_type TEXT,
+    encoding TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+"""
+
+
+class _Entry:
+    __slots__ = ("final_url", "status", "content_type", "encoding", "etag", "last_modified", "body", "expires_at")
+
+    def __init__(self, row: Tuple[Any, ...]) -> None:
+        (self.final_url, self.status, self.content_type, self.encoding,
+         self.etag, self.last_modified, self.body, self.expires_at) = row
+
+
+class HttpCache:
+    """SQLite store of zlib-compressed response bodies with validators and LRU eviction."""
+
+    def __init__(self, filename: str = "http_cache.sqlite3", max_bytes: int = HTTP_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        self._conn.executescript(_SCHEMA)
+        self._total = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+
+    def get(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, status, content_type, encoding, etag, last_modified, body, expires_at "
+                "FROM responses WHERE url = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), key))
+        return _Entry(row)
+
+    def put(self, key: str, resp: httpx.Response, expires_at: float) -> None:
+        body = zlib.compress(resp.content, 6)
+        if len(body) > HTTP_CACHE_MAX_ENTRY_BYTES:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, str(resp.url), resp.status_code, resp.headers.get("content-type"), resp.encoding,
+                    resp.headers.get("etag"), resp.headers.get("last-modified"),
+                    body, len(body), now, expires_at, now,
+                ),
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def touch(self, key: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE url = ?",
+                (expires_at, time.time(), key),
+            )
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until 90% of the cap is free again
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall()
+        doomed = []
+        for url, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((url,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._total = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": int(count), "bytes": self._total, "maxBytes": self.max_bytes}
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+    return _cache
+
+
+def _expires_at(resp: httpx.Response, now: float) -> Optional[float]:
+    """Expiry from Cache-Control/Expires; None when the response must not be stored."""
+    cc = (resp.headers.get("cache-control") or "").lower()
+    if "no-store" in cc:
+        return None
+    if "no-cache" in cc:
+        return now  # store, but revalidate on every use
+    m = _MAX_AGE.search(cc)
+    if m:
+        return now + int(m.group(1))
+    expires = resp.headers.get("expires")
+    if expires:
+        try:
+            return email.utils.parsedate_to_datetime(expires).timestamp()
+        except Exception:
+            return now
+    return now + HTTP_CACHE_TTL
+
+
+def _cache_key(url: str, headers: Optional[Dict[str, str]]) -> str:
+    """URL plus the representation-selecting request headers the caller set explicitly."""
+    if not headers:
+        return url
+    lowered = {k.lower(): v for k, v in headers.items()}
+    parts = [f"{name}: {lowered[name]}" for name in _KEY_HEADERS if name in lowered]
+    return "\n".join([url, *parts]) if parts else url
+
+
+def _storable_vary(resp: httpx.Response) -> bool:
+    """False when the response varies on a request header the cache key does not cover."""
+    vary = resp.headers.get("vary")
+    if not vary:
+        return True
+    fields = {f.strip().lower() for f in vary.split(",") if f.strip()}
+    return fields <= _VARY_OK
+
+
+def _from_entry(url: str, entry: _Entry, cache_state: str) -> httpx.Response:
+    headers = {CACHE_HEADER: cache_state}
+    if entry.content_type:
+        headers["content-type"] = entry.content_type
+    if entry.etag:
+        headers["etag"] = entry.etag
+    if entry.last_modified:
+        headers["last-modified"] = entry.last_modified
+    resp = httpx.Response(
+        entry.status,
+        headers=headers,
+        content=zlib.decompress(entry.body),
+        request=httpx.Request("GET", entry.final_url or url),
+    )
+    if entry.encoding:
+        resp.encoding = entry.encoding
+    return resp
+
+
+async def cached_get(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Union[float, httpx.Timeout, None] = None,
+    polite: bool = True,
+) -> httpx.Response:
+    """
+    GET through the on-disk cache on the pooled client. Only 200 responses are stored,
+    keyed by URL plus any Accept / Accept-Language / User-Agent the caller passes.
+    The returned response carries an x-neuro-cache header (HIT, REVALIDATED, MISS,
+    STALE when a stored copy is served because revalidation failed, BYPASS).
+    Network errors propagate when there is no stored copy.
+    Requests that go to the network wait for the host scheduler (polite=False only for
+    the scheduler's own robots.txt fetch).
+    """
+    resp = await _cached_get(url, headers, timeout, polite)
+    HTTP_CACHE_RESULTS.inc(resp.headers.get(CACHE_HEADER, "MISS"))
+    return resp
+
+
+async def _cached_get(
+    url: str,
+    headers: Optional[Dict[str, str]],
+    timeout: Union[float, httpx.Timeout, None],
+    polite: bool,
+) -> httpx.Response:
+    client = get_http_client()
+    kwargs: Dict[str, Any] = {}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    scheduler = get_scheduler() if polite else None
+
+    async def send(req_headers: Optional[Dict[str, str]]) -> httpx.Response:
+        if scheduler is not None:
+            await scheduler.acquire(url)
+        trace = http_trace()
+        host = urlsplit(url).netloc.lower()
+        started = time.perf_counter()
+        try:
+            with stage("fetch"):
+                if trace is not None:
+                    # connect / wait / download split of this fetch for the request's timings
+                    resp = await client.get(url, headers=req_headers, extensions={"trace": trace}, **kwargs)
+                else:
+                    resp = await client.get(url, headers=req_headers, **kwargs)
+        except Exception:
+            observe_fetch(host, "error", time.perf_counter() - started)
+            raise
+        observe_fetch(host, resp.status_code, time.perf_counter() - started)
+        if scheduler is not None:
+            scheduler.report(url, resp.status_code, resp.headers)
+        return resp
+
+    if not HTTP_CACHE_ENABLED:
+        resp = await send(headers)
+        resp.headers[CACHE_HEADER] = "BYPASS"
+        return resp
+
+    cache = get_cache()
+    key = _cache_key(url, headers)
+    with stage("cache"):
+        entry = await asyncio.to_thread(cache.get, key)
+    now = time.time()
+    if entry is not None and entry.expires_at > now:
+        return _from_entry(url, entry, "HIT")
+
+    req_headers = dict(headers or {})
+    if entry is not None:
+        if entry.etag:
+            req_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            req_headers["If-Modified-Since"] = entry.last_modified
+
+    try:
+        resp = await send(req_headers)
+    except Exception:
+        if entry is not None:
+            return _from_entry(url, entry, "STALE")
+        raise
+
+    now = time.time()
+    if resp.status_code == 304 and entry is not None:
+        expires_at = _expires_at(resp, now)
+        await asyncio.to_thread(cache.touch, key, expires_at if expires_at is not None else now)
+        return _from_entry(url, entry, "REVALIDATED")
+
+    if resp.status_code == 200 and _storable_vary(resp):
+        expires_at = _expires_at(resp, now)
+        if expires_at is not None:
+            with stage("cache"):
+                await asyncio.to_thread(cache.put, key, resp, expires_at)
+                final_url = str(resp.url)
+                if final_url != url:
+                    # Redirect target is usually requested next (canonical URLs); store it too
+                    await asyncio.to_thread(cache.put, _cache_key(final_url, headers), resp, expires_at)
+    resp.headers[CACHE_HEADER] = "MISS"
+    return resp
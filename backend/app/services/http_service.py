@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Optional
+
+import httpx
+
+# Optional Crawl4AI browser
+try:
+    from crawl4ai import AsyncWebCrawler  # type: ignore
+    HAS_CRAWL4AI = True
+except Exception:
+    AsyncWebCrawler = None  # type: ignore
+    HAS_CRAWL4AI = False
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Connection pool shared by all outbound page fetches of the app
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+# Concurrent pages rendered by the shared browser
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+_browser: Any = None
+_browser_loop: Optional[asyncio.AbstractEventLoop] = None
+_browser_lock: Optional[asyncio.Lock] = None
+_browser_pages: Optional[asyncio.Semaphore] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Pooled AsyncClient bound to the running loop (keep-alive, redirects, default UA).
+    Callers pass per-request timeouts; do not close the returned client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": DEFAULT_USER_AGENT},
+            follow_redirects=True,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def get_browser() -> Any:
+    """
+    Warm, shared Crawl4AI browser started on first use (None when crawl4ai is unavailable).
+    Use `browser_page()` to bound concurrent renders.
+    """
+    global _browser, _browser_loop, _browser_lock, _browser_pages
+    if not HAS_CRAWL4AI:
+        return None
+    loop = asyncio.get_running_loop()
+    if _browser_lock is None or _browser_loop is not loop:
+        _browser_lock = asyncio.Lock()
+        _browser_pages = asyncio.Semaphore(BROWSER_MAX_PAGES)
+        _browser = None
+        _browser_loop = loop
+    async with _browser_lock:
+        if _browser is None:
+            crawler = AsyncWebCrawler()
+            await crawler.__aenter__()
+            _browser = crawler
+    return _browser
+
+
+def browser_page() -> asyncio.Semaphore:
+    """Semaphore limiting concurrent renders on the shared browser (call after get_browser)."""
+    assert _browser_pages is not None
+    return _browser_pages
+
+
+async def close_http() -> None:
+    """Close the pooled client and the shared browser (app shutdown / end of a CLI run)."""
+    global _client, _browser
+    client, _client = _client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+    browser, _browser = _browser, None
+    if browser is not None:
+        try:
+            await browser.__aexit__(None, None, None)
+        except Exception:
+            pass
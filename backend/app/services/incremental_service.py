@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+import httpx
+
+from ..storage import connect_sqlite
+from .http_cache_service import cached_get
+
+# Incremental re-audits. Every audit run (kind + site, e.g. "scan:https://example.com")
+# stores what it saw per page: sitemap lastmod, ETag / Last-Modified and a content hash,
+# next to the page's result. An incremental run of the same audit then re-processes only
+# pages that changed; the stored result of every other page is merged into the new
+# aggregate as is. A page counts as unchanged when
+#   1. its sitemap lastmod equals the stored one (no request at all), or
+#   2. a conditional GET with the stored validators answers 304 or the same validators, or
+#   3. its content hash (as defined by the audit) equals the stored one - the page was
+#      fetched and parsed, but the expensive stages (LLM calls, analysis) are skipped.
+# Pages no longer audited by a completed run are dropped from the state.
+AUDIT_STATE_DB = "audit_state.sqlite3"
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+NEW = "new"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    audit TEXT NOT NULL,
+    url TEXT NOT NULL,
+    lastmod TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    result BLOB,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (audit, url)
+);
+CREATE INDEX IF NOT EXISTS pages_checked ON pages(audit, checked_at);
+"""
+
+
+class PageState:
+    """What the previous run stored for one page."""
+
+    __slots__ = ("url", "lastmod", "etag", "last_modified", "content_hash", "_result")
+
+    def __init__(self, row: Tuple[Any, ...]) -> None:
+        self.url, self.lastmod, self.etag, self.last_modified, self.content_hash, self._result = row
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        if self._result is None:
+            return None
+        return json.loads(zlib.decompress(self._result))
+
+
+class AuditStateStore:
+    """SQLite table of per-page audit state (validators, hash, compressed JSON result)."""
+
+    def __init__(self, filename: str = AUDIT_STATE_DB) -> None:
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(filename)
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, audit: str, url: str) -> Optional[PageState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, lastmod, etag, last_modified, content_hash, result FROM pages "
+                "WHERE audit = ? AND url = ?",
+                (audit, url),
+            ).fetchone()
+        return PageState(row) if row else None
+
+    def put(self, audit: str, url: str, lastmod: Optional[str], etag: Optional[str],
+            last_modified: Optional[str], digest: Optional[str], result: Any) -> None:
+        blob = zlib.compress(json.dumps(result, default=str).encode("utf-8"), 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (audit, url, lastmod, etag, last_modified, digest, blob, time.time()),
+            )
+
+    def touch(self, audit: str, url: str, lastmod: Optional[str], etag: Optional[str],
+              last_modified: Optional[str]) -> None:
+        """Unchanged page: refresh lastmod and validators (when known), keep hash and result."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET lastmod = COALESCE(?, lastmod), etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified), checked_at = ? WHERE audit = ? AND url = ?",
+                (lastmod, etag, last_modified, time.time(), audit, url),
+            )
+
+    def prune(self, audit: str, before: float) -> int:
+        """Drop pages of an audit not checked since `before` (no longer part of it)."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM pages WHERE audit = ? AND checked_at < ?", (audit, before))
+        return cur.rowcount
+
+    def delete(self, audit: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE audit = ?", (audit,))
+
+
+_store: Optional[AuditStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_audit_state() -> AuditStateStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AuditStateStore()
+    return _store
+
+
+class PageCheck:
+    """Change verdict for one page, with the validators to store for the next run."""
+
+    __slots__ = ("url", "status", "reason", "prior", "lastmod", "etag", "last_modified", "response")
+
+    def __init__(self, url: str, status: str, reason: str, prior: Optional[PageState], lastmod: Optional[str],
+                 etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 response: Optional[httpx.Response] = None) -> None:
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.prior = prior
+        self.lastmod = lastmod
+        self.etag = etag
+        self.last_modified = last_modified
+        # The probe response (status 200) when the page must be processed; reuse it
+        # instead of fetching again
+        self.response = response
+
+    def observe(self, resp: httpx.Response) -> None:
+        """Take validators from the audit's own fetch (runs that did not probe)."""
+        self.etag = self.etag or resp.headers.get("etag")
+        self.last_modified = self.last_modified or resp.headers.get("last-modified")
+
+    def reusable(self, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        The stored result when the page is unchanged, or (given the new content hash)
+        when its content hash still matches; None when the page must be processed.
+        """
+        if self.prior is None:
+            return None
+        if self.status == UNCHANGED or (digest is not None and digest == self.prior.content_hash):
+            return self.prior.result
+        return None
+
+
+async def check_page(prior: Optional[PageState], url: str, lastmod: Optional[str] = None,
+                     timeout: Union[float, httpx.Timeout, None] = None) -> PageCheck:
+    """Compare a page against its stored state: sitemap lastmod first, then a conditional GET."""
+    if prior is not None and prior.content_hash is not None and lastmod and lastmod == prior.lastmod:
+        return PageCheck(url, UNCHANGED, "lastmod", prior, lastmod)
+
+    headers: Dict[str, str] = {}
+    if prior is not None and prior.content_hash is not None:
+        if prior.etag:
+            headers["If-None-Match"] = prior.etag
+        if prior.last_modified:
+            headers["If-Modified-Since"] = prior.last_modified
+    status = NEW if prior is None else CHANGED
+    try:
+        resp = await cached_get(url, headers=headers or None, timeout=timeout)
+    except Exception:
+        # Let the audit's own fetch report the error
+        return PageCheck(url, status, "unreachable", prior, lastmod)
+
+    etag = resp.headers.get("etag")
+    last_modified = resp.headers.get("last-modified")
+    if headers:
+        if resp.status_code == 304:
+            return PageCheck(url, UNCHANGED, "not-modified", prior, lastmod, prior.etag, prior.last_modified)
+        if resp.status_code == 200 and (
+            (etag and etag == prior.etag) or (not etag and last_modified and last_modified == prior.last_modified)
+        ):
+            return PageCheck(url, UNCHANGED, "validators", prior, lastmod, etag, last_modified)
+    return PageCheck(url, status, "fetched", prior, lastmod, etag, last_modified,
+                     resp if resp.status_code == 200 else None)
+
+
+class IncrementalAudit:
+    """
+    One run of an audit against the state its previous runs stored. With
+    incremental=False every page is processed, but state is still recorded so the next
+    incremental run has something to compare against. `complete` is cleared by the audit
+    when it leaves pages out (page cap, robots, errors); only complete runs prune.
+    """
+
+    def __init__(self, kind: str, site: str, incremental: bool = True,
+                 lastmods: Optional[Dict[str, str]] = None, started: Optional[float] = None) -> None:
+        self.key = f"{kind}:{site.rstrip('/')}"
+        self.incremental = incremental
+        self.lastmods = lastmods or {}
+        self.started = started if started is not None else time.time()
+        self.store = get_audit_state()
+        self.unchanged = 0
+        self.processed = 0
+        self.complete = True
+
+    async def check(self, url: str, lastmod: Optional[str] = None,
+                    timeout: Union[float, httpx.Timeout, None] = None) -> PageCheck:
+        lastmod = lastmod or self.lastmods.get(url)
+        if not self.incremental:
+            return PageCheck(url, NEW, "full", None, lastmod)
+        prior = await asyncio.to_thread(self.store.get, self.key, url)
+        return await check_page(prior, url, lastmod, timeout)
+
+    async def keep(self, check: PageCheck) -> None:
+        """The page's stored result was reused."""
+        self.unchanged += 1
+        await asyncio.to_thread(self.store.touch, self.key, check.url, check.lastmod, check.etag, check.last_modified)
+
+    async def record(self, check: PageCheck, digest: Optional[str], result: Any) -> None:
+        """The page was processed: store its result with the validators of this run."""
+        self.processed += 1
+        await asyncio.to_thread(self.store.put, self.key, check.url, check.lastmod, check.etag,
+                                check.last_modified, digest, result)
+
+    async def finish(self, prune: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Drop pages this run no longer covers - by default only when it covered the whole
+        page set (`complete`); a partial run would drop state of pages it merely skipped.
+        Returns the run summary.
+        """
+        if prune is None:
+            prune = self.complete
+        removed = await asyncio.to_thread(self.store.prune, self.key, self.started) if prune else 0
+        return {
+            "incremental": self.incremental,
+            "unchanged": self.unchanged,
+            "reprocessed": self.processed,
+            "removed": removed,
+        }
+
+
+def lastmod_map(entries: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+    """url -> lastmod for sitemap entries that carry one."""
+    return {url: lastmod for url, lastmod in entries if lastmod}
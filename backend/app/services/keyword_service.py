@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Optional C Aho-Corasick automaton (pip install pyahocorasick). Without it the matcher
+# compiles the keyword trie into a single regex, which also runs in C and reports the
+# same hits.
+try:
+    import ahocorasick  # type: ignore
+    HAS_AHOCORASICK = True
+except Exception:  # pragma: no cover
+    ahocorasick = None  # type: ignore
+    HAS_AHOCORASICK = False
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex for a keyword trie; greedy optional tails make every match the longest one."""
+    trie: Dict[str, Any] = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher compiled once for a set of named keyword groups.
+    Semantics match `keyword in text` (substring, not word boundary); keywords are
+    lowercased, so callers pass lowercased text as before.
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]]) -> None:
+        self.groups: Dict[str, Tuple[str, ...]] = {
+            g: tuple(dict.fromkeys(k.lower() for k in kws if k)) for g, kws in groups.items()
+        }
+        self._keyword_groups: Dict[str, List[str]] = defaultdict(list)
+        for group, kws in self.groups.items():
+            for kw in kws:
+                self._keyword_groups[kw].append(group)
+        keywords = sorted(self._keyword_groups)
+        # Shorter keywords that end where a longer one is a prefix also match at that spot
+        self._prefixes: Dict[str, List[str]] = {
+            kw: [k for k in keywords if kw.startswith(k)] for kw in keywords
+        }
+
+        self._automaton = None
+        if HAS_AHOCORASICK and keywords:
+            automaton = ahocorasick.Automaton()
+            for kw in keywords:
+                automaton.add_word(kw, kw)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+        self._rx = re.compile(_trie_pattern(keywords)) if keywords else None
+
+    def contains_any(self, text: str) -> bool:
+        """True if any keyword occurs; stops at the first hit."""
+        return bool(self._rx and self._rx.search(text or ""))
+
+    def scan(self, text: str) -> Dict[str, List[int]]:
+        """All occurrences in one pass: {keyword: [start offsets]}."""
+        hits: Dict[str, List[int]] = defaultdict(list)
+        if not text or self._rx is None:
+            return hits
+        if self._automaton is not None:
+            for end, kw in self._automaton.iter(text):
+                hits[kw].append(end - len(kw) + 1)
+            return hits
+        # Longest keyword per start position; resuming at start+1 keeps overlapping hits
+        # while the regex engine skips non-matching stretches in C.
+        prefixes = self._prefixes
+        search = self._rx.search
+        m = search(text, 0)
+        while m is not None:
+            start = m.start()
+            for kw in prefixes[m.group()]:
+                hits[kw].append(start)
+            m = search(text, start + 1)
+        return hits
+
+    def match(self, text: str) -> Dict[str, Any]:
+        """
+        Scan once and summarise per group:
+        {'groups': {group: hit_count}, 'keywords': {keyword: [positions]}}
+        Groups without hits are reported with 0.
+        """
+        hits = self.scan(text)
+        counts = {g: 0 for g in self.groups}
+        for kw, positions in hits.items():
+            for g in self._keyword_groups[kw]:
+                counts[g] += len(positions)
+        return {"groups": counts, "keywords": dict(hits)}
+
+    def matched_groups(self, text: str) -> List[str]:
+        """Groups with at least one hit, in definition order."""
+        counts = self.match(text)["groups"]
+        return [g for g in self.groups if counts[g]]
+
+    def first_group(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        groups = self.matched_groups(text)
+        return groups[0] if groups else default
+
+
+# --- Shared keyword sets for the heuristic classifiers ----------------------------------------
+
+STOPWORDS = frozenset(
+    """und oder der die das mit aus für von sowie the and you your are was were our bei zum zur ein eine eines einem einer ist im in zu auf den dem des als wir sie er es an am vom vom nach bis durch etc http https www com de""".split()
+)
+
+INDUSTRY_KEYWORDS: Dict[str, List[str]] = {
+    "consulting": ["beratung", "unternehmensberatung", "consulting", "strategie", "digitalisierung"],
+    "marketing": ["marketing", "seo", "content", "kampagne", "social media"],
+    "healthcare": ["gesundheit", "klinik", "arzt", "patient", "medical", "pharma"],
+    "ecommerce": ["shop", "e-commerce", "checkout", "produkt", "warenkorb"],
+    "software": ["software", "saas", "plattform", "api", "entwicklung"],
+}
+AUDIENCE_B2B_KEYWORDS = ["unternehmen", "kmu", "firma", "business", "b2b"]
+POSITIVE_SENTIMENT_KEYWORDS = ["erfolg", "vorteil", "optimierung", "gewinn", "stark"]
+
+# Expected sections/anchors for a small business site (de/en)
+CONTENT_SECTIONS: Dict[str, List[str]] = {
+    "leistungen": ["leistungen", "services", "angebot", "was wir bieten", "solutions"],
+    "referenzen": ["referenzen", "kunden", "cases", "fallstudien", "case studies"],
+    "über uns": ["über uns", "unternehmen", "team", "wer wir sind", "about"],
+    "preise": ["preise", "pricing", "pakete", "kosten"],
+    "kontakt": ["kontakt", "contact", "anfrage", "termin", "beraten"],
+    "faq": ["faq", "häufige fragen", "fragen und antworten"],
+    "blog/news": ["blog", "news", "aktuell", "magazin"],
+}
+
+# NAP-relevant keywords to look for
+NAP_KEYWORDS = [
+    "impressum", "kontakt", "contact", "address", "adresse",
+    "telefon", "phone", "email", "e-mail", "gmbh", "ug", "ag", "inc", "ltd",
+    "geschäftsführer", "managing director", "ceo", "inhaber",
+    "straße", "street", "plz", "postleitzahl", "berlin", "münchen", "hamburg",
+]
+
+@lru_cache(maxsize=None)
+def topic_matcher() -> KeywordMatcher:
+    """Industry, audience and sentiment groups for topic recognition, scanned together."""
+    groups: Dict[str, List[str]] = {f"industry:{k}": v for k, v in INDUSTRY_KEYWORDS.items()}
+    groups["audience:b2b"] = AUDIENCE_B2B_KEYWORDS
+    groups["sentiment:positive"] = POSITIVE_SENTIMENT_KEYWORDS
+    return KeywordMatcher(groups)
+
+
+@lru_cache(maxsize=None)
+def content_section_matcher() -> KeywordMatcher:
+    return KeywordMatcher(CONTENT_SECTIONS)
+
+
+@lru_cache(maxsize=None)
+def nap_matcher() -> KeywordMatcher:
+    return KeywordMatcher({"nap": NAP_KEYWORDS})
@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+# lxml ships with the backend requirements; its target parser streams tokenizer
+# events from C. The stdlib tokenizer is only a safety net.
+try:
+    from lxml import etree  # type: ignore
+    HAS_LXML = True
+except Exception:  # pragma: no cover
+    etree = None  # type: ignore
+    HAS_LXML = False
+
+
+# Elements whose content never reaches the markdown output
+NON_CONTENT_TAGS = frozenset({
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "embed",
+    "button", "select", "option", "datalist", "textarea",
+})
+
+# Navigation chrome that carries links but no page content
+BOILERPLATE_TAGS = frozenset({"nav"})
+
+DEFAULT_DROP_TAGS = NON_CONTENT_TAGS | BOILERPLATE_TAGS
+
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "body", "blockquote", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "header", "hr", "html", "li", "main",
+    "ol", "p", "pre", "section", "summary", "table", "tbody", "tfoot", "thead", "tr", "ul",
+})
+
+# Block containers that take part in main-content scoring
+_CONTAINER_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "body", "details", "div", "dl", "figure",
+    "footer", "form", "header", "main", "ol", "section", "table", "ul",
+})
+
+# Readability-style class/id hints
+_POSITIVE_HINT = re.compile(r"article|body|content|entry|inhalt|main|page|post|story|text", re.I)
+_NEGATIVE_HINT = re.compile(
+    r"banner|breadcrumb|comment|consent|cookie|footer|gdpr|header|menu|modal|navbar|"
+    r"newsletter|popup|promo|related|share|sidebar|social|sponsor|teaser|widget",
+    re.I,
+)
+_BOILERPLATE_ROLES = frozenset({"banner", "navigation", "contentinfo", "complementary", "dialog", "alertdialog"})
+_BOILERPLATE_CONTAINERS = frozenset({"header", "footer", "aside", "form"})
+
+# Marks a <br> inside the inline buffer; source newlines are plain whitespace
+_LINE_BREAK = "\x00"
+
+
+class _MarkdownSink:
+    """
+    Receives tokenizer events (lxml parser target protocol) and builds markdown blocks
+    in a single pass. Title, meta description and link targets are collected on the way
+    so callers never need a second parse of the same document.
+
+    Alongside each block it records the innermost container node plus visible and
+    link text lengths, which is all the main-content scorer needs.
+    """
+
+    def __init__(self, drop_tags: frozenset) -> None:
+        self.drop_tags = drop_tags
+        self.blocks: List[str] = []
+        self.links: List[str] = []
+        self.title = ""
+        self.description = ""
+
+        self._buf: List[str] = []
+        self._skip: List[str] = []
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._heading = 0
+        self._pre = 0
+        self._quote = 0
+        self._lists: List[str] = []
+        self._list_item = False
+        self._link_href: Optional[str] = None
+        self._link_start = 0
+        self._link_chars = 0
+        self._markup_chars = 0
+
+        # Container tree (node 0 is the document root) and per-block statistics
+        self.node_parent: List[int] = [0]
+        self.node_tag: List[str] = [""]
+        self.node_hint: List[int] = [0]
+        self.node_boiler: List[bool] = [False]
+        self.block_node: List[int] = []
+        self.block_text: List[int] = []
+        self.block_link: List[int] = []
+        self.block_heading: List[int] = []
+        self._open: List[int] = [0]
+
+    # -- parser target protocol ----------------------------------------------------------
+
+    def start(self, tag: Any, attrib: Any) -> None:
+        if not isinstance(tag, str):
+            return  # processing instructions and comments arrive with non-str tags
+        tag = tag.lower()
+
+        if tag == "a":
+            href = (attrib.get("href") or "").strip()
+            if href:
+                self.links.append(href)
+            if not self._skip:
+                self._link_href = href
+                self._link_start = len(self._buf)
+            return
+
+        if self._skip:
+            if tag in self.drop_tags:
+                self._skip.append(tag)
+            return
+        if tag in self.drop_tags:
+            self._skip.append(tag)
+            return
+
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            name = (attrib.get("name") or attrib.get("property") or "").lower()
+            if name in ("description", "og:description") and not self.description:
+                self.description = (attrib.get("content") or "").strip()
+        elif tag == "br":
+            self._buf.append(_LINE_BREAK)
+        elif tag in _HEADINGS:
+            self._flush()
+            self._heading = _HEADINGS[tag]
+        elif tag in ("ul", "ol"):
+            self._flush()
+            self._lists.append(tag)
+        elif tag == "li":
+            self._flush()
+            self._list_item = True
+        elif tag == "pre":
+            self._flush()
+            self._pre += 1
+        elif tag == "blockquote":
+            self._flush()
+            self._quote += 1
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+        if tag in _CONTAINER_TAGS:
+            self._push_container(tag, attrib)
+
+    def end(self, tag: Any) -> None:
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+
+        if self._skip:
+            if tag == self._skip[-1]:
+                self._skip.pop()
+            return
+
+        if tag == "a":
+            self._close_link()
+        elif tag == "title":
+            self._in_title = False
+            if not self.title:
+                self.title = " ".join("".join(self._title_parts).split())
+        elif tag in _HEADINGS:
+            self._flush()
+            self._heading = 0
+        elif tag in ("ul", "ol"):
+            self._flush()
+            if self._lists:
+                self._lists.pop()
+        elif tag == "li":
+            self._flush()
+        elif tag == "pre":
+            self._flush()
+            self._pre = max(0, self._pre - 1)
+        elif tag == "blockquote":
+            self._flush()
+            self._quote = max(0, self._quote - 1)
+        elif tag in ("td", "th"):
+            self._buf.append(" ")
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+        if tag in _CONTAINER_TAGS:
+            self._pop_container(tag)
+
+    def data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        self._buf.append(data)
+
+    def comment(self, text: str) -> None:
+        return
+
+    def close(self) -> "_MarkdownSink":
+        self._flush()
+        return self
+
+    # -- container tree --------------------------------------------------------------------
+
+    def _push_container(self, tag: str, attrib: Any) -> None:
+        parent = self._open[-1]
+        hint = 0
+        boiler = tag in _BOILERPLATE_CONTAINERS
+        if tag in ("main", "article"):
+            hint += 25
+        role = (attrib.get("role") or "").lower()
+        if role == "main":
+            hint += 25
+        elif role in _BOILERPLATE_ROLES:
+            boiler = True
+        if tag != "body":
+            names = f"{attrib.get('id') or ''} {attrib.get('class') or ''}"
+            if names.strip():
+                positive = _POSITIVE_HINT.search(names) is not None
+                if positive:
+                    hint += 25
+                if _NEGATIVE_HINT.search(names) is not None:
+                    hint -= 25
+                    boiler = boiler or not positive
+            if "hidden" in attrib or (attrib.get("aria-hidden") or "").lower() == "true":
+                boiler = True
+        self.node_parent.append(parent)
+        self.node_tag.append(tag)
+        self.node_hint.append(hint)
+        self.node_boiler.append(boiler or self.node_boiler[parent])
+        self._open.append(len(self.node_tag) - 1)
+
+    def _pop_container(self, tag: str) -> None:
+        # Unbalanced markup (stdlib tokenizer) may leave stray nodes open; unwind to the match
+        for i in range(len(self._open) - 1, 0, -1):
+            if self.node_tag[self._open[i]] == tag:
+                del self._open[i:]
+                return
+
+    # -- block assembly ------------------------------------------------------------------
+
+    def _close_link(self) -> None:
+        href = self._link_href
+        self._link_href = None
+        if not href or href.startswith(("#", "javascript:")):
+            return
+        text = " ".join("".join(self._buf[self._link_start:]).replace(_LINE_BREAK, " ").split())
+        if text:
+            del self._buf[self._link_start:]
+            self._buf.append(f" [{text}]({href}) ")
+            self._link_chars += len(text)
+            self._markup_chars += len(href) + 4
+
+    def _flush(self) -> None:
+        if not self._buf:
+            self._list_item = False
+            return
+        raw = "".join(self._buf)
+        link_chars, markup_chars = self._link_chars, self._markup_chars
+        self._buf = []
+        self._link_start = 0
+        self._link_chars = 0
+        self._markup_chars = 0
+
+        if self._pre:
+            text = raw.replace(_LINE_BREAK, "\n").strip("\n")
+            if text.strip():
+                self._add_block(f"```\n{text}\n```", len(text), 0)
+            self._list_item = False
+            return
+
+        lines = [" ".join(part.split()) for part in raw.split(_LINE_BREAK)]
+        text = "\n".join(line for line in lines if line)
+        if not text:
+            self._list_item = False
+            return
+
+        if self._heading:
+            text = f"{'#' * self._heading} {text.replace(chr(10), ' ')}"
+        elif self._list_item or self._lists:
+            indent = "  " * max(0, len(self._lists) - 1)
+            marker = "1." if self._lists and self._lists[-1] == "ol" else "-"
+            text = f"{indent}{marker} {text}" if self._list_item else f"{indent}  {text}"
+        if self._quote:
+            text = "\n".join(f"> {line}" for line in text.split("\n"))
+
+        self._list_item = False
+        visible = max(0, len(" ".join(lines)) - markup_chars)
+        # Consecutive list items read better without blank lines in between
+        if self.blocks and self._lists and text.lstrip().startswith(("- ", "1. ")):
+            prev = self.blocks[-1]
+            if prev.lstrip().startswith(("- ", "1. ")):
+                self.blocks[-1] = f"{prev}\n{text}"
+                self.block_text[-1] += visible
+                self.block_link[-1] += link_chars
+                return
+        self._add_block(text, visible, link_chars)
+
+    def _add_block(self, text: str, visible: int, link_chars: int) -> None:
+        self.blocks.append(text)
+        self.block_node.append(self._open[-1])
+        self.block_text.append(visible)
+        self.block_link.append(link_chars)
+        self.block_heading.append(self._heading)
+
+
+class _StdlibTokenizer(HTMLParser):
+    """Adapter that feeds stdlib HTMLParser events into a parser target."""
+
+    def __init__(self, target: _MarkdownSink) -> None:
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.target.start(tag, {k: (v or "") for k, v in attrs})
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.target.start(tag, {k: (v or "") for k, v in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self.target.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.target.data(data)
+
+
+def _parse(html: str, sink: _MarkdownSink) -> _MarkdownSink:
+    if HAS_LXML:
+        try:
+            parser = etree.HTMLParser(target=sink, huge_tree=True, remove_comments=True)
+            parser.feed(html)
+            return parser.close()
+        except Exception:
+            # lxml rejects empty/odd documents; start over with the stdlib tokenizer
+            sink = _MarkdownSink(sink.drop_tags)
+    tokenizer = _StdlibTokenizer(sink)
+    tokenizer.feed(html)
+    tokenizer.close()
+    return sink.close()
+
+
+def html_to_markdown(html: str, drop_tags: Optional[frozenset] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Convert an HTML document to heading-structured markdown in a single tokenizer pass.
+    Returns (markdown, info) where info carries 'title', 'description' and the raw
+    'links' (href values in document order, including those inside dropped navigation).
+    """
+    sink = _MarkdownSink(DEFAULT_DROP_TAGS if drop_tags is None else frozenset(drop_tags))
+    if html:
+        sink = _parse(html, sink)
+    md = "\n\n".join(sink.blocks).strip()
+    return md, {
+        "title": sink.title,
+        "description": sink.description,
+        "links": sink.links,
+    }
+
+
+def _select_main_blocks(sink: _MarkdownSink) -> List[int]:
+    """
+    Readability-style selection over the recorded blocks: drop boilerplate containers
+    and link farms, score containers by link-density-weighted text with ancestor decay,
+    then keep the best container plus strong siblings.
+    """
+    n_nodes = len(sink.node_tag)
+    candidates: List[int] = []
+    node_score = [0.0] * n_nodes
+    node_text = [0] * n_nodes
+    node_link = [0] * n_nodes
+
+    for i, node in enumerate(sink.block_node):
+        if sink.node_boiler[node]:
+            continue
+        text = sink.block_text[i]
+        link = sink.block_link[i]
+        density = link / text if text else 1.0
+        if density > 0.5 and not sink.block_heading[i]:
+            continue
+        candidates.append(i)
+        score = text * (1.0 - density) if text >= 25 else 0.0
+        level = 0
+        cur = node
+        while cur:
+            node_text[cur] += text
+            node_link[cur] += link
+            if score:
+                node_score[cur] += score if level == 0 else score / (2 if level == 1 else level * 3)
+            cur = sink.node_parent[cur]
+            level += 1
+
+    if not candidates:
+        return []
+
+    best, best_score = 0, 0.0
+    weighted = [0.0] * n_nodes
+    for node in range(1, n_nodes):
+        if not node_score[node] or sink.node_boiler[node]:
+            continue
+        density = node_link[node] / node_text[node] if node_text[node] else 0.0
+        weighted[node] = node_score[node] * (1.0 - density) * (1.0 + sink.node_hint[node] / 100.0)
+        if weighted[node] > best_score:
+            best, best_score = node, weighted[node]
+
+    filtered_text = sum(sink.block_text[i] for i in candidates)
+    if not best:
+        return candidates
+
+    parent = sink.node_parent[best]
+    threshold = max(10.0, best_score * 0.2)
+    included = {best}
+    for node in range(1, n_nodes):
+        if node != best and sink.node_parent[node] == parent and weighted[node] >= threshold:
+            included.add(node)
+
+    in_main = [False] * n_nodes
+    for node in range(1, n_nodes):
+        in_main[node] = node in included or in_main[sink.node_parent[node]]
+
+    selected = [i for i in candidates if in_main[sink.block_node[i]]]
+    first_h1 = next((i for i in candidates if sink.block_heading[i] == 1), None)
+    if first_h1 is not None and first_h1 not in selected:
+        selected.insert(0, first_h1)
+        selected.sort()
+
+    main_text = sum(sink.block_text[i] for i in selected)
+    # A winner holding only a sliver of the page means the layout fooled the scorer
+    if main_text < 200 or main_text < 0.15 * filtered_text:
+        return candidates
+    return selected
+
+
+def html_to_markdown_with_main(
+    html: str, drop_tags: Optional[frozenset] = None
+) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Single-pass conversion returning (full_markdown, main_markdown, info).
+    The main variant keeps only the primary content region (no navigation, cookie
+    banners, headers or footers); it falls back to the full markdown when no content
+    region can be identified.
+    """
+    sink = _MarkdownSink(DEFAULT_DROP_TAGS if drop_tags is None else frozenset(drop_tags))
+    if html:
+        sink = _parse(html, sink)
+    full = "\n\n".join(sink.blocks).strip()
+    selected = _select_main_blocks(sink)
+    main = "\n\n".join(sink.blocks[i] for i in selected).strip() if selected else ""
+    if not main:
+        main = full
+    return full, main, {
+        "title": sink.title,
+        "description": sink.description,
+        "links": sink.links,
+    }
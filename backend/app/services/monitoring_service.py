@@ -4,6 +4,8 @@ import json
 import os
 from typing import Any, Dict, List, Optional
 
+from ..observability import instrument_gemini_client
+
 try:
     # Google GenAI SDK
     from google import genai  # type: ignore
@@ -23,7 +25,10 @@ def _get_client() -> "genai.Client":
         raise GeminiNotConfigured(
             "google-genai is not installed. Ensure 'google-genai' exists in backend/requirements.txt and install."
         )
-    return genai.Client(api_key=api_key)
+    base_url = os.getenv("GEMINI_BASE_URL")
+    if base_url:
+        return instrument_gemini_client(genai.Client(api_key=api_key, http_options={"base_url": base_url}))
+    return instrument_gemini_client(genai.Client(api_key=api_key))
 
 
 def detect_hallucinations(generated_text: str, brand_markdown: str) -> List[Dict[str, Any]]:
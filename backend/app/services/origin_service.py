@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from .http_cache_service import cached_get
+
+# Canonical origin per domain and live/dead verdicts per candidate URL, so multi-page
+# audits stop fanning out over www/non-www and http/https variants of every path.
+# Both caches are LRU-bounded (ORIGIN_CACHE_SIZE entries each). Failures (timeouts,
+# errors, non-200 answers, origins nothing answered for) are only remembered for
+# ORIGIN_NEGATIVE_TTL, so a transient outage does not mark a page dead for an hour.
+ORIGIN_CACHE_TTL = float(os.getenv("ORIGIN_CACHE_TTL", "3600"))
+ORIGIN_NEGATIVE_TTL = float(os.getenv("ORIGIN_NEGATIVE_TTL", "60"))
+ORIGIN_CACHE_SIZE = int(os.getenv("ORIGIN_CACHE_SIZE", "4096"))
+PROBE_CONCURRENCY = int(os.getenv("PROBE_CONCURRENCY", "8"))
+
+# key -> (expires at, value)
+_origins: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_probes: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+# Origin resolutions in flight, so concurrent audits of one domain probe it once
+_resolving: Dict[str, "asyncio.Future[str]"] = {}
+
+_MISS = object()
+
+
+def _cache_get(cache: "OrderedDict[str, Tuple[float, Any]]", key: str) -> Any:
+    entry = cache.get(key)
+    if entry is None:
+        return _MISS
+    if time.monotonic() >= entry[0]:
+        cache.pop(key, None)
+        return _MISS
+    cache.move_to_end(key)
+    return entry[1]
+
+
+def _cache_put(cache: "OrderedDict[str, Tuple[float, Any]]", key: str, value: Any, ttl: float) -> None:
+    if ORIGIN_CACHE_SIZE <= 0:
+        return
+    cache[key] = (time.monotonic() + ttl, value)
+    cache.move_to_end(key)
+    while len(cache) > ORIGIN_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _bare_domain(host: str) -> str:
+    host = host.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _origin(url: str) -> str:
+    p = urlparse(url)
+    return f"{p.scheme}://{p.netloc}"
+
+
+async def _live_url(url: str, timeout: float = 10.0) -> Optional[str]:
+    """Final URL after redirects when the page answers 200, else None (cached)."""
+    hit = _cache_get(_probes, url)
+    if hit is not _MISS:
+        return hit
+    try:
+        resp = await cached_get(url, timeout=httpx.Timeout(timeout, connect=5.0))
+        final = str(resp.url) if resp.status_code == 200 else None
+    except Exception:
+        final = None
+    _cache_put(_probes, url, final, ORIGIN_CACHE_TTL if final else ORIGIN_NEGATIVE_TTL)
+    return final
+
+
+async def resolve_origin(url: str) -> str:
+    """
+    Canonical scheme://host for the site behind `url`, following redirects from the given
+    host first, then its www/non-www twin, then plain http. Cached per domain; falls back
+    to the given origin when nothing answers.
+    """
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    p = urlparse(url)
+    host = p.netloc or p.path.split("/", 1)[0]
+    scheme = p.scheme or "https"
+    domain = _bare_domain(host)
+
+    cached = _cache_get(_origins, domain)
+    if cached is not _MISS:
+        return cached
+
+    pending = _resolving.get(domain)
+    if pending is None:
+        pending = asyncio.ensure_future(_resolve(domain, host, scheme))
+        _resolving[domain] = pending
+        pending.add_done_callback(lambda _: _resolving.pop(domain, None))
+    # Shielded: a cancelled caller must not cancel the probe other callers wait on
+    return await asyncio.shield(pending)
+
+
+async def _resolve(domain: str, host: str, scheme: str) -> str:
+    twin = host[4:] if host.lower().startswith("www.") else f"www.{host}"
+    candidates = [f"{scheme}://{host}/", f"{scheme}://{twin}/"]
+    if scheme == "https":
+        candidates += [f"http://{host}/", f"http://{twin}/"]
+    for candidate in candidates:
+        final = await _live_url(candidate)
+        if final:
+            origin = _origin(final)
+            _cache_put(_origins, domain, origin, ORIGIN_CACHE_TTL)
+            return origin
+    # Nothing answered: fall back to the given origin, but retry soon
+    origin = f"{scheme}://{host}"
+    _cache_put(_origins, domain, origin, ORIGIN_NEGATIVE_TTL)
+    return origin
+
+
+async def discover_paths(
+    origin: str, paths: Sequence[str], concurrency: Optional[int] = None
+) -> List[str]:
+    """
+    Probe origin+path candidates concurrently and return the live ones (final URLs, in
+    the order of `paths`), dropping redirects that land on an already listed page or on
+    another site. Probed bodies stay in the HTTP cache for the follow-up scrape.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency or PROBE_CONCURRENCY))
+    origin = origin.rstrip("/")
+
+    async def probe(path: str) -> Optional[str]:
+        async with sem:
+            return await _live_url(f"{origin}{path}")
+
+    finals = await asyncio.gather(*(probe(p) for p in paths))
+    host = _bare_domain(urlparse(origin).netloc)
+    live: List[str] = []
+    seen = set()
+    for final in finals:
+        if not final or _bare_domain(urlparse(final).netloc) != host:
+            continue
+        key = final.rstrip("/")
+        if key in seen:
+            continue
+        seen.add(key)
+        live.append(final)
+    return live
+
+
+async def resolve_site_pages(url: str, paths: Sequence[str]) -> Tuple[str, List[str]]:
+    """(canonical origin, live candidate URLs) in one call."""
+    origin = await resolve_origin(url)
+    return origin, await discover_paths(origin, paths)
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import threading
+import uuid
+import weakref
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..storage import connect_sqlite, data_path
+
+# Crawl results without holding every page's markdown in RAM. Each page is a compact
+# PageRecord (interned URL, title, content hash, SimHash fingerprint, length); the
+# markdown itself is zlib-compressed and kept in memory only until the store holds
+# PAGE_STORE_SPILL_BYTES of compressed text, after which everything moves to a private
+# SQLite file under <data dir>/page_store/ that is deleted when the store is closed.
+# Consumers iterate pages lazily, one decompressed page at a time.
+# A store given a `source` (the crawl frontier, which already keeps every finished page
+# compressed on disk) holds records only and reads each page back by its key, so a
+# crawled page is never stored twice.
+PAGE_STORE_SPILL_BYTES = int(os.getenv("PAGE_STORE_SPILL_BYTES", str(8 * 1024 * 1024)))
+PAGE_STORE_COMPRESSION = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    idx INTEGER PRIMARY KEY,
+    body BLOB NOT NULL
+);
+"""
+
+
+_EMPTY = zlib.compress(b"")
+
+
+def content_hash(text: Union[str, bytes]) -> str:
+    """Short stable digest of page text or raw bytes (change detection, exact-duplicate checks)."""
+    data = text.encode("utf-8", "surrogatepass") if isinstance(text, str) else text
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class PageRecord:
+    """Metadata of one stored page; the markdown stays in the PageStore."""
+
+    __slots__ = ("url", "title", "content_hash", "simhash", "length")
+
+    def __init__(self, url: str, title: Optional[str], digest: str, simhash: int, length: int) -> None:
+        self.url = sys.intern(url)
+        self.title = title
+        self.content_hash = digest
+        self.simhash = simhash
+        self.length = length
+
+    def to_dict(self, markdown: str) -> Dict[str, Any]:
+        """The page dict crawl_markdown has always returned."""
+        page: Dict[str, Any] = {"markdown": markdown, "url": self.url}
+        if self.title is not None:
+            page["title"] = self.title
+        return page
+
+
+def _remove_files(path: Path) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(f"{path}{suffix}")
+        except OSError:
+            pass
+
+
+class PageStore:
+    """
+    Append-only store of crawled pages. len(store) and iteration over records are
+    cheap; iter_pages() / iter_dicts() decompress one page at a time. Use as a context
+    manager or call close(); a store that is garbage collected still removes its file.
+    """
+
+    def __init__(self, spill_bytes: int = PAGE_STORE_SPILL_BYTES,
+                 source: Optional[Callable[[int], Optional[bytes]]] = None) -> None:
+        self.spill_bytes = spill_bytes
+        # key -> compressed markdown held elsewhere; add() then takes each page's key
+        self._source = source
+        self._keys: List[int] = []
+        self.records: List[PageRecord] = []
+        self.compressed_bytes = 0
+        self.text_bytes = 0
+        self._index: Dict[str, int] = {}
+        self._blobs: Optional[List[bytes]] = []
+        self._conn: Any = None
+        self._path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._finalizer: Any = None
+
+    # --- Writing --------------------------------------------------------------------------
+
+    def add(self, url: str, markdown: str, title: Optional[str] = None, simhash: int = 0,
+            key: Optional[int] = None) -> PageRecord:
+        record = PageRecord(url, title, content_hash(markdown), simhash, len(markdown))
+        if self._source is not None:
+            if key is None:
+                raise ValueError("A PageStore with a source needs the page's key")
+            with self._lock:
+                self._index.setdefault(record.url, len(self.records))
+                self.records.append(record)
+                self._keys.append(key)
+                self.text_bytes += len(markdown)
+            return record
+        blob = zlib.compress(markdown.encode("utf-8", "surrogatepass"), PAGE_STORE_COMPRESSION)
+        with self._lock:
+            idx = len(self.records)
+            self.records.append(record)
+            self._index.setdefault(record.url, idx)
+            self.compressed_bytes += len(blob)
+            self.text_bytes += len(markdown)
+            if self._blobs is not None:
+                self._blobs.append(blob)
+                if self.compressed_bytes > self.spill_bytes:
+                    self._spill()
+            else:
+                self._conn.execute("INSERT INTO pages VALUES (?, ?)", (idx, blob))
+        return record
+
+    def _spill(self) -> None:
+        # Called with the lock held: move all in-memory pages into a private SQLite file
+        self._path = data_path("page_store", f"{uuid.uuid4().hex}.sqlite3")
+        self._conn = connect_sqlite("page_store", self._path.name)
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("BEGIN")
+        self._conn.executemany("INSERT INTO pages VALUES (?, ?)", enumerate(self._blobs or []))
+        self._conn.execute("COMMIT")
+        self._blobs = None
+        self._finalizer = weakref.finalize(self, PageStore._release, self._conn, self._path)
+
+    @staticmethod
+    def _release(conn: Any, path: Path) -> None:
+        try:
+            conn.close()
+        finally:
+            _remove_files(path)
+
+    # --- Reading --------------------------------------------------------------------------
+
+    @property
+    def spilled(self) -> bool:
+        return self._blobs is None or self._source is not None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[PageRecord]:
+        return iter(list(self.records))
+
+    def __contains__(self, url: object) -> bool:
+        return url in self._index
+
+    def urls(self) -> List[str]:
+        return [r.url for r in self.records]
+
+    def _blob(self, idx: int) -> bytes:
+        if self._source is not None:
+            # A page deleted from the source meanwhile (crawl dropped) reads as empty
+            return self._source(self._keys[idx]) or _EMPTY
+        with self._lock:
+            if self._blobs is not None:
+                return self._blobs[idx]
+            row = self._conn.execute("SELECT body FROM pages WHERE idx = ?", (idx,)).fetchone()
+        return row[0]
+
+    def markdown(self, url: str) -> Optional[str]:
+        idx = self._index.get(url)
+        if idx is None:
+            return None
+        return zlib.decompress(self._blob(idx)).decode("utf-8", "surrogatepass")
+
+    def iter_pages(self) -> Iterator[Tuple[PageRecord, str]]:
+        """(record, markdown) in crawl order; only the current page is decompressed."""
+        for idx, record in enumerate(list(self.records)):
+            yield record, zlib.decompress(self._blob(idx)).decode("utf-8", "surrogatepass")
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        for record, markdown in self.iter_pages():
+            yield record.to_dict(markdown)
+
+    def iter_texts(self, with_title: bool = False) -> Iterator[Tuple[str, str]]:
+        """(url, text) pairs; with_title prefixes the page title as topic analysis expects."""
+        for record, markdown in self.iter_pages():
+            yield record.url, (f"{record.title or ''} {markdown}" if with_title else markdown)
+
+    def texts(self, with_title: bool = False) -> "PageTexts":
+        """Re-iterable (url, text) view for consumers that take a sequence of pages."""
+        return PageTexts(self, with_title)
+
+    def joined_markdown(self, separator: str = "\n\n", max_chars: Optional[int] = None) -> str:
+        """Pages' markdown joined in crawl order, stopping once max_chars is reached."""
+        parts: List[str] = []
+        size = 0
+        for _, markdown in self.iter_pages():
+            if not markdown:
+                continue
+            piece = separator + markdown if parts else markdown
+            if max_chars is not None and size + len(piece) > max_chars:
+                piece = piece[:max_chars - size]
+                if piece:
+                    parts.append(piece)
+                break
+            parts.append(piece)
+            size += len(piece)
+        return "".join(parts)
+
+    # --- Lifetime -------------------------------------------------------------------------
+
+    def on_close(self, callback: Callable[[], None]) -> None:
+        """Run callback once when a store with a source is closed or garbage collected."""
+        if self._source is None:
+            raise ValueError("on_close() is for stores reading from a source")
+        self._finalizer = weakref.finalize(self, callback)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+                self._conn = None
+            self._blobs = []
+            self.records = []
+            self._keys = []
+            self._index = {}
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages": len(self.records),
+            "textBytes": self.text_bytes,
+            "compressedBytes": self.compressed_bytes,
+            "spilled": self.spilled,
+        }
+
+
+class PageTexts:
+    """Lazy (url, text) pairs of a PageStore; every iteration streams from the store again."""
+
+    __slots__ = ("store", "with_title")
+
+    def __init__(self, store: PageStore, with_title: bool = False) -> None:
+        self.store = store
+        self.with_title = with_title
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.store.iter_texts(self.with_title)
+
+    def __len__(self) -> int:
+        return len(self.store)
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from ..storage import connect_sqlite
+
+# Results history. Every scan, audit and visibility check is recorded per domain and
+# time: its headline score, the score breakdown, artifact status (robots.txt, llms.txt,
+# ...) and the raw response payload (zlib JSON). Score queries run on a covering index
+# (domain, kind, created_at, score), and `latest` keeps one row per domain and kind so
+# dashboards listing hundreds of domains never scan the history.
+# Compaction drops raw payloads after RESULTS_PAYLOAD_DAYS and thins history older than
+# RESULTS_DETAIL_DAYS to the last run per domain, kind and day; it runs every
+# RESULTS_COMPACT_HOURS in the app (0 disables) and via POST /api/admin/results/compact.
+RESULTS_DB = "results.sqlite3"
+RESULTS_PAYLOAD_DAYS = float(os.getenv("RESULTS_PAYLOAD_DAYS", "30"))
+RESULTS_DETAIL_DAYS = float(os.getenv("RESULTS_DETAIL_DAYS", "180"))
+RESULTS_COMPACT_HOURS = float(os.getenv("RESULTS_COMPACT_HOURS", "24"))
+# Points in the `trend` of a scan response
+RESULTS_TREND_POINTS = int(os.getenv("RESULTS_TREND_POINTS", "10"))
+
+BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+logger = logging.getLogger("neuro_web.results")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    score REAL,
+    scores TEXT,
+    artifacts TEXT,
+    payload BLOB,
+    payload_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scans_domain_kind_time ON scans(domain, kind, created_at, score);
+CREATE INDEX IF NOT EXISTS scans_time ON scans(created_at);
+CREATE TABLE IF NOT EXISTS latest (
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    scan_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    score REAL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (domain, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS latest_kind_time ON latest(kind, created_at);
+"""
+
+
+def normalize_domain(url_or_domain: str) -> str:
+    """Host of a URL or bare domain, lowercased and without a leading www."""
+    value = (url_or_domain or "").strip().lower()
+    host = urlsplit(value if "://" in value else f"//{value}").netloc or value
+    return host[4:] if host.startswith("www.") else host
+
+
+def _loads(text: Optional[str]) -> Any:
+    return json.loads(text) if text else None
+
+
+class ResultsStore:
+    """SQLite history of scan results (one connection, serialised by a lock)."""
+
+    def __init__(self, filename: str = RESULTS_DB) -> None:
+        self._lock = threading.Lock()
+        # auto_vacuum lets compaction hand freed pages back to the file system; it only
+        # applies when set before the file's header is written (or followed by VACUUM)
+        self._conn = connect_sqlite(filename, pragmas=("auto_vacuum = INCREMENTAL",))
+        if self._conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self._conn.execute("VACUUM")
+        self._conn.executescript(_SCHEMA)
+
+    # --- Writing --------------------------------------------------------------------------
+
+    def record(self, domain: str, kind: str, score: Optional[float] = None,
+               scores: Optional[Dict[str, Any]] = None, artifacts: Optional[Dict[str, Any]] = None,
+               payload: Any = None, created_at: Optional[float] = None) -> int:
+        domain = normalize_domain(domain)
+        created_at = created_at if created_at is not None else time.time()
+        blob = zlib.compress(json.dumps(payload, default=str).encode("utf-8"), 6) if payload is not None else None
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cur = self._conn.execute(
+                    "INSERT INTO scans (domain, kind, created_at, score, scores, artifacts, payload, payload_bytes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (domain, kind, created_at, score,
+                     json.dumps(scores) if scores is not None else None,
+                     json.dumps(artifacts) if artifacts is not None else None,
+                     blob, len(blob) if blob else 0),
+                )
+                scan_id = int(cur.lastrowid)
+                self._conn.execute(
+                    "INSERT INTO latest VALUES (?, ?, ?, ?, ?, 1) ON CONFLICT (domain, kind) DO UPDATE SET "
+                    "scan_id = excluded.scan_id, created_at = excluded.created_at, score = excluded.score, "
+                    "runs = runs + 1 WHERE excluded.created_at >= latest.created_at",
+                    (domain, kind, scan_id, created_at, score),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return scan_id
+
+    # --- Queries --------------------------------------------------------------------------
+
+    def trend(self, domain: str, kind: str, points: int = RESULTS_TREND_POINTS) -> List[float]:
+        """Last `points` scores of a domain, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT score FROM scans WHERE domain = ? AND kind = ? AND score IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?",
+                (normalize_domain(domain), kind, points),
+            ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def trends(self, domains: Sequence[str], kind: str, since: float = 0.0,
+               bucket: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Score series per domain since `since`. With a bucket ("hour", "day", "week")
+        each point is the mean score of the bucket, timestamped with its last run.
+        """
+        size = BUCKETS.get(bucket or "")
+        if bucket and size is None:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of {tuple(BUCKETS)}")
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            # One index range scan per domain
+            for domain in dict.fromkeys(normalize_domain(d) for d in domains):
+                if size:
+                    rows = self._conn.execute(
+                        "SELECT MAX(created_at), AVG(score), COUNT(*) FROM scans "
+                        "WHERE domain = ? AND kind = ? AND created_at >= ? AND score IS NOT NULL "
+                        "GROUP BY CAST(created_at / ? AS INTEGER) ORDER BY 1",
+                        (domain, kind, since, size),
+                    ).fetchall()
+                    out[domain] = [{"t": t, "score": round(s, 2), "runs": n} for t, s, n in rows]
+                else:
+                    rows = self._conn.execute(
+                        "SELECT created_at, score FROM scans WHERE domain = ? AND kind = ? AND created_at >= ? "
+                        "AND score IS NOT NULL ORDER BY created_at",
+                        (domain, kind, since),
+                    ).fetchall()
+                    out[domain] = [{"t": t, "score": s} for t, s in rows]
+        return out
+
+    def domains(self, kind: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Latest run per domain (and kind), most recently scanned first."""
+        sql = "SELECT domain, kind, scan_id, created_at, score, runs FROM latest"
+        params: Tuple[Any, ...] = ()
+        if kind:
+            sql += " WHERE kind = ?"
+            params = (kind,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + (limit,)).fetchall()
+        return [
+            {"domain": d, "kind": k, "scanId": i, "createdAt": t, "score": s, "runs": n}
+            for d, k, i, t, s, n in rows
+        ]
+
+    def history(self, domain: str, kind: Optional[str] = None, limit: int = 50,
+                before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Runs of a domain newest first, with score breakdown and artifacts (no payloads)."""
+        sql = ("SELECT id, kind, created_at, score, scores, artifacts, payload_bytes FROM scans "
+               "WHERE domain = ?")
+        params: List[Any] = [normalize_domain(domain)]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if before is not None:
+            sql += " AND created_at < ?"
+            params.append(before)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "scanId": i, "kind": k, "createdAt": t, "score": s,
+                "scores": _loads(scores), "artifacts": _loads(artifacts), "hasPayload": bool(size),
+            }
+            for i, k, t, s, scores, artifacts, size in rows
+        ]
+
+    def get(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        """One run including its raw payload (None once compacted)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, domain, kind, created_at, score, scores, artifacts, payload FROM scans WHERE id = ?",
+                (scan_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        i, domain, kind, t, score, scores, artifacts, payload = row
+        return {
+            "scanId": i, "domain": domain, "kind": kind, "createdAt": t, "score": score,
+            "scores": _loads(scores), "artifacts": _loads(artifacts),
+            "payload": json.loads(zlib.decompress(payload)) if payload is not None else None,
+        }
+
+    # --- Compaction -----------------------------------------------------------------------
+
+    def compact(self, payload_days: float = RESULTS_PAYLOAD_DAYS,
+                detail_days: float = RESULTS_DETAIL_DAYS) -> Dict[str, Any]:
+        """Drop old raw payloads, thin old history to one run per domain/kind/day, reclaim space."""
+        now = time.time()
+        payload_cutoff = now - payload_days * 86400
+        detail_cutoff = now - detail_days * 86400
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                freed = self._conn.execute(
+                    "SELECT COALESCE(SUM(payload_bytes), 0) FROM scans WHERE created_at < ? AND payload IS NOT NULL",
+                    (payload_cutoff,),
+                ).fetchone()[0]
+                payloads = self._conn.execute(
+                    "UPDATE scans SET payload = NULL, payload_bytes = 0 WHERE created_at < ? AND payload IS NOT NULL",
+                    (payload_cutoff,),
+                ).rowcount
+                # Runs referenced by `latest` always survive
+                thinned = self._conn.execute(
+                    "DELETE FROM scans WHERE created_at < ? AND id NOT IN ("
+                    "  SELECT MAX(id) FROM scans WHERE created_at < ? "
+                    "  GROUP BY domain, kind, CAST(created_at / 86400 AS INTEGER)"
+                    ") AND id NOT IN (SELECT scan_id FROM latest)",
+                    (detail_cutoff, detail_cutoff),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            # execute() steps the pragma once (one page); executescript() runs it to completion
+            self._conn.executescript("PRAGMA incremental_vacuum;")
+            self._conn.execute("PRAGMA optimize")
+        return {
+            "payloadsDropped": payloads,
+            "payloadBytesFreed": int(freed),
+            "runsThinned": thinned,
+            "durationMs": round((time.time() - now) * 1000, 1),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            runs, domains, payload_bytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT domain), COALESCE(SUM(payload_bytes), 0) FROM scans"
+            ).fetchone()
+        return {"runs": runs, "domains": domains, "payloadBytes": payload_bytes}
+
+
+_store: Optional[ResultsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_results_store() -> ResultsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+    return _store
+
+
+async def record_result(domain: str, kind: str, score: Optional[float] = None,
+                        scores: Optional[Dict[str, Any]] = None, artifacts: Optional[Dict[str, Any]] = None,
+                        payload: Any = None) -> Optional[int]:
+    """Record a run without ever failing the request that produced it; returns its id."""
+    try:
+        return await asyncio.to_thread(
+            get_results_store().record, domain, kind, score, scores, artifacts, payload)
+    except Exception as e:
+        logger.warning("Recording %s result for %s failed: %s", kind, domain, e)
+        return None
+
+
+# --- Periodic compaction --------------------------------------------------------------------
+
+_compactor: Optional[asyncio.Task] = None
+
+
+async def _compact_forever(interval: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(get_results_store().compact)
+        except Exception as e:
+            logger.warning("Results compaction failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def start_results_compaction() -> None:
+    """Compact now and then every RESULTS_COMPACT_HOURS on the running loop (app startup)."""
+    global _compactor
+    if RESULTS_COMPACT_HOURS <= 0 or _compactor is not None:
+        return
+    _compactor = asyncio.get_running_loop().create_task(
+        _compact_forever(RESULTS_COMPACT_HOURS * 3600), name="results-compaction")
+
+
+async def stop_results_compaction() -> None:
+    global _compactor
+    if _compactor is not None:
+        _compactor.cancel()
+        try:
+            await _compactor
+        except asyncio.CancelledError:
+            pass
+        _compactor = None
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+# Crawlers whose access decides how a site shows up in AI answers and training sets.
+# Product tokens as used in robots.txt user-agent lines.
+AI_CRAWLERS: List[str] = [
+    "GPTBot", "ChatGPT-User", "OAI-SearchBot",
+    "ClaudeBot", "Claude-Web", "anthropic-ai",
+    "PerplexityBot", "Perplexity-User",
+    "Google-Extended", "Applebot-Extended",
+    "CCBot", "Bytespider", "Amazonbot", "meta-externalagent", "cohere-ai",
+]
+
+ROBOTS_CACHE_SIZE = 512
+
+_LINE = re.compile(r"^\s*([A-Za-z-]+)\s*:\s*(.*?)\s*$")
+_REQUEST_RATE = re.compile(r"^\s*(\d+)\s*/\s*(\d+(?:\.\d+)?)\s*([smh])?\s*$", re.I)
+
+
+def _normalize_path(path: str) -> str:
+    # Compare decoded forms so /caf%C3%A9 and /café match the same rule
+    return unquote(path or "/") or "/"
+
+
+class _Rule:
+    __slots__ = ("allow", "pattern", "length", "prefix", "regex")
+
+    def __init__(self, allow: bool, pattern: str) -> None:
+        self.allow = allow
+        self.pattern = pattern
+        self.length = len(pattern)
+        if "*" in pattern or pattern.endswith("$"):
+            self.prefix = None
+            body = pattern[:-1] if pattern.endswith("$") else pattern
+            rx = ".*".join(re.escape(part) for part in body.split("*"))
+            self.regex = re.compile(rx + ("$" if pattern.endswith("$") else ""), re.S)
+        else:
+            self.prefix = pattern
+            self.regex = None
+
+    def matches(self, path: str) -> bool:
+        if self.prefix is not None:
+            return path.startswith(self.prefix)
+        return self.regex.match(path) is not None
+
+
+def _request_interval(value: str) -> Optional[float]:
+    """Seconds per request of a Request-rate value ("1/5", "1/5s", "2/1m", "10/1h")."""
+    m = _REQUEST_RATE.match(value)
+    if not m:
+        return None
+    requests, period, unit = int(m.group(1)), float(m.group(2)), (m.group(3) or "s").lower()
+    if requests <= 0:
+        return None
+    return period * {"s": 1, "m": 60, "h": 3600}[unit] / requests
+
+
+class _Group:
+    __slots__ = ("agents", "rules", "crawl_delay", "request_interval")
+
+    def __init__(self) -> None:
+        self.agents: List[str] = []
+        self.rules: List[_Rule] = []
+        self.crawl_delay: Optional[float] = None
+        self.request_interval: Optional[float] = None
+
+    def compile(self) -> None:
+        # Longest pattern first, Allow before Disallow at equal length: the first hit wins
+        self.rules.sort(key=lambda r: (-r.length, not r.allow))
+
+    def allowed(self, path: str) -> bool:
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule.allow
+        return True
+
+
+class RobotsRules:
+    """
+    Compiled robots.txt (RFC 9309): user-agent groups (repeated groups for the same
+    agent are merged), longest-match Allow/Disallow with Allow winning ties, '*' and '$'
+    wildcards, Crawl-delay and Request-rate. Agent lookups and (agent, path) verdicts are memoised, so
+    evaluating a sitemap against many crawlers costs a dict lookup per repeat.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._groups: Dict[str, _Group] = {}
+        self._explicit: List[str] = []
+        self.sitemaps: List[str] = []
+        self._parse(text or "")
+        for group in self._groups.values():
+            group.compile()
+        self._agent_cache: Dict[str, Optional[_Group]] = {}
+        self._verdicts: Dict[Tuple[str, str], bool] = {}
+
+    def _parse(self, text: str) -> None:
+        current: List[_Group] = []
+        in_agents = False
+        for raw in text.splitlines():
+            line = raw.split("#", 1)[0]
+            m = _LINE.match(line)
+            if not m:
+                continue
+            key, value = m.group(1).lower(), m.group(2)
+            if key == "user-agent":
+                if not in_agents:
+                    current = []
+                    in_agents = True
+                token = value.lower()
+                group = self._groups.get(token)
+                if group is None:
+                    group = _Group()
+                    group.agents.append(token)
+                    self._groups[token] = group
+                    if token != "*":
+                        self._explicit.append(value)
+                current.append(group)
+                continue
+            if key == "sitemap":
+                self.sitemaps.append(value)
+                continue
+            in_agents = False
+            if not current:
+                continue
+            if key in ("allow", "disallow"):
+                if not value:
+                    continue  # "Disallow:" with no path allows everything
+                rule = _Rule(key == "allow", _normalize_path(value))
+                for group in current:
+                    group.rules.append(rule)
+            elif key == "crawl-delay":
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for group in current:
+                    group.crawl_delay = delay
+            elif key == "request-rate":
+                interval = _request_interval(value)
+                if interval is None:
+                    continue
+                for group in current:
+                    group.request_interval = interval
+
+    @property
+    def explicit_agents(self) -> List[str]:
+        """User-agent tokens with their own group (as written), excluding '*'."""
+        return list(self._explicit)
+
+    def group_for(self, agent: str) -> Optional[_Group]:
+        """The group for a crawler token: exact token, else the longest token it contains, else '*'."""
+        key = agent.lower()
+        if key in self._agent_cache:
+            return self._agent_cache[key]
+        group = self._groups.get(key)
+        if group is None:
+            best = None
+            for token, candidate in self._groups.items():
+                if token != "*" and token in key and (best is None or len(token) > len(best)):
+                    best = token
+            group = self._groups.get(best) if best else self._groups.get("*")
+        self._agent_cache[key] = group
+        return group
+
+    def matched_agent(self, agent: str) -> Optional[str]:
+        group = self.group_for(agent)
+        return group.agents[0] if group else None
+
+    def has_group(self, agent: str) -> bool:
+        """True when the agent has its own group (not just the '*' fallback)."""
+        matched = self.matched_agent(agent)
+        return matched is not None and matched != "*"
+
+    def is_allowed(self, agent: str, url_or_path: str) -> bool:
+        path = url_or_path
+        if "://" in path:
+            p = urlparse(path)
+            path = (p.path or "/") + (f"?{p.query}" if p.query else "")
+        path = _normalize_path(path)
+        if path == "/robots.txt":
+            return True
+        key = (agent.lower(), path)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            group = self.group_for(agent)
+            verdict = group.allowed(path) if group else True
+            if len(self._verdicts) > 100_000:
+                self._verdicts.clear()
+            self._verdicts[key] = verdict
+        return verdict
+
+    def crawl_delay(self, agent: str) -> Optional[float]:
+        group = self.group_for(agent)
+        return group.crawl_delay if group else None
+
+    def request_interval(self, agent: str) -> Optional[float]:
+        """Seconds between requests implied by the agent's Request-rate (None when not set)."""
+        group = self.group_for(agent)
+        return group.request_interval if group else None
+
+    def access_matrix(self, agents: Sequence[str], paths: Iterable[str]) -> Dict[str, Dict[str, bool]]:
+        """{path: {agent: allowed}}"""
+        return {path: {a: self.is_allowed(a, path) for a in agents} for path in paths}
+
+
+_rules_cache: "OrderedDict[Tuple[str, str], RobotsRules]" = OrderedDict()
+
+
+def get_rules(host: str, text: str) -> RobotsRules:
+    """Compiled rules cached per host and robots.txt content hash."""
+    key = (host.lower(), hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest())
+    rules = _rules_cache.get(key)
+    if rules is None:
+        rules = RobotsRules(text)
+        _rules_cache[key] = rules
+        while len(_rules_cache) > ROBOTS_CACHE_SIZE:
+            _rules_cache.popitem(last=False)
+    else:
+        _rules_cache.move_to_end(key)
+    return rules
+
+
+def ai_crawler_access(
+    rules: Optional[RobotsRules], paths: Sequence[str], agents: Sequence[str] = AI_CRAWLERS
+) -> Dict[str, Any]:
+    """
+    Per-agent summary over `paths`: which group applies, allowed/blocked counts, example
+    blocked paths and crawl delay. rules=None (no robots.txt) means everything is allowed.
+    """
+    paths = list(paths) or ["/"]
+    out: Dict[str, Any] = {}
+    for agent in agents:
+        if rules is None:
+            out[agent] = {"group": None, "explicit": False, "allowed": len(paths), "blocked": 0,
+                          "blockedExamples": [], "crawlDelay": None}
+            continue
+        blocked = [p for p in paths if not rules.is_allowed(agent, p)]
+        out[agent] = {
+            "group": rules.matched_agent(agent),
+            "explicit": rules.has_group(agent),
+            "allowed": len(paths) - len(blocked),
+            "blocked": len(blocked),
+            "blockedExamples": blocked[:5],
+            "crawlDelay": rules.crawl_delay(agent),
+        }
+    return out
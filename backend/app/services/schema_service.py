@@ -0,0 +1,658 @@
+from __future__ import annotations
+
+import asyncio
+import html as html_lib
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import urlparse
+
+import httpx
+
+from ..observability import stage
+from .cpu_pool_service import run_cpu
+from .http_cache_service import cached_get
+from .incremental_service import IncrementalAudit, PageCheck
+from .page_store_service import content_hash
+
+# orjson parses JSON-LD several times faster than the stdlib; json stays the fallback.
+try:
+    import orjson  # type: ignore
+    HAS_ORJSON = True
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+    HAS_ORJSON = False
+
+# Structured-data extraction without building a DOM: JSON-LD lives in <script> tags and
+# microdata/RDFa in start-tag attributes, so regex scans over the raw bytes find them in
+# one pass regardless of page size. Pages without the marker strings cost a substring test.
+SCHEMA_AUDIT_CONCURRENCY = int(os.getenv("SCHEMA_AUDIT_CONCURRENCY", "6"))
+SCHEMA_AUDIT_MAX_PAGES = int(os.getenv("SCHEMA_AUDIT_MAX_PAGES", "500"))
+SCHEMA_INVENTORY_MAX_PAGES = int(os.getenv("SCHEMA_INVENTORY_MAX_PAGES", "10000"))
+
+_JSONLD_SCRIPT = re.compile(
+    rb"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.I | re.S,
+)
+_WRAPPER = re.compile(rb"^\s*(?:<!--|<!\[CDATA\[)|(?:-->|\]\]>)\s*$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+# Microdata/RDFa scanner: only start tags carrying one of the attributes are visited
+# (located with bytes.find, which is far cheaper than a regex over every tag); the end
+# of an item's element is found by counting same-name tags from its start.
+_MARKERS = (b"itemscope", b"itemprop", b"typeof", b"property")
+_START_TAG = re.compile(rb"<([a-zA-Z][a-zA-Z0-9-]*)(\s[^>]*)?>", re.S)
+_SKIP_BLOCK = re.compile(rb"<(script|style)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+_ATTR = re.compile(rb"([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*(?:=\s*(\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?")
+_VOID = frozenset({b"area", b"base", b"br", b"col", b"embed", b"hr", b"img", b"input",
+                   b"link", b"meta", b"param", b"source", b"track", b"wbr"})
+_VALUE_ATTRS = (b"content", b"href", b"src", b"datetime", b"value", b"data", b"resource")
+
+Rules = Dict[str, Dict[str, List[str]]]
+Markup = Union[str, bytes]
+
+# Required/recommended properties per type for multi-page audits and the inventory
+SCHEMA_RULES: Rules = {
+    "Organization": {"required": ["name"], "recommended": ["url", "logo", "sameAs", "contactPoint"]},
+    "LocalBusiness": {"required": ["name", "address"], "recommended": ["telephone", "openingHours", "geo"]},
+    "Product": {"required": ["name"], "recommended": ["description", "brand", "offers", "image"]},
+    "Service": {"required": ["name"], "recommended": ["description", "provider", "areaServed"]},
+    "FAQPage": {"required": ["mainEntity"], "recommended": []},
+    "Article": {"required": ["headline"], "recommended": ["author", "datePublished", "image"]},
+    "BlogPosting": {"required": ["headline"], "recommended": ["author", "datePublished"]},
+    "WebPage": {"required": ["name"], "recommended": ["description", "breadcrumb"]},
+    "BreadcrumbList": {"required": ["itemListElement"], "recommended": []},
+    "ContactPage": {"required": [], "recommended": ["name", "description"]},
+}
+
+
+def _as_bytes(markup: Markup) -> bytes:
+    if isinstance(markup, bytes):
+        return markup
+    return (markup or "").encode("utf-8", "surrogatepass")
+
+
+def _loads(body: bytes) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _strip_comments(text: str) -> str:
+    """Drop // and /* */ comments outside strings; escape raw newlines/tabs inside strings."""
+    out: List[str] = []
+    i, n = 0, len(text)
+    in_str = False
+    while i < n:
+        c = text[i]
+        if in_str:
+            if c == "\\" and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if c == '"':
+                in_str = False
+            elif c == "\n":
+                c = "\\n"
+            elif c == "\r":
+                c = "\\r"
+            elif c == "\t":
+                c = "\\t"
+            out.append(c)
+        elif c == '"':
+            in_str = True
+            out.append(c)
+        elif c == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif c == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        else:
+            out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def _loads_tolerant(body: bytes) -> List[Any]:
+    """
+    Best-effort parse of broken JSON-LD as seen in the wild: HTML-escaped quotes, JS
+    comments, raw newlines in strings, trailing commas, several concatenated objects.
+    Returns the parsed values (possibly none).
+    """
+    text = body.decode("utf-8", "replace").strip().lstrip("\ufeff")
+    if "&quot;" in text and '"' not in text:
+        text = html_lib.unescape(text)
+    text = _TRAILING_COMMA.sub(r"\1", _strip_comments(text))
+    decoder = json.JSONDecoder(strict=False)
+    values: List[Any] = []
+    pos, n = 0, len(text)
+    while pos < n:
+        while pos < n and text[pos] in " \t\r\n;,":
+            pos += 1
+        if pos >= n:
+            break
+        try:
+            value, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            break
+        values.append(value)
+    return values
+
+
+def extract_jsonld(markup: Markup) -> List[Any]:
+    """
+    Parsed JSON-LD documents of a page, from raw bytes or text. Script bodies that do not
+    parse strictly go through a tolerant parser; hopeless ones are skipped.
+    """
+    data = _as_bytes(markup)
+    docs: List[Any] = []
+    if b"ld+json" not in data:
+        return docs
+    for m in _JSONLD_SCRIPT.finditer(data):
+        body = _WRAPPER.sub(b"", m.group(1)).strip()
+        if not body:
+            continue
+        try:
+            parsed = [_loads(body)]
+        except ValueError:
+            parsed = _loads_tolerant(body)
+        docs += [doc for doc in parsed if doc]
+    return docs
+
+
+def _short_type(value: str) -> str:
+    # https://schema.org/Product -> Product, schema:Product -> Product
+    value = value.rstrip("/")
+    for sep in ("/", "#", ":"):
+        if sep in value:
+            value = value.rsplit(sep, 1)[1]
+    return value
+
+
+def _attrs(raw: bytes) -> Dict[bytes, str]:
+    attrs: Dict[bytes, str] = {}
+    for m in _ATTR.finditer(raw):
+        value = m.group(2) or b""
+        if value[:1] in (b'"', b"'"):
+            value = value[1:-1]
+        attrs[m.group(1).lower()] = html_lib.unescape(value.decode("utf-8", "replace"))
+    return attrs
+
+
+def _add_prop(item: Dict[str, Any], names: str, value: Any) -> None:
+    for name in names.split():
+        name = _short_type(name)
+        existing = item.get(name)
+        if existing is None:
+            item[name] = value
+        elif isinstance(existing, list):
+            existing.append(value)
+        else:
+            item[name] = [existing, value]
+
+
+_same_name_tags: Dict[bytes, "re.Pattern[bytes]"] = {}
+
+
+def _element_end(data: bytes, name: bytes, start: int) -> int:
+    """Offset just past the end tag closing the element opened at `start` (len(data) if unclosed)."""
+    rx = _same_name_tags.get(name)
+    if rx is None:
+        rx = re.compile(rb"<(/?)" + re.escape(name) + rb"(?=[\s/>])[^>]*>", re.I)
+        _same_name_tags[name] = rx
+    depth = 0
+    for m in rx.finditer(data, start):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        elif not m.group(0).endswith(b"/>"):
+            depth += 1
+    return len(data)
+
+
+def _marked_tags(data: bytes, low: bytes) -> List[Tuple[int, "re.Match[bytes]"]]:
+    """Start tags containing a microdata/RDFa attribute, in document order."""
+    starts: Set[int] = set()
+    for marker in _MARKERS:
+        pos = low.find(marker)
+        while pos >= 0:
+            tag_start = low.rfind(b"<", 0, pos)
+            if tag_start >= 0 and low.rfind(b">", tag_start, pos) < 0:
+                starts.add(tag_start)
+            pos = low.find(marker, pos + len(marker))
+    tags = []
+    for start in sorted(starts):
+        m = _START_TAG.match(data, start)
+        if m is not None:
+            tags.append((start, m))
+    return tags
+
+
+def extract_microdata(markup: Markup) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (microdata items, RDFa items) as JSON-LD-shaped dicts ({"@type": ..., prop: value}),
+    nested items attached to their parent property. Text values are the text up to the
+    next tag; values from content/href/src/datetime attributes take precedence.
+    """
+    data = _as_bytes(markup)
+    low = data.lower()
+    if b"itemscope" not in low and b"typeof" not in low:
+        return [], []
+
+    skipped = [(m.start(), m.end()) for m in _SKIP_BLOCK.finditer(data)] if b"<script" in data or b"<style" in data else []
+    roots: Dict[str, List[Dict[str, Any]]] = {"microdata": [], "rdfa": []}
+    # (end offset of the item's element, item, syntax)
+    stack: List[Tuple[int, Dict[str, Any], str]] = []
+    skip_i = 0
+
+    for pos, m in _marked_tags(data, low):
+        while skip_i < len(skipped) and skipped[skip_i][1] <= pos:
+            skip_i += 1
+        if skip_i < len(skipped) and skipped[skip_i][0] <= pos:
+            continue
+        while stack and stack[-1][0] <= pos:
+            stack.pop()
+
+        name = m.group(1).lower()
+        raw = m.group(2) or b""
+        attrs = _attrs(raw)
+        if b"itemscope" in attrs:
+            syntax, types, prop = "microdata", attrs.get(b"itemtype", ""), attrs.get(b"itemprop")
+        elif b"typeof" in attrs:
+            syntax, types, prop = "rdfa", attrs.get(b"typeof", ""), attrs.get(b"property")
+        else:
+            syntax, types = None, ""
+            prop = attrs.get(b"itemprop") or attrs.get(b"property")
+
+        if syntax is not None:
+            item: Dict[str, Any] = {}
+            type_names = [_short_type(t) for t in types.split() if t]
+            if type_names:
+                item["@type"] = type_names[0] if len(type_names) == 1 else type_names
+            parent = next((s[1] for s in reversed(stack) if s[2] == syntax), None)
+            if prop and parent is not None:
+                _add_prop(parent, prop, item)
+            else:
+                roots[syntax].append(item)
+            void = name in _VOID or raw.rstrip().endswith(b"/")
+            end = m.end() if void else _element_end(data, name, pos)
+            stack.append((end, item, syntax))
+            continue
+
+        if not prop or not stack:
+            continue
+        wanted = "microdata" if b"itemprop" in attrs else "rdfa"
+        parent = next((s[1] for s in reversed(stack) if s[2] == wanted), None)
+        if parent is None:
+            continue
+        value = next((attrs[a] for a in _VALUE_ATTRS if attrs.get(a)), None)
+        if value is None:
+            end = data.find(b"<", m.end())
+            value = html_lib.unescape(data[m.end():end if end >= 0 else None].decode("utf-8", "replace")).strip()
+        _add_prop(parent, prop, value)
+
+    return roots["microdata"], roots["rdfa"]
+
+
+def extract_structured_data(markup: Markup, microdata: bool = True) -> Dict[str, List[Any]]:
+    """{"jsonld": [...], "microdata": [...], "rdfa": [...]} for a page in one call."""
+    data = _as_bytes(markup)
+    md, rdfa = extract_microdata(data) if microdata else ([], [])
+    return {"jsonld": extract_jsonld(data), "microdata": md, "rdfa": rdfa}
+
+
+def collect_schema_types(obj: Any) -> List[str]:
+    """All @type values in a JSON-LD document, depth-first."""
+    types: List[str] = []
+    if isinstance(obj, dict):
+        t = obj.get("@type")
+        if isinstance(t, str):
+            types.append(t)
+        elif isinstance(t, list):
+            types += [x for x in t if isinstance(x, str)]
+        for v in obj.values():
+            types += collect_schema_types(v)
+    elif isinstance(obj, list):
+        for it in obj:
+            types += collect_schema_types(it)
+    return types
+
+
+def type_properties(obj: Any, out: Optional[Dict[str, Set[str]]] = None) -> Dict[str, Set[str]]:
+    """{@type: lowercased property names used on nodes of that type} across a document."""
+    if out is None:
+        out = {}
+    if isinstance(obj, dict):
+        t = obj.get("@type")
+        names = [t] if isinstance(t, str) else [x for x in t if isinstance(x, str)] if isinstance(t, list) else []
+        if names:
+            keys = {k.lower() for k, v in obj.items() if not k.startswith("@") and v not in (None, "", [], {})}
+            for name in names:
+                out.setdefault(name, set()).update(keys)
+        for v in obj.values():
+            type_properties(v, out)
+    elif isinstance(obj, list):
+        for it in obj:
+            type_properties(it, out)
+    return out
+
+
+def analyze_schema(html: Markup, rules: Rules, microdata: bool = True) -> Dict[str, Any]:
+    """
+    JSON-LD documents, microdata/RDFa items, their @types and per-type completeness
+    against `rules`. A property counts as present when a node of that type carries a
+    non-empty value in any of the syntaxes.
+    """
+    found = extract_structured_data(html, microdata=microdata)
+    schemas = found["jsonld"]
+    items = found["microdata"] + found["rdfa"]
+    types: List[str] = []
+    props: Dict[str, Set[str]] = {}
+    for doc in schemas + items:
+        types += collect_schema_types(doc)
+        type_properties(doc, props)
+    types = list(dict.fromkeys(types))
+
+    analysis = []
+    for t in types:
+        r = rules.get(t)
+        if not r:
+            continue
+        present = props.get(t, set())
+        missing_req = [k for k in r["required"] if k.lower() not in present]
+        missing_rec = [k for k in r["recommended"] if k.lower() not in present]
+        analysis.append({
+            "type": t,
+            "completeness": max(0, 100 - (len(missing_req) * 40 + len(missing_rec) * 10)),
+            "missingRequired": missing_req,
+            "missingRecommended": missing_rec,
+        })
+    return {"schemas": schemas, "microdata": items, "types": types, "typeAnalysis": analysis}
+
+
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-f]{8,}|[0-9a-f-]{32,36})$", re.I)
+_LOCALE_SEGMENT = re.compile(r"^[a-z]{2}(?:[-_][a-z]{2})?$", re.I)
+
+
+def page_template(url: str) -> str:
+    """
+    Coarse page template from the URL path: locale prefix and first section kept, the
+    rest collapsed (/de/blog/some-post -> /de/blog/*, /product/123 -> /product/*).
+    """
+    segments = [seg for seg in urlparse(url).path.split("/") if seg]
+    prefix = ""
+    if segments and _LOCALE_SEGMENT.match(segments[0]) and len(segments) > 1:
+        prefix = "/" + segments.pop(0).lower()
+    if not segments:
+        return prefix or "/"
+    head = segments[0].lower()
+    if _ID_SEGMENT.match(head):
+        head = ":id"
+    return f"{prefix}/{head}" + ("/*" if len(segments) > 1 else "")
+
+
+class SchemaInventory:
+    """
+    Running sitewide aggregate over analyze_schema() results: type x template coverage
+    and per-type completeness distributions. Only counters are kept, so memory depends
+    on the number of distinct types and templates, not on the number of pages.
+    """
+
+    BUCKETS = 11  # completeness histogram: 0-9, 10-19, ..., 90-99, 100
+
+    def __init__(self) -> None:
+        self.pages = 0
+        self.failed = 0
+        self.with_schema = 0
+        self.template_pages: Dict[str, int] = {}
+        self.matrix: Dict[str, Dict[str, int]] = {}  # template -> type -> pages
+        self.type_pages: Dict[str, int] = {}
+        self._scores: Dict[str, List[float]] = {}  # type -> [count, sum, min, max]
+        self._histograms: Dict[str, List[int]] = {}
+        self._missing: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def summarize(page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compact summary of an analyze_schema() page (plus "url") - all add() needs, so
+        audit workers can drop the JSON-LD payloads before a page is queued.
+        """
+        url = page["url"]
+        return {
+            "url": url,
+            "template": page_template(url),
+            "types": page["types"],
+            "completeness": {ta["type"]: ta["completeness"] for ta in page["typeAnalysis"]},
+            "missing": {
+                ta["type"]: ta["missingRequired"] + ta["missingRecommended"] for ta in page["typeAnalysis"]
+            },
+        }
+
+    def add(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold in one page's summarize() result; returns its per-page line."""
+        template = summary["template"]
+        types = summary["types"]
+        self.pages += 1
+        if types:
+            self.with_schema += 1
+        self.template_pages[template] = self.template_pages.get(template, 0) + 1
+        row = self.matrix.setdefault(template, {})
+        for t in types:
+            row[t] = row.get(t, 0) + 1
+            self.type_pages[t] = self.type_pages.get(t, 0) + 1
+
+        completeness = summary["completeness"]
+        for t, score in completeness.items():
+            stats = self._scores.get(t)
+            if stats is None:
+                self._scores[t] = [1, score, score, score]
+            else:
+                stats[0] += 1
+                stats[1] += score
+                stats[2] = min(stats[2], score)
+                stats[3] = max(stats[3], score)
+            hist = self._histograms.setdefault(t, [0] * self.BUCKETS)
+            hist[min(self.BUCKETS - 1, int(score) // 10)] += 1
+            missing = self._missing.setdefault(t, {})
+            for prop in summary["missing"].get(t, ()):
+                missing[prop] = missing.get(prop, 0) + 1
+        return {"url": summary["url"], "template": template, "types": types, "completeness": completeness}
+
+    def fail(self) -> None:
+        self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pages = max(1, self.pages)
+        return {
+            "pagesScanned": self.pages,
+            "pagesWithSchema": self.with_schema,
+            "pagesFailed": self.failed,
+            "types": {
+                t: {"pages": n, "coverage": round(100.0 * n / pages, 1)}
+                for t, n in sorted(self.type_pages.items(), key=lambda kv: -kv[1])
+            },
+            "matrix": {
+                template: {
+                    "pages": self.template_pages[template],
+                    "coverage": {
+                        t: round(100.0 * n / self.template_pages[template], 1)
+                        for t, n in sorted(row.items(), key=lambda kv: -kv[1])
+                    },
+                }
+                for template, row in sorted(self.matrix.items(), key=lambda kv: -self.template_pages[kv[0]])
+            },
+            "completeness": {
+                t: {
+                    "count": int(stats[0]),
+                    "mean": round(stats[1] / stats[0], 1),
+                    "min": stats[2],
+                    "max": stats[3],
+                    "histogram": list(self._histograms[t]),
+                    "missingProperties": dict(sorted(self._missing[t].items(), key=lambda kv: -kv[1])),
+                }
+                for t, stats in self._scores.items()
+            },
+        }
+
+
+def _page_key(url: str) -> str:
+    return url.split("#", 1)[0].rstrip("/")
+
+
+async def iter_audit_pages(
+    urls: Sequence[str],
+    rules: Rules,
+    max_pages: int,
+    allowed: Optional[Callable[[str], Awaitable[bool]]] = None,
+    concurrency: Optional[int] = None,
+    audit_run: Optional[IncrementalAudit] = None,
+    transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> AsyncIterator[Tuple[int, str, Optional[Dict[str, Any]]]]:
+    """
+    Fetch candidate URLs with bounded concurrency and analyse their structured data
+    until `max_pages` pages succeeded, yielding (candidate index, url, page) as fetches
+    complete; page is None for candidates that failed, were blocked, or redirected to an
+    already audited page. Each page is analyze_schema() plus "url" (the final URL).
+    With an audit_run, returned pages (and only those) are recorded in its state and,
+    for incremental runs, pages unchanged since the last run (lastmod, validators or
+    identical HTML) reuse their stored analysis; candidates left out (max_pages, robots,
+    transient errors) mark the run incomplete. `transform` maps each page inside the worker, before it is queued
+    (e.g. SchemaInventory.summarize, so only compact summaries wait for a slow consumer).
+    At most one finished page per worker is buffered; workers wait for the consumer.
+    Closing the iterator early cancels the outstanding fetches.
+    """
+    urls = list(dict.fromkeys(urls))
+    seen: Set[str] = set()
+    next_index = 0
+    succeeded = 0
+    timeout = httpx.Timeout(15.0, connect=5.0)
+
+    def partial() -> None:
+        # Some candidate was not audited: the run must not prune its audit state
+        if audit_run is not None:
+            audit_run.complete = False
+
+    def first_visit(final: str) -> bool:
+        key = _page_key(final)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    async def audit(url: str) -> Optional[Tuple[Dict[str, Any], Optional[PageCheck], Optional[str], bool]]:
+        # (page, check, content hash, reused stored result); the worker records the page
+        # in the audit state only once it is sure to be returned
+        if allowed is not None and not await allowed(url):
+            partial()
+            return None
+        check = None
+        if audit_run is not None:
+            check = await audit_run.check(url, timeout=timeout)
+            stored = check.reusable()
+            if stored is not None:
+                if not first_visit(stored["url"]):
+                    return None
+                return stored, check, None, True
+        resp = check.response if check is not None and check.response is not None else None
+        if resp is None:
+            resp = await cached_get(url, timeout=timeout)
+        if resp.status_code != 200:
+            if resp.status_code == 429 or resp.status_code >= 500:
+                partial()  # transient: the page may well still exist
+            return None
+        final = str(resp.url)
+        html = resp.content  # bytes: the extractors never need the decoded page
+        if not html or len(html) < 100:
+            return None
+        if not first_visit(final):
+            return None
+        digest = content_hash(html) if check is not None else None
+        stored = check.reusable(digest) if check is not None else None
+        if stored is not None:
+            return stored, check, digest, True
+        with stage("parse"):
+            page = await run_cpu(analyze_schema, html, rules, size_hint=len(html))
+        page["url"] = final
+        if check is not None:
+            check.observe(resp)
+        return page, check, digest, False
+
+    async def worker() -> None:
+        nonlocal next_index, succeeded
+        while next_index < len(urls) and succeeded < max_pages:
+            index = next_index
+            next_index += 1
+            try:
+                outcome = await audit(urls[index])
+            except Exception:
+                partial()
+                outcome = None
+            page = None
+            if outcome is not None:
+                if succeeded >= max_pages:
+                    partial()
+                    continue
+                # Claim the slot before awaiting so concurrent workers cannot exceed max_pages
+                succeeded += 1
+                page, check, digest, reused = outcome
+                try:
+                    if audit_run is not None and check is not None:
+                        if reused:
+                            await audit_run.keep(check)
+                        else:
+                            await audit_run.record(check, digest, page)
+                    if transform is not None:
+                        page = transform(page)
+                except Exception:
+                    succeeded -= 1
+                    partial()
+                    page = None
+            await queue.put((index, urls[index], page))
+        if next_index < len(urls):
+            partial()  # stopped by max_pages with candidates left
+        # Not in a finally: a worker cancelled while blocked on a full queue must not block again
+        await queue.put(None)
+
+    workers = max(1, min(concurrency or SCHEMA_AUDIT_CONCURRENCY, max_pages, len(urls) or 1))
+    # Bounded: a slow consumer (streaming client) holds the workers back instead of
+    # letting finished pages pile up in memory
+    queue: "asyncio.Queue[Optional[Tuple[int, str, Optional[Dict[str, Any]]]]]" = asyncio.Queue(maxsize=workers)
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        running = len(tasks)
+        while running:
+            item = await queue.get()
+            if item is None:
+                running -= 1
+                continue
+            yield item
+    finally:
+        if running:
+            partial()  # closed early
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def audit_pages(
+    urls: Sequence[str],
+    rules: Rules,
+    max_pages: int,
+    allowed: Optional[Callable[[str], Awaitable[bool]]] = None,
+    concurrency: Optional[int] = None,
+    audit_run: Optional[IncrementalAudit] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Successful pages of iter_audit_pages() in candidate order. Candidates that redirect
+    to an already audited page are skipped.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    async for index, _, page in iter_audit_pages(urls, rules, max_pages, allowed, concurrency, audit_run):
+        if page is not None:
+            results[index] = page
+    return [results[i] for i in sorted(results)]
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..observability import stage
+from .cpu_pool_service import run_cpu
+from .keyword_service import STOPWORDS
+
+# NumPy/SciPy are only needed for the site-level model; single-page topic recognition
+# keeps working without them.
+try:
+    import numpy as np
+    from scipy import sparse
+    HAS_SCIPY = True
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+    sparse = None  # type: ignore
+    HAS_SCIPY = False
+
+
+class TopicModelNotConfigured(RuntimeError):
+    pass
+
+
+_TOKEN = re.compile(r"[A-Za-zÄÖÜäöüß\-]{3,}")
+_ENTITY = re.compile(r"\b([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]{2,})\b")
+
+# Site models kept in memory so repeated site-mode requests only tokenize new or changed pages
+SITE_MODEL_CACHE_SIZE = 16
+_site_models: "OrderedDict[str, SiteTopicModel]" = OrderedDict()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (>= 3 chars) without stopwords; same rules as the single-page mode."""
+    out = []
+    for t in _TOKEN.findall(text or ""):
+        t = t.strip("-").lower()
+        if len(t) >= 3 and t not in STOPWORDS:
+            out.append(t)
+    return out
+
+
+def tokenize_many(texts: Sequence[str]) -> List[List[str]]:
+    """Process-pool entry point: tokenize a batch of pages."""
+    return [tokenize(t) for t in texts]
+
+
+def page_keywords(
+    text: str, n_keywords: int = 15, n_entities: int = 8
+) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """
+    Single-page mode: most frequent non-stopword tokens and capitalized words (rough
+    entities) with counts. Top-level so it can run in the CPU pool.
+    """
+    tokens = [t.lower() for t in _TOKEN.findall(text or "")]
+    top_kw = [w for w, _ in Counter(t for t in tokens if t not in STOPWORDS).most_common(n_keywords)]
+    entities = Counter(_ENTITY.findall(text or "")).most_common(n_entities)
+    return top_kw, entities
+
+
+class SiteTopicModel:
+    """
+    Sparse TF-IDF model over the pages of one site.
+
+    Each page is stored as a term-count row (vocabulary ids + counts) and contributes to a
+    document-frequency vector. Adding or changing a page only tokenizes that page and adjusts
+    df by its old/new term set; unchanged pages (same content hash) are skipped. The CSR
+    matrix is assembled lazily from the stored rows and weighted at query time, so updates
+    never re-read the other pages' text.
+    """
+
+    def __init__(self) -> None:
+        if not HAS_SCIPY:
+            raise TopicModelNotConfigured(
+                "numpy/scipy are not installed. Run `pip install numpy scipy` for site-wide topic recognition."
+            )
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._rows: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+        self._hashes: Dict[str, str] = {}
+        self._tf: Optional[Any] = None
+        self._tfidf: Optional[Any] = None
+        self.updated_at = time.time()
+        # Serializes update + summary per site: summary() runs in a worker thread and must
+        # not see add_page/remove_page from a concurrent request half-applied.
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._rows)
+
+    # --- updates --------------------------------------------------------------------------
+
+    def _term_ids(self, tokens: Iterable[str]) -> Counter:
+        counts: Counter = Counter()
+        vocab = self.vocab
+        for t in tokens:
+            idx = vocab.get(t)
+            if idx is None:
+                idx = len(self.terms)
+                vocab[t] = idx
+                self.terms.append(t)
+            counts[idx] += 1
+        if len(self.terms) > len(self._df):
+            grown = np.zeros(max(len(self.terms), 2 * len(self._df)), dtype=np.int64)
+            grown[: len(self._df)] = self._df
+            self._df = grown
+        return counts
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+
+    def is_current(self, url: str, text: str) -> bool:
+        return self._hashes.get(url) == self._digest(text)
+
+    def add_page(self, url: str, text: str, tokens: Optional[List[str]] = None) -> str:
+        """
+        Insert or update a page. Returns 'added', 'updated' or 'unchanged'.
+        `tokens` may be passed when the page was already tokenized elsewhere (CPU pool).
+        """
+        digest = self._digest(text)
+        if self._hashes.get(url) == digest:
+            return "unchanged"
+        status = "updated" if url in self._rows else "added"
+        if status == "updated":
+            old_ids, _ = self._rows[url]
+            self._df[old_ids] -= 1
+
+        counts = self._term_ids(tokens if tokens is not None else tokenize(text))
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        self._df[ids] += 1
+        self._rows[url] = (ids, values)
+        self._hashes[url] = digest
+        self._invalidate()
+        return status
+
+    def remove_page(self, url: str) -> bool:
+        row = self._rows.pop(url, None)
+        if row is None:
+            return False
+        self._df[row[0]] -= 1
+        self._hashes.pop(url, None)
+        self._invalidate()
+        return True
+
+    def update(self, pages: Iterable[Tuple[str, str]]) -> Dict[str, int]:
+        stats = {"added": 0, "updated": 0, "unchanged": 0}
+        for url, text in pages:
+            stats[self.add_page(url, text)] += 1
+        return stats
+
+    def _invalidate(self) -> None:
+        self._tf = None
+        self._tfidf = None
+        self.updated_at = time.time()
+
+    # --- matrices -------------------------------------------------------------------------
+
+    def _tf_matrix(self) -> Any:
+        if self._tf is None:
+            rows = list(self._rows.values())
+            n_terms = max(len(self.terms), 1)
+            if not rows:
+                self._tf = sparse.csr_matrix((0, n_terms))
+                return self._tf
+            indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum([len(ids) for ids, _ in rows], out=indptr[1:])
+            indices = np.concatenate([ids for ids, _ in rows])
+            data = np.concatenate([vals for _, vals in rows])
+            self._tf = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_terms))
+        return self._tf
+
+    def tfidf(self) -> Any:
+        """Row-normalised TF-IDF (sublinear tf, smoothed idf) as a CSR matrix, pages x terms."""
+        if self._tfidf is None:
+            tf = self._tf_matrix().copy()
+            n_docs = tf.shape[0]
+            df = self._df[: tf.shape[1]]
+            idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+            tf.data = 1.0 + np.log(tf.data)
+            x = tf.multiply(idf).tocsr()
+            norms = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            self._tfidf = sparse.diags(1.0 / norms).dot(x).tocsr()
+        return self._tfidf
+
+    # --- results --------------------------------------------------------------------------
+
+    def _top_terms(self, weights: Any, n: int, mask: Optional[Any] = None) -> List[Tuple[str, float]]:
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        if mask is not None and (weights[mask] > 0).any():
+            weights = np.where(mask, weights, 0.0)
+        n = min(n, int((weights > 0).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-weights, n - 1)[:n]
+        top = top[np.argsort(-weights[top], kind="stable")]
+        return [(self.terms[i], float(weights[i])) for i in top]
+
+    def _content_mask(self, n_docs: int) -> Optional[Any]:
+        if n_docs < 5:
+            return None
+        return self._df[: max(len(self.terms), 1)] < max(2, int(0.9 * n_docs))
+
+    def site_topics(self, n: int = 15) -> List[Dict[str, Any]]:
+        """
+        Terms carrying the most TF-IDF weight across the site. Terms present on nearly
+        every page (navigation, footer) get idf ~1 and only rank through their tf, so on sites
+        with more than a handful of pages terms found on >= 90% of pages are skipped
+        (unless nothing else is left).
+        """
+        x = self.tfidf()
+        if x.shape[0] == 0:
+            return []
+        df = self._df[: x.shape[1]]
+        mask = self._content_mask(x.shape[0])
+        weights = np.asarray(x.sum(axis=0)).ravel() / x.shape[0]
+        return [
+            {"term": t, "score": round(w, 4), "pages": int(df[self.vocab[t]])}
+            for t, w in self._top_terms(weights, n, mask)
+        ]
+
+    def page_topics(self, n: int = 8) -> List[Dict[str, Any]]:
+        x = self.tfidf()
+        terms = self.terms
+        mask = self._content_mask(x.shape[0])
+        out = []
+        for i, url in enumerate(self._rows):
+            lo, hi = x.indptr[i], x.indptr[i + 1]
+            idx, data = x.indices[lo:hi], x.data[lo:hi]
+            if mask is not None and mask[idx].any():
+                keep = mask[idx]
+                idx, data = idx[keep], data[keep]
+            top = np.argsort(-data, kind="stable")[:n]
+            out.append({"url": url, "topics": [terms[idx[j]] for j in top]})
+        return out
+
+    def keyword_clusters(
+        self, n_terms: int = 40, threshold: float = 0.3, max_clusters: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Group the top site terms by co-occurrence: cosine similarity of their page vectors
+        (columns of the TF-IDF matrix). Greedy single-pass assignment in score order, each
+        cluster labelled by its strongest term.
+        """
+        x = self.tfidf()
+        if x.shape[0] < 2:
+            return []
+        top = self.site_topics(n_terms)
+        if not top:
+            return []
+        ids = np.array([self.vocab[t["term"]] for t in top])
+        cols = x[:, ids].tocsc()
+        norms = np.sqrt(np.asarray(cols.multiply(cols).sum(axis=0)).ravel())
+        norms[norms == 0] = 1.0
+        cols = cols.dot(sparse.diags(1.0 / norms))
+        sim = (cols.T @ cols).toarray()
+
+        clusters: List[List[int]] = []
+        for j in range(len(ids)):
+            best, best_sim = None, threshold
+            for c, members in enumerate(clusters):
+                s = float(sim[j, members].mean())
+                if s >= best_sim:
+                    best, best_sim = c, s
+            if best is None:
+                clusters.append([j])
+            else:
+                clusters[best].append(j)
+
+        out = []
+        for members in clusters:
+            if len(members) < 2:
+                continue
+            out.append({
+                "label": top[members[0]]["term"],
+                "keywords": [top[m]["term"] for m in members],
+                "score": round(sum(top[m]["score"] for m in members), 4),
+            })
+            if len(out) >= max_clusters:
+                break
+        return out
+
+    def summary(self, site_n: int = 15, page_n: int = 8) -> Dict[str, Any]:
+        return {
+            "siteTopics": self.site_topics(site_n),
+            "pageTopics": self.page_topics(page_n),
+            "keywordClusters": self.keyword_clusters(),
+            "pages": len(self),
+            "vocabulary": int((self._df[: len(self.terms)] > 0).sum()),
+        }
+
+
+def site_model(site: str) -> SiteTopicModel:
+    """In-memory SiteTopicModel per site (LRU), reused across site-mode requests."""
+    model = _site_models.get(site)
+    if model is None:
+        model = SiteTopicModel()
+        _site_models[site] = model
+        while len(_site_models) > SITE_MODEL_CACHE_SIZE:
+            _site_models.popitem(last=False)
+    else:
+        _site_models.move_to_end(site)
+    return model
+
+
+async def site_topic_recognition(
+    site: str, pages: Sequence[Tuple[str, str]], replace: bool = False
+) -> Dict[str, Any]:
+    """
+    Update the site's model with (url, text) pages and return site topics, per-page topics
+    and keyword clusters. With replace=True pages not in `pages` are dropped from the model.
+    New or changed pages are tokenized in the CPU pool; scoring runs in a worker thread.
+    """
+    model = site_model(site)
+    async with model.lock:
+        if replace:
+            keep = {u for u, _ in pages}
+            for u in [u for u in model.urls if u not in keep]:
+                model.remove_page(u)
+
+        stats = {"added": 0, "updated": 0, "unchanged": 0}
+        changed = []
+        for url, text in pages:
+            if model.is_current(url, text):
+                stats["unchanged"] += 1
+            else:
+                changed.append((url, text))
+        if changed:
+            texts = [t for _, t in changed]
+            with stage("analyze"):
+                token_lists = await run_cpu(tokenize_many, texts, size_hint=sum(len(t) for t in texts))
+            for (url, text), tokens in zip(changed, token_lists):
+                stats[model.add_page(url, text, tokens)] += 1
+        with stage("analyze"):
+            result = await asyncio.to_thread(model.summary)
+        result["update"] = stats
+        return result
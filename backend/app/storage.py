@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Sequence
+
+# Local state (HTTP cache, crawl data, results) lives under one directory.
+# NEURO_WEB_DATA_DIR points it at a mounted volume in deployments; default is backend/.data.
+_DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / ".data"
+
+
+def data_dir() -> Path:
+    path = Path(os.getenv("NEURO_WEB_DATA_DIR") or _DEFAULT_DATA_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def data_path(*parts: str) -> Path:
+    """Path inside the data directory; parent directories are created."""
+    path = data_dir().joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def connect_sqlite(*parts: str, pragmas: Sequence[str] = ()) -> sqlite3.Connection:
+    """
+    SQLite connection for a file in the data directory, shared across threads
+    (callers serialise access with their own lock). WAL keeps readers off the writer.
+    `pragmas` run before WAL is enabled, i.e. before a new file's header is written
+    (needed for settings such as auto_vacuum).
+    """
+    conn = sqlite3.connect(str(data_path(*parts)), check_same_thread=False, isolation_level=None)
+    for pragma in pragmas:
+        conn.execute(f"PRAGMA {pragma}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
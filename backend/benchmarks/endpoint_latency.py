@@ -0,0 +1,210 @@
+"""
+Offline latency benchmark for the scan endpoints.
+
+Starts local fixture sites (a multi-page site, a site with a large sitemap, a slow host)
+and the fake Gemini server, then drives the FastAPI app in-process and reports per
+scenario: p50/p95/mean latency, throughput and Gemini calls/tokens, as JSON.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.endpoint_latency [--requests 10] [--concurrency 2]
+        [--gemini-latency-ms 300] [--slow-host-ms 250] [--sitemap-urls 5000]
+        [--fixtures DIR] [--cache] [--polite] [--scenarios initial_scan,schema_audit_multi]
+
+--fixtures serves a recorded site (see fixtures.py) instead of the synthetic multi-page
+site. By default the HTTP cache and per-host politeness are off, so every request pays
+for its fetches; --cache and --polite measure the production configuration.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .fake_gemini import FakeGemini
+from .fixtures import FixtureServer, SyntheticSite
+
+Call = Callable[[], Awaitable[Any]]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def measure(call: Call, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}"[:300])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "sample_error": errors[0] if errors else None,
+        "p50_ms": round(percentile(ms, 50), 1) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 1) if ms else None,
+        "mean_ms": round(sum(ms) / len(ms), 1) if ms else None,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "wall_s": round(wall, 3),
+    }
+
+
+def _configure_env(args: argparse.Namespace, gemini_url: str, data_dir: str) -> None:
+    # Module-level settings are read at import time, so this runs before the app is imported
+    os.environ["NEURO_WEB_DATA_DIR"] = data_dir
+    os.environ["GEMINI_API_KEY"] = os.environ.get("BENCH_GEMINI_API_KEY", "bench")
+    os.environ["GEMINI_BASE_URL"] = gemini_url
+    if not args.cache:
+        os.environ["HTTP_CACHE"] = "0"
+    if not args.polite:
+        os.environ["HOST_RATE"] = "100000"
+        os.environ["HOST_BURST"] = "100000"
+
+
+def _scenarios(client: Any, sites: Dict[str, str], crawl: Any, args: argparse.Namespace) -> Dict[str, Optional[Call]]:
+    """Scenario name -> call; None when the scenario cannot run in this environment."""
+    async def post(path: str, body: Dict[str, Any]) -> Any:
+        resp = await client.post(path, json=body)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    site, large, slow = sites["site"], sites["large"], sites["slow"]
+    return {
+        "initial_scan": lambda: post("/api/initial-scan", {"url": site + "/"}),
+        "initial_scan_slow_host": lambda: post("/api/initial-scan", {"url": slow + "/"}),
+        # The browser crawl used by the endpoints; needs crawl4ai and its browser
+        "crawl_markdown": (lambda: crawl.crawl_markdown(site + "/", limit=args.crawl_limit, mode="main"))
+        if crawl.CRAWL4AI_AVAILABLE else None,
+        "schema_audit_multi": lambda: post("/api/analysis/schema-audit-multi",
+                                           {"url": large, "sitemap": large + "/sitemap.xml",
+                                            "max_pages": args.schema_pages}),
+        "scan_batch": lambda: post("/api/scan/batch", {"url": site, "max_pages": args.batch_pages}),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fake = FakeGemini(latency=args.gemini_latency_ms / 1000, per_token=args.gemini_per_token_ms / 1000).start()
+    servers: List[FixtureServer] = []
+    try:
+        if args.fixtures:
+            servers.append(FixtureServer(root=Path(args.fixtures)).start())
+        else:
+            servers.append(SyntheticSite(pages=args.pages).serve().start())
+        servers.append(SyntheticSite(pages=args.pages, sitemap_urls=args.sitemap_urls).serve().start())
+        servers.append(SyntheticSite(pages=args.pages).serve(latency=args.slow_host_ms / 1000).start())
+        sites = {"site": servers[0].url, "large": servers[1].url, "slow": servers[2].url}
+
+        data_dir = tempfile.mkdtemp(prefix="neuro-web-bench-")
+        _configure_env(args, fake.url, data_dir)
+
+        import httpx
+
+        main = importlib.import_module("backend.main")
+        crawl = importlib.import_module("backend.app.services.crawl4ai_service")
+        http_service = importlib.import_module("backend.app.services.http_service")
+        cpu_pool = importlib.import_module("backend.app.services.cpu_pool_service")
+        gemini = importlib.import_module("backend.app.services.gemini_service")
+
+        transport = httpx.ASGITransport(app=main.app)
+        results: Dict[str, Any] = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600.0) as client:
+            scenarios = _scenarios(client, sites, crawl, args)
+            selected = [s.strip() for s in args.scenarios.split(",")] if args.scenarios else list(scenarios)
+            for name in selected:
+                if name not in scenarios:
+                    results[name] = {"error": f"unknown scenario; choose from {', '.join(scenarios)}"}
+                    continue
+                call = scenarios[name]
+                if call is None:
+                    results[name] = {"skipped": "crawl4ai is not installed"}
+                    continue
+                fake.reset()
+                fetches_before = sum(s.requests for s in servers)
+                stats = await measure(call, args.requests, args.concurrency)
+                tokens = fake.stats()
+                stats.update({
+                    "site_fetches": sum(s.requests for s in servers) - fetches_before,
+                    "gemini_calls": tokens["requests"],
+                    "prompt_tokens": tokens["promptTokens"],
+                    "output_tokens": tokens["outputTokens"],
+                    "tokens_per_request": round((tokens["promptTokens"] + tokens["outputTokens"]) / max(1, stats["ok"]), 1),
+                })
+                results[name] = stats
+
+        await http_service.close_http()
+        cpu_pool.shutdown_pool()
+        return {
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "gemini_latency_ms": args.gemini_latency_ms,
+                "slow_host_ms": args.slow_host_ms,
+                "sitemap_urls": args.sitemap_urls,
+                "fixtures": args.fixtures or "synthetic",
+                "http_cache": bool(args.cache),
+                "polite": bool(args.polite),
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": sys.platform,
+                "crawl4ai": bool(getattr(http_service, "HAS_CRAWL4AI", False)),
+                "google_genai": gemini.genai is not None,
+            },
+            "scenarios": results,
+        }
+    finally:
+        for server in servers:
+            server.stop()
+        fake.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=10, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--scenarios", default="", help="comma-separated subset (default: all)")
+    ap.add_argument("--pages", type=int, default=60, help="pages of the synthetic sites")
+    ap.add_argument("--sitemap-urls", type=int, default=5000, help="URLs in the large sitemap")
+    ap.add_argument("--slow-host-ms", type=float, default=250.0)
+    ap.add_argument("--gemini-latency-ms", type=float, default=300.0)
+    ap.add_argument("--gemini-per-token-ms", type=float, default=0.0)
+    ap.add_argument("--crawl-limit", type=int, default=20)
+    ap.add_argument("--schema-pages", type=int, default=50)
+    ap.add_argument("--batch-pages", type=int, default=5)
+    ap.add_argument("--fixtures", help="recorded fixture directory for the main site")
+    ap.add_argument("--cache", action="store_true", help="keep the on-disk HTTP cache enabled")
+    ap.add_argument("--polite", action="store_true", help="keep per-host rate limits")
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
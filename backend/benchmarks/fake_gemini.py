@@ -0,0 +1,202 @@
+"""
+Local stand-in for the Gemini generateContent API.
+
+Answers POST /v1beta/models/{model}:generateContent (the path the google-genai SDK uses)
+after a configurable latency, and counts requests and tokens per model. Token counts are
+estimated at four characters per token for prompts and responses. Point the backend at it
+with GEMINI_BASE_URL=http://127.0.0.1:<port> and any GEMINI_API_KEY.
+
+    python -m backend.benchmarks.fake_gemini --port 8890 --latency-ms 400
+
+GET /stats returns the counters; POST /reset clears them.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    return int(math.ceil(len(text or "") / 4.0))
+
+
+def _prompt_text(payload: Dict[str, Any]) -> str:
+    parts = []
+    for content in payload.get("contents") or []:
+        for part in (content or {}).get("parts") or []:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                parts.append(part["text"])
+    system = payload.get("systemInstruction") or payload.get("system_instruction") or {}
+    for part in (system.get("parts") or []) if isinstance(system, dict) else []:
+        if isinstance(part, dict) and isinstance(part.get("text"), str):
+            parts.append(part["text"])
+    return "\n".join(parts)
+
+
+class FakeGemini:
+    """
+    Threaded fake Gemini server on 127.0.0.1.
+
+    latency: fixed seconds per call; per_token: extra seconds per output token;
+    jitter: up to this many extra seconds. json_response / text_response are returned
+    for calls with and without response_mime_type application/json.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.3,
+        per_token: float = 0.0,
+        jitter: float = 0.0,
+        json_response: str = "{}",
+        text_response: str = "Antwort des Modells.",
+        port: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.per_token = per_token
+        self.jitter = jitter
+        self.json_response = json_response
+        self.text_response = text_response
+        self._lock = threading.Lock()
+        self.reset()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, obj: Any) -> None:
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.rstrip("/") == "/stats":
+                    self._send(200, fake.stats())
+                else:
+                    self._send(404, {"error": {"code": 404, "message": "not found"}})
+
+            def do_POST(self) -> None:  # noqa: N802
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if self.path.rstrip("/") == "/reset":
+                    fake.reset()
+                    self._send(200, {"ok": True})
+                    return
+                if ":generateContent" not in self.path:
+                    self._send(404, {"error": {"code": 404, "message": f"unsupported: {self.path}"}})
+                    return
+                model = self.path.split("/models/", 1)[-1].split(":", 1)[0]
+                try:
+                    payload = json.loads(raw or b"{}")
+                except ValueError:
+                    self._send(400, {"error": {"code": 400, "message": "invalid JSON"}})
+                    return
+                self._send(200, fake.generate(model, payload))
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.output_tokens = 0
+            self.by_model: Dict[str, Dict[str, int]] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "promptTokens": self.prompt_tokens,
+                "outputTokens": self.output_tokens,
+                "byModel": {m: dict(c) for m, c in self.by_model.items()},
+            }
+
+    def generate(self, model: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        config = payload.get("generationConfig") or {}
+        wants_json = (config.get("responseMimeType") or config.get("response_mime_type")) == "application/json"
+        text = self.json_response if wants_json else self.text_response
+        prompt_tokens = estimate_tokens(_prompt_text(payload))
+        output_tokens = estimate_tokens(text)
+
+        delay = self.latency + output_tokens * self.per_token
+        if self.jitter:
+            delay += random.random() * self.jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            counters = self.by_model.setdefault(model, {"requests": 0, "promptTokens": 0, "outputTokens": 0})
+            counters["requests"] += 1
+            counters["promptTokens"] += prompt_tokens
+            counters["outputTokens"] += output_tokens
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": model,
+        }
+
+    def start(self) -> "FakeGemini":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeGemini":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8890)
+    ap.add_argument("--latency-ms", type=float, default=300.0)
+    ap.add_argument("--per-token-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    fake = FakeGemini(latency=args.latency_ms / 1000, per_token=args.per_token_ms / 1000,
+                      jitter=args.jitter_ms / 1000, port=args.port)
+    print(f"fake Gemini on {fake.url}")
+    fake.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
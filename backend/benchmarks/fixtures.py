@@ -0,0 +1,324 @@
+"""
+Local site fixtures for the endpoint benchmarks.
+
+A fixture site is a directory of recorded responses laid out by URL path
+(`/about` -> `about/index.html`, `/sitemap.xml` -> `sitemap.xml`). FixtureServer serves
+one site per port, so every site is its own origin with its own robots.txt, and can add
+per-request latency to play a slow host. Sites can also be generated on the fly
+(synthetic multi-page sites, very large sitemaps) without touching the disk.
+
+Record a live site (from the repository root):
+    python -m backend.benchmarks.fixtures record https://example.com fixtures/example --pages 50
+Serve a recorded or generated site:
+    python -m backend.benchmarks.fixtures serve fixtures/example --port 8800 --latency-ms 150
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .markdown_throughput import synthetic_page
+
+Generator = Callable[[str], Optional[bytes]]
+
+
+def _file_for_path(root: Path, path: str) -> Path:
+    rel = path.lstrip("/")
+    if not rel or rel.endswith("/"):
+        return root / rel / "index.html"
+    candidate = root / rel
+    if candidate.suffix:
+        return candidate
+    return candidate / "index.html"
+
+
+def _content_type(path: str) -> str:
+    if path.endswith(".txt"):
+        return "text/plain; charset=utf-8"
+    if path.endswith(".xml"):
+        return "application/xml"
+    if path.endswith(".json"):
+        return "application/json"
+    guessed = mimetypes.guess_type(path)[0]
+    return guessed or "text/html; charset=utf-8"
+
+
+class FixtureServer:
+    """
+    Threaded HTTP server for one fixture site on 127.0.0.1.
+
+    Responses come from `root` (recorded files) or `generator(path)` (synthetic pages);
+    anything else is a 404. `latency` seconds (plus up to `jitter`) are added to every
+    response. Use as a context manager or call start()/stop().
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        generator: Optional[Generator] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        port: int = 0,
+    ) -> None:
+        self.root = Path(root) if root else None
+        self.generator = generator
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                server.requests += 1
+                delay = server.latency + (random.random() * server.jitter if server.jitter else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+                path = urlparse(self.path).path or "/"
+                body = server.body(path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", _content_type(path if "." in path.rsplit("/", 1)[-1] else "x.html"))
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "max-age=0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self) -> None:  # noqa: N802
+                path = urlparse(self.path).path or "/"
+                body = server.body(path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Length", str(len(body or b"")))
+                self.end_headers()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def body(self, path: str) -> Optional[bytes]:
+        if self.root is not None:
+            f = _file_for_path(self.root, path)
+            if f.is_file():
+                return f.read_bytes()
+        if self.generator is not None:
+            return self.generator(path)
+        return None
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# --- Synthetic sites ------------------------------------------------------------------------
+
+_SECTIONS = ["leistungen", "blog", "produkte", "ueber-uns", "kontakt"]
+
+
+def _jsonld(kind: str, n: int) -> str:
+    if kind == "blog":
+        doc = {"@context": "https://schema.org", "@type": "BlogPosting", "headline": f"Beitrag {n}",
+               "author": {"@type": "Person", "name": "Team"}, "datePublished": "2024-01-01"}
+    elif kind == "produkte":
+        doc = {"@context": "https://schema.org", "@type": "Product", "name": f"Produkt {n}",
+               "offers": {"@type": "Offer", "price": "99.00", "priceCurrency": "EUR"}}
+    else:
+        doc = {"@context": "https://schema.org", "@type": "Organization", "name": "Muster GmbH",
+               "url": "https://muster.example", "sameAs": []}
+    return f"<script type='application/ld+json'>{json.dumps(doc)}</script>"
+
+
+class SyntheticSite:
+    """
+    Generated SME-style site: homepage, `pages` section pages that link to each other,
+    robots.txt, sitemap.xml (a sitemap index once `sitemap_urls` exceeds 5000) and the
+    usual legal pages. Pages are built once per path and kept in memory.
+    """
+
+    def __init__(self, pages: int = 60, page_kb: int = 40, sitemap_urls: Optional[int] = None,
+                 robots: str = "User-agent: *\nAllow: /\n") -> None:
+        self.pages = pages
+        self.page_kb = page_kb
+        self.sitemap_urls = sitemap_urls or pages
+        self.robots = robots
+        self.origin = ""  # set by serve(); sitemap locations are absolute
+        self._cache: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def page_paths(self) -> List[str]:
+        return [f"/{_SECTIONS[i % len(_SECTIONS)]}/seite-{i}" for i in range(self.sitemap_urls)]
+
+    def _page(self, path: str) -> Optional[bytes]:
+        if path in ("/", "/index.html"):
+            n, kind = 0, "home"
+        elif path in ("/impressum", "/kontakt", "/about", "/faq"):
+            n, kind = 1, path.strip("/")
+        else:
+            parts = path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] not in _SECTIONS or not parts[1].startswith("seite-"):
+                return None
+            try:
+                n = int(parts[1][6:])
+            except ValueError:
+                return None
+            if n >= self.sitemap_urls:
+                return None
+            kind = parts[0]
+        html = synthetic_page(self.page_kb, seed=n)
+        links = "".join(
+            f"<a href='/{_SECTIONS[j % len(_SECTIONS)]}/seite-{j}'>Seite {j}</a>"
+            for j in ((n * 7 + k) % max(1, self.pages) for k in range(1, 6))
+        )
+        head_extra = _jsonld(kind, n)
+        html = html.replace("</head>", head_extra + "</head>", 1).replace("</main>", f"<nav>{links}</nav></main>", 1)
+        return html.encode("utf-8")
+
+    def _sitemap(self, path: str) -> Optional[bytes]:
+        paths = self.page_paths()
+        per_file = 5000
+        if path == "/sitemap.xml" and len(paths) > per_file:
+            files = (len(paths) + per_file - 1) // per_file
+            body = "".join(f"<sitemap><loc>{self.origin}/sitemap-{i}.xml</loc></sitemap>" for i in range(files))
+            return f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</sitemapindex>'.encode()
+        if path == "/sitemap.xml":
+            chunk = paths
+        elif path.startswith("/sitemap-") and path.endswith(".xml"):
+            try:
+                i = int(path[9:-4])
+            except ValueError:
+                return None
+            chunk = paths[i * per_file:(i + 1) * per_file]
+            if not chunk:
+                return None
+        else:
+            return None
+        body = "".join(f"<url><loc>{self.origin}{p}</loc></url>" for p in chunk)
+        return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</urlset>'.encode()
+
+    def __call__(self, path: str) -> Optional[bytes]:
+        if path == "/robots.txt":
+            return f"{self.robots}Sitemap: {self.origin}/sitemap.xml\n".encode()
+        if path.startswith("/sitemap"):
+            return self._sitemap(path)
+        with self._lock:
+            body = self._cache.get(path)
+        if body is None:
+            body = self._page(path)
+            if body is not None:
+                with self._lock:
+                    self._cache[path] = body
+        return body
+
+    def serve(self, latency: float = 0.0, jitter: float = 0.0, port: int = 0) -> FixtureServer:
+        server = FixtureServer(generator=self, latency=latency, jitter=jitter, port=port)
+        self.origin = server.url
+        return server
+
+
+# --- Recording ------------------------------------------------------------------------------
+
+async def record_site(url: str, out_dir: Path, max_pages: int = 50) -> List[str]:
+    """Save robots.txt, sitemap.xml and up to max_pages sitemap pages (or the homepage) under out_dir."""
+    import httpx
+
+    from ..app.services.http_service import DEFAULT_USER_AGENT
+
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    saved: List[str] = []
+    async with httpx.AsyncClient(headers={"User-Agent": DEFAULT_USER_AGENT}, follow_redirects=True,
+                                 timeout=httpx.Timeout(20.0)) as client:
+
+        async def save(path: str) -> Optional[bytes]:
+            resp = await client.get(origin + path)
+            if resp.status_code != 200:
+                return None
+            target = _file_for_path(out_dir, path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(resp.content)
+            saved.append(path)
+            return resp.content
+
+        await save("/robots.txt")
+        sitemap = await save("/sitemap.xml")
+        paths = ["/"]
+        if sitemap:
+            from bs4 import BeautifulSoup
+
+            for loc in BeautifulSoup(sitemap, "xml").find_all("loc"):
+                loc_url = urlparse(loc.text.strip())
+                if loc_url.netloc == parsed.netloc and loc_url.path not in paths:
+                    paths.append(loc_url.path or "/")
+        for path in paths[:max_pages]:
+            try:
+                await save(path)
+            except Exception:
+                continue
+    return saved
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record a live site into a fixture directory")
+    rec.add_argument("url")
+    rec.add_argument("out_dir")
+    rec.add_argument("--pages", type=int, default=50)
+    srv = sub.add_parser("serve", help="serve a fixture directory (or a synthetic site)")
+    srv.add_argument("root", nargs="?", help="fixture directory (default: synthetic site)")
+    srv.add_argument("--port", type=int, default=8800)
+    srv.add_argument("--latency-ms", type=float, default=0.0)
+    srv.add_argument("--pages", type=int, default=60, help="synthetic site size")
+    args = ap.parse_args()
+
+    if args.command == "record":
+        saved = asyncio.run(record_site(args.url, Path(args.out_dir), args.pages))
+        print(json.dumps({"saved": len(saved), "paths": saved}, indent=2))
+        return
+    if args.root:
+        server = FixtureServer(root=Path(args.root), latency=args.latency_ms / 1000, port=args.port)
+    else:
+        server = SyntheticSite(pages=args.pages).serve(latency=args.latency_ms / 1000, port=args.port)
+    print(f"serving on {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Throughput benchmark: legacy BeautifulSoup + html2text scrape path vs. the single-pass
+markdown converter.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.markdown_throughput [--pages 200] [--size-kb 120] [files...]
+
+Without file arguments a synthetic SME-style page (header, navigation, cookie banner,
+content sections, footer with NAP data) is generated. Results are printed as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from ..app.services.markdown_service import html_to_markdown
+
+
+def synthetic_page(size_kb: int = 120, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    words = (
+        "beratung digitalisierung unternehmen kunden projekt lösung service qualität team "
+        "erfahrung software plattform prozess strategie marketing angebot kontakt termin"
+    ).split()
+
+    def sentence(n: int) -> str:
+        return " ".join(rnd.choice(words) for _ in range(n)).capitalize() + "."
+
+    head = (
+        "<!doctype html><html lang='de'><head><meta charset='utf-8'>"
+        "<title>Muster GmbH – Beratung &amp; Digitalisierung</title>"
+        "<meta name='description' content='Muster GmbH unterstützt KMU bei der Digitalisierung.'>"
+        "<style>body{font-family:sans-serif}.x{color:red}</style>"
+        "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}</script>"
+        "</head><body>"
+    )
+    nav = "<header><nav><ul>" + "".join(
+        f"<li><a href='/seite-{i}'>Seite {i}</a></li>" for i in range(25)
+    ) + "</ul></nav></header>"
+    cookie = "<div class='cookie-banner'><p>Wir verwenden Cookies.</p><button>Akzeptieren</button></div>"
+    footer = (
+        "<footer><address>Muster GmbH<br>Musterstraße 1<br>10115 Berlin<br>"
+        "<a href='tel:+4930123456'>+49 30 123456</a><br>"
+        "<a href='mailto:info@muster.de'>info@muster.de</a></address></footer></body></html>"
+    )
+    body: List[str] = ["<main>"]
+    size = len(head) + len(nav) + len(cookie) + len(footer)
+    section = 0
+    while size < size_kb * 1024:
+        section += 1
+        chunk = (
+            f"<section id='s{section}'><h2>{sentence(4)}</h2>"
+            + "".join(f"<p>{sentence(25)} <a href='/link-{section}-{j}'>{sentence(2)}</a></p>" for j in range(3))
+            + "<ul>" + "".join(f"<li>{sentence(6)}</li>" for _ in range(4)) + "</ul>"
+            + f"<div class='card'><span>{sentence(8)}</span><script>track({section})</script></div>"
+            + "</section>"
+        )
+        body.append(chunk)
+        size += len(chunk)
+    body.append("</main>")
+    return head + nav + cookie + "".join(body) + footer
+
+
+def legacy_markdown(html: str) -> str:
+    """The previous _http_scrape path: BeautifulSoup parse + html2text on the raw HTML."""
+    import html2text
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for node in soup(["script", "style", "nav", "header", "footer"]):
+        node.decompose()
+    _ = soup.title.string.strip() if soup.title and soup.title.string else ""
+    _ = soup.find("meta", attrs={"name": "description"})
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.ignore_images = True
+    h.body_width = 0
+    return h.handle(html)
+
+
+def single_pass_markdown(html: str) -> str:
+    md, _ = html_to_markdown(html)
+    return md
+
+
+def _measure(fn: Callable[[str], str], docs: List[str], rounds: int) -> Dict[str, Any]:
+    fn(docs[0])  # warm-up
+    total_bytes = sum(len(d.encode("utf-8")) for d in docs) * rounds
+    out_chars = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for d in docs:
+            out_chars += len(fn(d))
+    elapsed = time.perf_counter() - start
+    pages = len(docs) * rounds
+    return {
+        "pages": pages,
+        "seconds": round(elapsed, 4),
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else None,
+        "mb_per_s": round(total_bytes / elapsed / 1e6, 2) if elapsed else None,
+        "avg_output_chars": int(out_chars / pages) if pages else 0,
+    }
+
+
+def run(docs: List[str], rounds: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"documents": len(docs), "rounds": rounds}
+    results["single_pass"] = _measure(single_pass_markdown, docs, rounds)
+    try:
+        results["legacy_html2text"] = _measure(legacy_markdown, docs, rounds)
+    except ImportError as e:
+        results["legacy_html2text"] = {"error": f"legacy path unavailable: {e}"}
+    legacy = results["legacy_html2text"]
+    if isinstance(legacy, dict) and legacy.get("seconds"):
+        results["speedup"] = round(legacy["seconds"] / results["single_pass"]["seconds"], 2)
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="HTML files to convert (default: synthetic page)")
+    ap.add_argument("--pages", type=int, default=50, help="conversions per document per run")
+    ap.add_argument("--size-kb", type=int, default=120, help="size of the synthetic page")
+    args = ap.parse_args()
+
+    if args.files:
+        docs = [Path(f).read_text(encoding="utf-8", errors="replace") for f in args.files]
+    else:
+        docs = [synthetic_page(args.size_kb)]
+    print(json.dumps(run(docs, max(1, args.pages)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -57,6 +57,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request stage timings: Server-Timing header and a JSON timing log line
+from .app.observability import ProfilerMiddleware, TimingMiddleware  # noqa: E402
+
+app.add_middleware(TimingMiddleware)
+# Admin-requested sampling profiles (X-Profile: 1 or ?_profile=1, see ADMIN_EMAILS)
+app.add_middleware(ProfilerMiddleware)
+
 # Mount API routes
 from .app.api.endpoints import router as api_router  # noqa: E402
 from .app.auth import router as auth_router  # noqa: E402
@@ -65,6 +72,52 @@ app.include_router(api_router)
 app.include_router(auth_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+async def _start_loop_monitor() -> None:
+    # Event-loop lag metric; with LOOP_BLOCK_DEBUG=1 also logs what blocks the loop
+    from .app.observability import start_loop_monitor
+
+    await start_loop_monitor()
+
+
+@app.on_event("startup")
+async def _start_results_compaction() -> None:
+    # Periodic compaction of the results history (old payloads, old per-run rows)
+    from .app.services.results_service import start_results_compaction
+
+    start_results_compaction()
+
+
+@app.on_event("shutdown")
+async def _stop_results_compaction() -> None:
+    from .app.services.results_service import stop_results_compaction
+
+    await stop_results_compaction()
+
+
+@app.on_event("shutdown")
+async def _stop_loop_monitor() -> None:
+    from .app.observability import stop_loop_monitor
+
+    await stop_loop_monitor()
+
+
+@app.on_event("shutdown")
+def _shutdown_cpu_pool() -> None:
+    # Stop parse/extract worker processes with the app
+    from .app.services.cpu_pool_service import shutdown_pool
+
+    shutdown_pool()
+
+
+@app.on_event("shutdown")
+async def _close_http_clients() -> None:
+    # Pooled outbound HTTP client and the shared crawl browser
+    from .app.services.http_service import close_http
+
+    await close_http()
+
+
 # Serve built frontend if present (dist/) - support both root/dist and backend/dist
 SPA_DIR: Path | None = None
 try: